@@ -4,80 +4,37 @@ It is designed to extend the Universal Dependencies (UD) format with new multiwo
 
 """
 from base64 import b64decode
+from collections import deque
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-import re
-import copy
+from tkinter import filedialog
+import os
+import queue
+import threading
+
+from annotation_engine import (column_names, import_conllu, find_token_index_by_id, index_sentences,
+                               read_sentence, sentence_id, write_sentence, span_defaults, constituent_defaults,
+                               annotate_existing, insert_spans, apply_diff, revert_diff, format_sentence,
+                               check_integration, snapshot_sentence, snapshot_text)
+from compound_splitter import load_splitter, split_compound
+from session_journal import (journal_path, file_state, read_journal, open_journal, append_record, sync_journal,
+                             close_journal, replay_journal, compact_journal, sync_interval)
+
+# number of integrations of a sentence that can be undone
+history_size = 100
+# live validation: the fields are checked validation_delay ms after the last change,
+# the main loop looks for the result every validation_poll ms while a check is running
+validation_delay = 300
+validation_poll = 50
+validation_lines = 5
 
-column_names = ["ID","FORM","LEMMA","UPOS","XPOS","FEATS","HEAD","DEPREL","DEPS","MISC"]
 # Define images
 onbutton = "iVBORw0KGgoAAAANSUhEUgAAABAAAAAICAIAAAB/FOjAAAABgGlDQ1BzUkdCIElFQzYxOTY2LTIuMQAAKJF1kc8rRFEUxz8zyK8RxYKyeGlYIT9qYqOMhJo0jVEGmzfPmxk1P17vzSTZKltFiY1fC/4CtspaKSIla7bEBj3neWokc2/3ns/93nNO554L3mhay1jlPZDJ5s3IWFCZic0qlU/UUC1ToUXVLGM4HA5Rcrzd4HHsVZeTq7Tfv6N2Qbc08FQJD2mGmRceFw4t5Q2HN4WbtJS6IHws3GlKgcLXjh53+dHhpMsfDpvRyAh4G4SV5C+O/2ItZWaE5eX4M+mC9lOP8xKfnp2eEtsmqxWLCGMEpRcTjDJCgF4GZQ/QRR/dcqJEfM93/CQ5idVkN1jGZJEkKfJ0ilqQ7LrYhOi6zDTLTv//9tVK9Pe52X1BqHiw7Zd2qNyAz3Xbft+37c8DKLuHs2wxPrcHA6+irxc1/y7Ur8LJeVGLb8HpGjTfGaqpfktlsryJBDwfQV0MGi+hZs7t2c89h7cQXZGvuoDtHegQ//r5LzmGZ9GMJUeIAAAACXBIWXMAAD2EAAA9hAHVrK90AAAA0klEQVQYlWP89/9f3fPps84v+3nzEyMTI7sWP4skJwM24MlnPU22ilklz7R5W//nTU/+PP/+59n3H5c+MAuysYhyYGq48/OxKKsg848ovtsrzjP8R0j8fviV00iIkZkRU8/Hv1+YLt+99v/vf2TR/z///nn1A6urHv56zsTBxIZVDiv4+e8Xk6aSOiMLiu2MHMwsYlj8wMDAoMQuw5QqH8btKIEQY2LkcZNkZGPCqsGZ15x5Wfv8fxKs50UfMHEws8px8zhLsinwYFVtx2PUKJkJAK7HQpzkHyDqAAAAAElFTkSuQmCC"
 offbutton = "iVBORw0KGgoAAAANSUhEUgAAABAAAAAICAIAAAB/FOjAAAABgGlDQ1BzUkdCIElFQzYxOTY2LTIuMQAAKJF1kc8rRFEUxz8zyK8RxYKyeGlYIT9qYqOMhJo0jVEGmzfPmxk1P17vzSTZKltFiY1fC/4CtspaKSIla7bEBj3neWokc2/3ns/93nNO554L3mhay1jlPZDJ5s3IWFCZic0qlU/UUC1ToUXVLGM4HA5Rcrzd4HHsVZeTq7Tfv6N2Qbc08FQJD2mGmRceFw4t5Q2HN4WbtJS6IHws3GlKgcLXjh53+dHhpMsfDpvRyAh4G4SV5C+O/2ItZWaE5eX4M+mC9lOP8xKfnp2eEtsmqxWLCGMEpRcTjDJCgF4GZQ/QRR/dcqJEfM93/CQ5idVkN1jGZJEkKfJ0ilqQ7LrYhOi6zDTLTv//9tVK9Pe52X1BqHiw7Zd2qNyAz3Xbft+37c8DKLuHs2wxPrcHA6+irxc1/y7Ur8LJeVGLb8HpGjTfGaqpfktlsryJBDwfQV0MGi+hZs7t2c89h7cQXZGvuoDtHegQ//r5LzmGZ9GMJUeIAAAACXBIWXMAAD2EAAA9hAHVrK90AAAAxElEQVQYlWP8+fdf1sXHO15+YsAGfj1//v3q1f///nGqq2fYGjVqSrIsffwOl+pvV66837yZ4f9/BgaGr2fOTH71Si3Bn2n9849YVf//9evjrl0Q1RDwaf/+ZTceMz349hOrht8vX/778QPFiD9/Ll6/w/Tr33+sGrACTmYmJiUudqxyrBISTJycyCKMLCzaGipMzmK8WDUwsrIKuLszMjHB+Iz8zs5p2nKMn3//TT3/6PDbL7h88v3aNUiwFtoZVqiJAwD0GVjY1/MMFgAAAABJRU5ErkJggg=="
 small_icon_data = "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAIAAACQkWg2AAABgGlDQ1BzUkdCIElFQzYxOTY2LTIuMQAAKJF1kc8rRFEUxz8zyK8RxYKyeGlYIT9qYqOMhJo0jVEGmzfPmxk1P17vzSTZKltFiY1fC/4CtspaKSIla7bEBj3neWokc2/3ns/93nNO554L3mhay1jlPZDJ5s3IWFCZic0qlU/UUC1ToUXVLGM4HA5Rcrzd4HHsVZeTq7Tfv6N2Qbc08FQJD2mGmRceFw4t5Q2HN4WbtJS6IHws3GlKgcLXjh53+dHhpMsfDpvRyAh4G4SV5C+O/2ItZWaE5eX4M+mC9lOP8xKfnp2eEtsmqxWLCGMEpRcTjDJCgF4GZQ/QRR/dcqJEfM93/CQ5idVkN1jGZJEkKfJ0ilqQ7LrYhOi6zDTLTv//9tVK9Pe52X1BqHiw7Zd2qNyAz3Xbft+37c8DKLuHs2wxPrcHA6+irxc1/y7Ur8LJeVGLb8HpGjTfGaqpfktlsryJBDwfQV0MGi+hZs7t2c89h7cQXZGvuoDtHegQ//r5LzmGZ9GMJUeIAAAACXBIWXMAAD2EAAA9hAHVrK90AAABk0lEQVQokY2QvS8DcRjHn99dz2lPtSep0IF4ayJqwmYQk0EkDCKxi9m/ILEwisFALBKLmMTQhEGMgiKIlxLak2vr2nvpXe/u9xjaFIlwn+3J83yePN+HOKZZNgy/KII3GJbnk9tbJUUCRE8CAIi9kf3l6b2lKa8C6+e0ks3ZH0XpvtZA1ykpUvH9QZVT3wWCiACQf0k+nexIN8ehaIwwrJLNGEXFpTRYz+Q0t6MrNjCzGBCjX0KFXOr87nDDsXSXcHX1DYSAWZTzmSfLwWhn38jcGhDyQ/gFxLujzcvEFs+R+PhC++AE809GQrqGZ/2CIKuunEpWQ/8Ny/Hh1p5IkAVb9yQg0oL8KquuoX4AgO/XCUKqi8pG4fpgVVXkcIAJt3T+EDJXRzeJdUvLUdeGusag2GzqBTUvaSYVBVYvQzQ+CrW3OpaRWJlkfHyke0iTn7PpRx+hlo2Wg2KoQYh09I/NN7X1Vw5ARMw+np7tLtmmXimpYxvKu5K+1fNvSCl+oyrkni+csokeqJ2k+3jh348BwCdrQQqylQue3gAAAABJRU5ErkJggg=="
 large_icon_data = "iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAIAAAD8GO2jAAABgGlDQ1BzUkdCIElFQzYxOTY2LTIuMQAAKJF1kc8rRFEUxz8zyK8RxYKyeGlYIT9qYqOMhJo0jVEGmzfPmxk1P17vzSTZKltFiY1fC/4CtspaKSIla7bEBj3neWokc2/3ns/93nNO554L3mhay1jlPZDJ5s3IWFCZic0qlU/UUC1ToUXVLGM4HA5Rcrzd4HHsVZeTq7Tfv6N2Qbc08FQJD2mGmRceFw4t5Q2HN4WbtJS6IHws3GlKgcLXjh53+dHhpMsfDpvRyAh4G4SV5C+O/2ItZWaE5eX4M+mC9lOP8xKfnp2eEtsmqxWLCGMEpRcTjDJCgF4GZQ/QRR/dcqJEfM93/CQ5idVkN1jGZJEkKfJ0ilqQ7LrYhOi6zDTLTv//9tVK9Pe52X1BqHiw7Zd2qNyAz3Xbft+37c8DKLuHs2wxPrcHA6+irxc1/y7Ur8LJeVGLb8HpGjTfGaqpfktlsryJBDwfQV0MGi+hZs7t2c89h7cQXZGvuoDtHegQ//r5LzmGZ9GMJUeIAAAACXBIWXMAAD2EAAA9hAHVrK90AAAD80lEQVRIibWVz28bRRTH3+wP79retRN741hJnDR12kZNQWkaoCoNqIJDoqiKVPXS8uOAVHEB+k9wAnHhwg0BqsSFA79CqThFVOLQ1KE0bYrIL8e1nTTrZL1e7++d4bDBoc6vVtp8LzPzZt77zHuzM4sIIXatFhJFOBxRAFCanl65ffuQAEAIUZaXvzx3ri7L5BCECCEAcP/GjeU73x2fuMgJibbscDSZCSqBLYCtV3/7ZAIAbBezDHXiwnvHXn83EADlN+rqAgBgQmbzSkW1qqVHgUTfBgCAi8mt3OpQNiHFOKUYGIDxGz4mRYSWsTPIH1raRmHmZmZwFBDa6WOqsibnzZrs2abnmNi1o8lMsvd0KBLfuXjrDADAs83H934tP5zayN8jGANANNmV6H4xmuxyrbpt1BxDNdX1jfIScnUA0CwscJSfelXHqdZo9vzVY6+907SnbUBD6trC/Z8+Ux4/bLKvVt1UjClsOCmRCYfQg6I90BkCgJm8daorxNIIAI68cmlg7KMDAABACC7kJv+Z+tpU5YZR0XE8TFkuYWhgKKTbOBKiNAubDpEEGgAcjxgOeWn8/b6Rtw4A+MKus5L7ubI0Q7BHsEfRDB9PhePtvCgBQthzPNsszf2+sTgNAKqB55/Yg908w7AXrn/Lx6SDAc+oQm5y5odP11W3Pcb49e89e/nk6Af+LLWf67MpMzTec3o0HWcap1vITfqfSTAAAOh/4xpFs37fw6DV9XqlECSAE5PxzhNVA88WrYUnNkODujrvTzGBAABAkHriK7PxTs4fGtU1vxNMBgCgb5b/P0QU7XcCy0CrFOSaV6q60RDV0coEDDCUNasmSyItif/F5SJ+J4AS6ZvlP766jvFT96k1c2qLtK9nyTXrNBcJhUU2HNs1tFKcm731hVNbdz2yJDvpOBMPU5yYFKTuPQGE4Pmpbwp/3jSUtYaRYlhOSPKixItJTkjom2Wl9MjSFIRAs7DtkkSUzqbYQsWlEXS8MNhw3AXw4JfP83e+bzJi1zGU1fxKMRWjDZswNLA0KlfdjhZG4Ki7ZTMRpRkK9baxFMNlX72yvbOmQPVKYWX6x72KZnsEAFQT1y0CABXN8+29bazhEACItHYMX/k4lu7bMwN5MUcI9mvSfeZiZmgcO7apVTbzf8mLd7vQIhDSJtD+s9OdYAEgFG05fjQrpI4mMifT/SOIfipmM0ApzgFCPcMTfSNvN55cAEj3nwcAx9RMVbZ1xa5v2roabmmPpft4UYK91Qyolv4+8vKlgbEPd13N8gLLC/uE26nmM+Bjbf1vXnuuEM8H6D17mWb5AAHNfzTHUHe9U4EBCMaICuyJBYB/AYK3GvaVRxKXAAAAAElFTkSuQmCC"
 
-# import and modification functions in background
-
-# import user input
-def import_conllu(text):
-    lines = [ln for ln in text.strip().splitlines()]
-    comments = [ln for ln in lines if ln.startswith('#')]
-    token_lines = []
-    for ln in lines:
-        if ln.strip() == '' or ln.startswith('#'):
-            continue
-        cols = ln.split('\t')
-        if len(cols) < 10:
-            # pad columns to 10
-            cols += ['_'] * (10 - len(cols))
-        # token id
-        id_field = cols[0]
-        is_span = '-' in id_field
-        token_lines.append({'raw': ln, 'cols': cols, 'is_span': is_span, 'id': id_field})
-    return {'comments': comments, 'token_lines': token_lines}
-
-# take token-id given by user and find correct token line
-def find_token_index_by_id(token_lines, id_str):
-    for tok_ind, tok in enumerate(token_lines):
-        if tok['is_span']:
-            continue
-        if tok['id'] == str(id_str):
-            return tok_ind
-    return None
-
-def format_token_line(cols):
-    return '\t'.join(cols)
-
-# integrate heads and dependency relations from user input
-def update_heads_and_deps(token_lines, id_map):
-    for tok in token_lines:
-        if tok['is_span']:
-            continue
-        cols = tok['cols']
-        head = cols[6]
-        if head != '_' and head in id_map:
-            cols[6] = id_map[head]
-        deps = cols[8]
-        if deps != '_' and deps.strip() != '':
-            parts = deps.split('|') if '|' in deps else deps.split(';') if ';' in deps else deps.split(' ')
-            newparts = []
-            for part in parts:
-                part = part.strip()
-                if part == '':
-                    continue
-                if ':' in part:
-                    core_rel, relation = part.split(':',1)
-                    if core_rel in id_map:
-                        core_rel = id_map[core_rel]
-                    newparts.append(f"{core_rel}:{relation}")
-                else:
-                    if part in id_map:
-                        newparts.append(id_map[part])
-                    else:
-                        newparts.append(part)
-            cols[8] = '|'.join(newparts)
-        tok['cols'] = cols
 
 # functions to build the GUI for annotation
 
@@ -92,6 +49,47 @@ class CoBraAnnotator(tk.Tk):
 
         self.create_widgets()
         self.token_data = None
+        self.output_data = None
+        # whole-document mode: indexed .conllu file and number of the current sentence
+        self.document = None
+        self.sent_ind = None
+        # journal of the open document (see session_journal.py), current text of the sentences it changes,
+        # sentence the working sentence belongs to and the text the current sentence was shown with
+        self.journal = None
+        self.edited = {}
+        self.journal_sent = None
+        self.shown_text = None
+        self.sync_pending = False
+        self.protocol('WM_DELETE_WINDOW', self.close)
+        # new spans queued to be integrated together with the loaded one, and the input they were queued for
+        self.pending_spans = []
+        self.pending_text = None
+        # working sentence: self.token_data with the integrations so far, parsed from the input text loaded_text
+        # integrations are kept as structural diffs on an undo and a redo stack; fields_diff is the diff of the
+        # loaded fields, which is replaced if they are applied again
+        self.loaded_text = None
+        self.history = deque(maxlen=history_size)
+        self.redo_history = []
+        self.fields_diff = None
+        # constituent suggestions for the loaded compound (see compound_splitter.py), without an overview none
+        # (the reason is shown in place of the suggestions)
+        self.splitter_error = ''
+        try:
+            self.splitter = load_splitter()
+        except (OSError, ValueError) as e:
+            self.splitter = None
+            self.splitter_error = f'No split suggestions: {e}'
+        self.split_suggestions = []
+        self.split_ind = 0
+        self.split_label.config(text=self.splitter_error)
+        # live validation of the sentence with the loaded fields integrated: checked in a worker thread,
+        # the main loop only gets the markers ({(field row, column index): message}) and messages back
+        self.validation_job = None
+        self.validation_count = 0
+        self.validation_pending = None
+        self.validation_requests = queue.Queue()
+        self.validation_results = queue.Queue()
+        threading.Thread(target=self.validation_worker, daemon=True).start()
 
     def create_widgets(self):
         # main frame
@@ -99,6 +97,9 @@ class CoBraAnnotator(tk.Tk):
         top.pack(fill='x', padx=8, pady=8)
         # paste-field label
         ttk.Label(top, text='Paste the .conllu sentence here:').grid(row=0,column=0,sticky='w')
+        # current file and sentence in whole-document mode
+        self.document_label = ttk.Label(top, text='')
+        self.document_label.grid(row=0,column=1,sticky='w',padx=16)
         # user input field
         self.input_text = tk.Text(self, width=80, height=18)
         self.input_text.pack(side='left', padx=8, pady=4, fill='both', expand=True)
@@ -144,9 +145,33 @@ class CoBraAnnotator(tk.Tk):
         ttk.Checkbutton(control_frame, text='Update token IDs after integration:', variable=self.renumber_var).pack(pady=6)
         # buttons in middle console panel
         ttk.Button(control_frame, text='Load fields', command=self.load_fields).pack(fill='x', pady=6)
+        ttk.Button(control_frame, text='Next split suggestion', command=self.next_split).pack(fill='x', pady=6)
+        self.split_label = ttk.Label(control_frame, text='')
+        self.split_label.pack()
+        ttk.Button(control_frame, text='Queue compound', command=self.queue_span).pack(fill='x', pady=6)
+        self.pending_label = ttk.Label(control_frame, text='')
+        self.pending_label.pack()
         ttk.Button(control_frame, text='Apply and integrate', command=self.apply_changes).pack(fill='x', pady=6)
+        undo_frame = ttk.Frame(control_frame)
+        undo_frame.pack(fill='x', pady=4)
+        ttk.Button(undo_frame, text='Undo', command=self.undo).pack(side='left', expand=True, fill='x')
+        ttk.Button(undo_frame, text='Redo', command=self.redo).pack(side='left', expand=True, fill='x')
         ttk.Button(control_frame, text='Copy to clipboard', command=self.copy_to_clipboard).pack(fill='x', pady=6)
         ttk.Button(control_frame, text='Clear', command=self.clear_all).pack(fill='x', pady=6)
+        # whole-document mode: open a .conllu file, move between its sentences, write integrated sentences back
+        ttk.Separator(control_frame, orient='horizontal').pack(fill='x', pady=6)
+        ttk.Button(control_frame, text='Open .conllu file', command=self.open_document).pack(fill='x', pady=6)
+        nav_frame = ttk.Frame(control_frame)
+        nav_frame.pack(fill='x', pady=4)
+        ttk.Button(nav_frame, text='< Previous', command=self.previous_sentence).pack(side='left', expand=True, fill='x')
+        ttk.Button(nav_frame, text='Next >', command=self.next_sentence).pack(side='left', expand=True, fill='x')
+        ttk.Label(control_frame, text='Go to sent_id').pack()
+        self.goto_var = tk.StringVar(value='')
+        goto_entry = ttk.Entry(control_frame, textvariable=self.goto_var, width=8)
+        goto_entry.pack(pady=4)
+        goto_entry.bind('<Return>', lambda e: self.goto_sentence())
+        ttk.Button(control_frame, text='Go', command=self.goto_sentence).pack(fill='x', pady=4)
+        ttk.Button(control_frame, text='Write back to file', command=self.write_back).pack(fill='x', pady=6)
         # right console for new annotations
         right_frame = ttk.Frame(self)
         right_frame.pack(side='right', fill='both', expand=True, padx=8, pady=4)
@@ -162,11 +187,16 @@ class CoBraAnnotator(tk.Tk):
         self.fields_scroll_y = ttk.Scrollbar(right_frame, orient='vertical', command=self.fields_canvas.yview)
         self.fields_scroll_y.pack(side='right', fill='y')
 
-        self.fields_canvas.configure(yscrollcommand=self.fields_scroll_y.set, xscrollcommand=self.fields_scroll_x.set)
+        self.fields_canvas.configure(yscrollcommand=self.fields_scrolled, xscrollcommand=self.fields_scroll_x.set)
 
         self.fields_inner = ttk.Frame(self.fields_canvas)
         self.fields_canvas.create_window((0,0), window=self.fields_inner, anchor='nw')
         self.fields_inner.bind('<Configure>', lambda e: self.fields_canvas.configure(scrollregion=self.fields_canvas.bbox('all')))
+        self.fields_canvas.bind('<Configure>', lambda e: self.show_visible_rows())
+        # problems found by the live validation, their fields are marked red
+        ttk.Style(self).configure('Invalid.TEntry', foreground='red', fieldbackground='#ffd6d6')
+        self.validation_label = ttk.Label(right_frame, text='', foreground='red', justify='left')
+        self.validation_label.pack(anchor='w')
         # output field for integrated sentence in .conllu
         ttk.Label(right_frame, text='Annotated sentence (output):').pack(anchor='w', pady=(8,0))
         self.output_text = tk.Text(right_frame, width=60, height=12)
@@ -174,6 +204,14 @@ class CoBraAnnotator(tk.Tk):
 
         self.span_entries = {}
         self.const_entries = []
+        # field rows (title and the values of their entries as StringVars) and the row widgets: only the rows
+        # in view of the canvas have widgets, taken from a pool and bound to the values of their row
+        self.field_rows = []
+        self.row_pool = []
+        self.shown_rows = {}
+        self.row_height = None
+        self.row_width = None
+        self.markers = {}
 
     # toggle switch function
     def switch(self):
@@ -196,11 +234,15 @@ class CoBraAnnotator(tk.Tk):
         if confirm:
             self.input_text.delete('1.0', 'end')
             self.output_text.delete('1.0', 'end')
-            for w in self.fields_inner.winfo_children():
-                w.destroy()
+            self.set_field_rows([])
             self.span_entries = {}
             self.const_entries = []
             self.token_data = None
+            self.output_data = None
+            self.loaded_text = None
+            self.journal_sent = None
+            self.reset_history()
+            self.clear_pending()
             # reset defaults
             self.start_id_var.set('0')
             self.const_count_var.set(3)
@@ -213,12 +255,17 @@ class CoBraAnnotator(tk.Tk):
         if not raw:
             messagebox.showwarning('Input missing', 'Please paste a sentence in .conllu format into the input field.')
             return
-        try:
-            parsed = import_conllu(raw)
-            self.token_data = parsed
-        except Exception as e:
-            messagebox.showerror('Input error', str(e))
-            return
+        # go on with the working sentence as long as the input is the same, start ids as in the output
+        if self.token_data is None or raw != self.loaded_text:
+            try:
+                parsed = import_conllu(raw)
+                self.token_data = parsed
+            except Exception as e:
+                messagebox.showerror('Input error', str(e))
+                return
+            self.loaded_text = raw
+            self.reset_history()
+            self.journal_load(raw)
 
         start_id = self.start_id_var.get().strip()
         if not start_id.isdigit():
@@ -226,313 +273,550 @@ class CoBraAnnotator(tk.Tk):
             return
         n_const = int(self.const_count_var.get())
 
-        idx = find_token_index_by_id(self.token_data['token_lines'], start_id)
+        idx = find_token_index_by_id(self.token_data, start_id)
         if idx is None:
             messagebox.showerror('Token not found', f'Token id {start_id} not found.')
             return
 
         orig_token = self.token_data['token_lines'][idx]
+        # queued compounds belong to the input they were queued for
+        if self.pending_spans and raw != self.pending_text:
+            self.clear_pending()
 
         start_num = int(start_id)
         n_const = int(self.const_count_var.get())
         end_num = start_num + n_const - 1
 
         # clear previous UI
-        for w in self.fields_inner.winfo_children():
-            w.destroy()
         self.span_entries = {}
         self.const_entries = []
+        self.fields_diff = None
 
+        # field rows as (title, values), values None for a row of column labels
+        rows = []
         # if self.annotate_existing_var.get():
         if self.annotate_existing_var:
             # if existing span is hyphenated add const+(const-2) of rows to cover entire span
             if self.hyphenated_var.get():
-                end_num_hyph = end_num + (n_const-1)
-                # annotate existing span
-                span_frame = ttk.LabelFrame(self.fields_inner, text='Existing tokens to annotate')
-                span_frame.pack(fill='x', pady=4, padx=4)
-
-                for i_col, colname in enumerate(column_names):
-                    ttk.Label(span_frame, text=colname).grid(row=0, column=i_col, sticky='w')
-
-                # load existing tokens directly
-                for j, tok_idx in enumerate(range(start_num, end_num_hyph + 1)):
-                    token = next((t for t in self.token_data['token_lines'] if t['id'] == str(tok_idx)), None)
-                    if token is None:
-                        messagebox.showerror('Token missing', f'Token ID {tok_idx} not found in input.')
-                        return
-
-                    fr = ttk.LabelFrame(self.fields_inner, text=f'Token {tok_idx}')
-                    fr.pack(fill='x', pady=4, padx=4)
-                    entrow = {}
-                    for i_col, col in enumerate(column_names):
-                        ttk.Label(fr, text=col).grid(row=0, column=i_col, sticky='w')
-                        entry = ttk.Entry(fr, width=12)
-                        entry.grid(row=1, column=i_col, padx=2, pady=2)
-                        # leave misc empty for annotation, extend deprel if compound with extension
-                        # inherit all else
-                        if col not in ("DEPREL", "MISC"):
-                            entry.insert(0, token['cols'][i_col])
-                        elif col == "DEPREL" and token['cols'][i_col] == "compound":
-                            entry.insert(0, "compound:nmod")
-                        elif col == "DEPREL" and token['cols'][i_col] != "compound":
-                            entry.insert(0, token['cols'][i_col])
-                        entrow[col] = entry
-                    self.const_entries.append({'frame': fr, 'entries': entrow})
-            # no hyphens:
-            else:
-                # annotate existing span
-                span_frame = ttk.LabelFrame(self.fields_inner, text='Existing tokens to annotate')
-                span_frame.pack(fill='x', pady=4, padx=4)
-
-                for i_col, colname in enumerate(column_names):
-                    ttk.Label(span_frame, text=colname).grid(row=0, column=i_col, sticky='w')
-
-                # load existing tokens directly
-                for j, tok_idx in enumerate(range(start_num, end_num + 1)):
-                    token = next((t for t in self.token_data['token_lines'] if t['id'] == str(tok_idx)), None)
-                    if token is None:
-                        messagebox.showerror('Token missing', f'Token ID {tok_idx} not found in input.')
-                        return
-
-                    fr = ttk.LabelFrame(self.fields_inner, text=f'Token {tok_idx}')
-                    fr.pack(fill='x', pady=4, padx=4)
-                    entrow = {}
-                    for i_col, col in enumerate(column_names):
-                        print(col, token['cols'][i_col])
-                        ttk.Label(fr, text=col).grid(row=0, column=i_col, sticky='w')
-                        entry = ttk.Entry(fr, width=12)
-                        entry.grid(row=1, column=i_col, padx=2, pady=2)
-                        # leave misc empty for annotation and extend compound deprels by extension label :nmod
-                        # inherit all else
-                        if col not in ("DEPREL", "MISC"):
-                            entry.insert(0, token['cols'][i_col])
-                        elif col == "DEPREL" and token['cols'][i_col] == "compound" and j != n_const-1:
-                            entry.insert(0, "compound:nmod")
-                        elif col == "DEPREL" and token['cols'][i_col] == "compound" and j == n_const-1:
-                            entry.insert(0, "compound")
-                        elif col == "DEPREL" and token['cols'][i_col] != "compound":
-                            entry.insert(0, token['cols'][i_col])
-                        entrow[col] = entry
-                    self.const_entries.append({'frame': fr, 'entries': entrow})
+                end_num = end_num + (n_const-1)
+            # annotate existing span
+            rows.append(('Existing tokens to annotate', None))
+            # load existing tokens directly
+            for j, tok_idx in enumerate(range(start_num, end_num + 1)):
+                tok_ind = find_token_index_by_id(self.token_data, tok_idx)
+                if tok_ind is None:
+                    self.set_field_rows([])
+                    messagebox.showerror('Token missing', f'Token ID {tok_idx} not found in input.')
+                    return
+                token = self.token_data['token_lines'][tok_ind]
+                values = []
+                for i_col, col in enumerate(column_names):
+                    # leave misc empty for annotation and extend compound deprels by extension label :nmod
+                    # (with hyphens all of them, else all but the last), inherit all else
+                    if col == "MISC":
+                        values.append('')
+                    elif col == "DEPREL" and token['cols'][i_col] == "compound" and (self.hyphenated_var.get() or j != n_const-1):
+                        values.append("compound:nmod")
+                    else:
+                        values.append(token['cols'][i_col])
+                rows.append((f'Token {tok_idx}', values))
+            self.const_entries = [{'entries': row_vars} for row_vars in self.set_field_rows(rows)[1:]]
         # new-span setting
         else:
-            id_range = f"{start_num}-{end_num}"
-            span_frame = ttk.LabelFrame(self.fields_inner, text='Compound span row')
-            span_frame.pack(fill='x', pady=4, padx=4)
-            for i_col, colname in enumerate(column_names):
-                ttk.Label(span_frame, text=colname).grid(row=0, column=i_col, sticky='w')
-            entries_row = {}
-            for i_col, colname in enumerate(column_names):
-                ent = ttk.Entry(span_frame, width=12)
-                ent.grid(row=1, column=i_col, padx=2, pady=2)
-                if colname == 'ID':
-                    ent.insert(0, id_range)
-                elif colname == "HEAD" and int(orig_token['cols'][i_col]) > start_num:
-                    ent.insert(0, str(int(orig_token['cols'][i_col])+(n_const-1)))
-                else:
-                    ent.insert(0, orig_token['cols'][i_col] if i_col < len(orig_token['cols']) else '_')
-                entries_row[colname] = ent
-            self.span_entries = entries_row
-
-            # create empty const frames
-            for j_range, j in enumerate(range(n_const)):
-                fr = ttk.LabelFrame(self.fields_inner, text=f'Constituent {j + 1}')
-                fr.pack(fill='x', pady=4, padx=4)
-                entrow = {}
-                # create entry rows according to user settings
-                # inherit deprels and heads or adjust them
-                for i_col, col in enumerate(column_names):
-                    ttk.Label(fr, text=col).grid(row=0, column=i_col, sticky='w')
-                    entry = ttk.Entry(fr, width=12)
-                    entry.grid(row=1, column=i_col, padx=2, pady=2)
-                    if col == 'ID':
-                        entry.insert(0, str(start_num + j_range))
-                    elif col in ("UPOS", "XPOS", "FEATS", "DEPS"):
-                        entry.insert(0, orig_token['cols'][i_col])
-                    elif col == "DEPREL" and j != n_const-1:
-                        entry.insert(0, "compound:nmod")
-                    elif col == "DEPREL" and j == n_const-1:
-                        entry.insert(0, orig_token['cols'][i_col])
-                    elif col == "HEAD" and j == n_const-1 and int(orig_token['cols'][i_col]) > start_num:
-                        entry.insert(0, str((int(orig_token['cols'][i_col])+(n_const-1))))
-                    elif col == "HEAD" and j == n_const - 1 and int(orig_token['cols'][i_col]) <= start_num:
-                        entry.insert(0, str(int(orig_token['cols'][i_col])))
-                    entrow[col] = entry
-                self.const_entries.append({'frame': fr, 'entries': entrow})
-        # load un-annotated user input into the output box to be updated later
-        self.output_text.delete('1.0','end')
-        self.output_text.insert('1.0', raw)
+            rows.append(('Compound span row', span_defaults(orig_token['cols'], start_num, n_const)))
+            # const rows prefilled with inherited tags, deprels and heads (see constituent_defaults)
+            # and with FORM and LEMMA of the best split of the compound
+            self.split_suggestions = []
+            if self.splitter is not None:
+                self.split_suggestions = split_compound(self.splitter, orig_token['cols'][1], n_const, orig_token['cols'][2])
+            self.split_ind = 0
+            const_rows = constituent_defaults(orig_token['cols'], start_num, n_const)
+            if self.split_suggestions:
+                for const_row, (form, lemma) in zip(const_rows, self.split_suggestions[0]):
+                    const_row[1:3] = [form, lemma]
+            for j, const_row in enumerate(const_rows):
+                rows.append((f'Constituent {j + 1}', const_row))
+            row_vars = self.set_field_rows(rows)
+            self.span_entries = row_vars[0]
+            self.const_entries = [{'entries': entries} for entries in row_vars[1:]]
+        self.show_split()
+        # load un-annotated user input (or the working sentence) into the output box to be updated later
+        if self.history:
+            self.show_output()
+        else:
+            self.output_text.delete('1.0','end')
+            self.output_text.insert('1.0', raw)
+
+    # fill FORM and LEMMA of the constituents with the next split suggestion
+    def next_split(self):
+        if len(self.split_suggestions) < 2 or self.annotate_existing_var:
+            return
+        self.split_ind = (self.split_ind + 1) % len(self.split_suggestions)
+        for con_ent, (form, lemma) in zip(self.const_entries, self.split_suggestions[self.split_ind]):
+            con_ent['entries']['FORM'].set(form)
+            con_ent['entries']['LEMMA'].set(lemma)
+        self.show_split()
+
+    def show_split(self):
+        if self.split_suggestions and not self.annotate_existing_var:
+            self.split_label.config(text=f'split {self.split_ind + 1} of {len(self.split_suggestions)}')
+        else:
+            self.split_label.config(text=self.splitter_error)
+
+    # a row widget: label frame with a label and an entry per column
+    def make_row_widget(self):
+        frame = ttk.LabelFrame(self.fields_inner, text='Constituent 1')
+        entries = []
+        for i_col, col in enumerate(column_names):
+            ttk.Label(frame, text=col).grid(row=0, column=i_col, sticky='w')
+            entry = ttk.Entry(frame, width=12)
+            entry.grid(row=1, column=i_col, padx=2, pady=2)
+            entries.append(entry)
+        return {'frame': frame, 'entries': entries}
+
+    # replace the field rows by rows of (title, values), values None for a row of column labels only
+    # returns the values of every row as {column name: StringVar} (None for label rows)
+    def set_field_rows(self, rows):
+        for row_ind in list(self.shown_rows):
+            self.hide_row(row_ind)
+        self.field_rows = []
+        for title, values in rows:
+            row_vars = None
+            if values is not None:
+                row_vars = {col: tk.StringVar(self, value) for col, value in zip(column_names, values)}
+                for var in row_vars.values():
+                    var.trace_add('write', lambda *args: self.schedule_validation())
+            self.field_rows.append((title, row_vars))
+        # all rows have the size of the first row widget
+        if self.row_height is None:
+            widget = self.make_row_widget()
+            widget['frame'].update_idletasks()
+            self.row_height = widget['frame'].winfo_reqheight() + 8
+            self.row_width = widget['frame'].winfo_reqwidth() + 8
+            self.row_pool.append(widget)
+        self.fields_inner.configure(width=self.row_width, height=max(1, len(self.field_rows) * self.row_height))
+        self.fields_canvas.yview_moveto(0)
+        self.markers = {}
+        self.show_visible_rows()
+        self.schedule_validation()
+        return [row_vars for title, row_vars in self.field_rows]
+
+    # y scrolling of the fields: move the scrollbar and show the rows now in view
+    def fields_scrolled(self, first, last):
+        self.fields_scroll_y.set(first, last)
+        self.show_visible_rows()
+
+    # give the rows in view of the canvas a widget, return the widgets of the others to the pool
+    def show_visible_rows(self):
+        if self.row_height is None:
+            return
+        top = self.fields_canvas.canvasy(0)
+        bottom = self.fields_canvas.canvasy(self.fields_canvas.winfo_height())
+        first = max(0, int(top // self.row_height))
+        last = min(len(self.field_rows), int(bottom // self.row_height) + 1)
+        for row_ind in list(self.shown_rows):
+            if not first <= row_ind < last:
+                self.hide_row(row_ind)
+        for row_ind in range(first, last):
+            if row_ind not in self.shown_rows:
+                self.show_row(row_ind)
+
+    def show_row(self, row_ind):
+        widget = self.row_pool.pop() if self.row_pool else self.make_row_widget()
+        title, row_vars = self.field_rows[row_ind]
+        widget['frame'].configure(text=title)
+        for i_col, (col, entry) in enumerate(zip(column_names, widget['entries'])):
+            if row_vars is None:
+                entry.grid_remove()
+            else:
+                entry.configure(textvariable=row_vars[col], style='Invalid.TEntry' if (row_ind, i_col) in self.markers else 'TEntry')
+                entry.grid()
+        widget['frame'].place(x=4, y=row_ind * self.row_height + 4, width=self.row_width - 8)
+        self.shown_rows[row_ind] = widget
+
+    def hide_row(self, row_ind):
+        widget = self.shown_rows.pop(row_ind)
+        widget['frame'].place_forget()
+        self.row_pool.append(widget)
+
+    # read the entry rows, asking whether empty fields should stay empty (None if the annotator wants to go on editing)
+    def collect_rows(self, entry_rows, row_name):
+        rows = []
+        for row_ind, entries in enumerate(entry_rows):
+            row = []
+            for cname in column_names:
+                val = entries[cname].get().strip()
+                # confirm missing values
+                if val == '':
+                    missing = messagebox.askyesno(cname + ' missing', cname + ' missing in ' + row_name(row_ind) + ', do you want to leave ' + cname + ' empty? Click no to continue annotation or yes to parse output.')
+                    if not missing:
+                        return None
+                row.append(val)
+            rows.append(row)
+        return rows
+
+    # start id, span row and constituent rows of the loaded fields (None if the annotator wants to go on editing)
+    def collect_span(self):
+        start_id = self.start_id_var.get().strip()
+        if find_token_index_by_id(self.token_data, start_id) is None:
+            messagebox.showerror('Not found', 'Start token not found. Reload fields and try again.')
+            return None
+        span_rows = None
+        if not self.annotate_existing_var:
+            span_rows = self.collect_rows([self.span_entries], lambda row_ind: 'span row')
+            if span_rows is None:
+                return None
+        const_rows = self.collect_rows([con_ent['entries'] for con_ent in self.const_entries],
+                                       lambda row_ind: 'constituent ' + str(row_ind + 1))
+        if const_rows is None:
+            return None
+        return start_id, span_rows[0] if span_rows else None, const_rows
+
+    def clear_pending(self):
+        self.pending_spans = []
+        self.pending_text = None
+        self.pending_label.config(text='')
+
+    # keep the loaded compound to integrate it together with the next ones in one go
+    # (start ids of all queued compounds refer to the input sentence)
+    def queue_span(self):
+        if self.token_data is None:
+            messagebox.showwarning('No data', 'Load fields first.')
+            return
+        if self.annotate_existing_var:
+            messagebox.showwarning('Existing span', 'Only new token-spans can be queued.')
+            return
+        if self.history and self.history[-1] is self.fields_diff:
+            messagebox.showwarning('Already integrated', 'This compound is integrated already. Load the fields of the next one.')
+            return
+        span = self.collect_span()
+        if span is None:
+            return
+        # a compound queued again for the same start token replaces the earlier one
+        self.pending_spans = [pending for pending in self.pending_spans if pending[0] != span[0]] + [span]
+        self.pending_text = self.input_text.get('1.0','end').strip()
+        self.pending_label.config(text=f"{len(self.pending_spans)} queued (start ids {', '.join(pending[0] for pending in self.pending_spans)})")
+        self.schedule_validation()
+
     # apply changes to the output .conllu
     def apply_changes(self):
         if self.token_data is None:
             messagebox.showwarning('No data', 'Load fields first.')
             return
 
-        new_token_lines = copy.deepcopy(self.token_data['token_lines'])
-
-        start_id = self.start_id_var.get().strip()
-        # start id = idx
-        idx = find_token_index_by_id(new_token_lines, start_id)
-        if idx is None:
-            messagebox.showerror('Not found', 'Start token not found. Reload fields and try again.')
+        # fields applied before (and not undone): apply them again instead of on top of their last integration
+        reapply = self.history and self.history[-1] is self.fields_diff
+        if reapply:
+            revert_diff(self.token_data, self.fields_diff)
+        span = self.collect_span()
+        if span is None:
+            if reapply:
+                apply_diff(self.token_data, self.fields_diff)
             return
-        orig_token = self.token_data['token_lines'][idx]
-        # early return for existing-span-mode without renumbering
-        # all the following span functionalities get skipped bc not necessary
-        # if self.annotate_existing_var.get():
+        if reapply:
+            self.history.pop()
+            self.journal_record({'op': 'undo'})
+        start_id, span_row, const_rows = span
+        # existing-span mode: tokens annotated in place, ids and heads stay as they are
         if self.annotate_existing_var:
-            for condictent_ind, con_dict_entry in enumerate(self.const_entries):
-                cols = []
-                for cname_ind, cname in enumerate(column_names):
-                    val = con_dict_entry['entries'][cname].get().strip()
-                    # confimr missing values
-                    if val == '' or val is None:
-                        missing = messagebox.askyesno(cname + ' missing', cname + ' missing in constituent ' + str(
-                            condictent_ind + 1) + ', do you want to leave ' + cname + ' empty? Click no to continue annotation or yes to parse output.')
-                        if not missing:
-                            return
-                    if cname == "MISC":
-                        cols.append(val+"|"+orig_token['cols'][cname_ind] if val != '' else '_'+"|"+orig_token['cols'][cname_ind])
-                    else:
-                        cols.append(val if val != '' else '_')
-                # find token in original by ID
-                target_id = cols[0]
-                for tok in new_token_lines:
-                    if not tok['is_span'] and tok['id'] == target_id:
-                        tok['cols'] = cols
-                        break
-
-            # prepare for output/ Ids/haeds don't get updated here
-            out_lines = []
-            for c in self.token_data['comments']:
-                out_lines.append(c)
-            for t in new_token_lines:
-                out_lines.append(format_token_line(t['cols']))
-            # show outputs
-            final_text = '\n'.join(out_lines)
-            self.output_text.delete('1.0', 'end')
-            self.output_text.insert('1.0', final_text)
-            return
-
-        # collect entries
-        span_cols = []
-        for colname in column_names:
-            print(colname)
-            val = self.span_entries[colname].get().strip()
-            # confimr missing values
-            if val == '' or val is None:
-                missing = messagebox.askyesno(colname + ' missing', colname +' missing in span row, do you want to leave ' + colname + ' empty? Click no to continue annotation or yes to parse output.')
-                if not missing:
-                    return
-            span_cols.append(val if val != '' else '_')
-        span_line = {'cols': span_cols, 'is_span': True, 'id': span_cols[0]}
-
-        const_dicts = []
-        for conent_ind, con_ent in enumerate(self.const_entries):
-            cols = []
-            for cname in column_names:
-                val = con_ent['entries'][cname].get().strip()
-                # confimr missing values
-                if val == '' or val is None:
-                    missing = messagebox.askyesno(cname + ' missing', cname +' missing in constituent ' + str(conent_ind + 1) + ', do you want to leave ' + cname + ' empty? Click no to continue annotation or yes to parse output.')
-                    if not missing:
-                        return
-                cols.append(val if val != '' else '_')
-            const_dicts.append({'cols': cols, 'is_span': False, 'id': int(cols[0])})
-        # remove old start-token-line, add new start-token-line and constituen lines
-        new_token_lines.pop(idx)
-        new_token_lines.insert(idx, span_line)
-        for j, con_dict_entry in enumerate(const_dicts):
-            new_token_lines.insert(idx + 1 + j, con_dict_entry)
-
-
-        # update ids
-        if self.renumber_var.get():
-            # old_ids = [t['id'] for t in new_token_lines]
-            # id_map = {}
-            # newnum = 1
-            # for old_ind, old in enumerate(old_ids):
-            #     # existing spans
-            #     if type(old) == str and '-' in old:
-            #         id_map[old] = old
-            #         print('old: ', old)
-            #     # individual new const tok ids
-            #     else:
-            #         # bc of new const ids inserted the newnum counter will be + const-count minus 1 from last new tok
-            #         # thereby upping all subsequent tok ids by the respective amount
-            #         # first check if old is a span unrelated to current compound
-            #         if type(old_ids[old_ind-1]) == str and '-' in old_ids[old_ind-1] and not old_ids[old_ind-1].startswith(start_id + '-'):
-            #             span_match = re.match(r"(\d+)-(\d+)$", old_ids[old_ind-1])
-            #             a = ''
-            #             b = ''
-            #             if span_match:
-            #                 a, b = span_match.group(1), span_match.group(2)
-            #             diff_span = int(b)-int(a)
-            #             id_map[old] = str(newnum+1+diff_span)
-            #             newnum += (2+diff_span)
-            #             print('span-jump added', newnum)
-            #         #elif
-            #         else: # > (int(start_id) + int(self.const_count_var.get()))
-            #             id_map[old] = str(newnum)
-            #             newnum += 1
-            #             print('single tok edited', newnum)
-            for  t_ind, t in enumerate(new_token_lines):
-                print(t)
-                # map non-spans
-                if not t['is_span']:
-                    cols = t['cols']
-                    tokid = cols[0]
-                    # if head != '_' and int(head) > idx and cols[0] not in list(range(int(start_id),int(start_id)+(int(self.const_count_var.get())))): #+(int(self.const_count_var.get())-1)
-                    if tokid != '_' and int(tokid) > idx and 'raw' in t: # t_ind not in list(range(int(idx), idx + (int(self.const_count_var.get()) + 1)))
-                        t['cols'][0] = str(int(tokid) + (int(self.const_count_var.get()) - 1))
-                    # if t['id'] in id_map:
-                        # print('id in id-map: ', t['id'], id_map[t['id']])
-                        # t['id'] = id_map[t['id']]
-                        # t['cols'][0] = t['id']
-                        # print('non-span')
-                # matching spans with updated const length
-                else:
-                    span_match = re.match(r"(\d+)-(\d+)$", t['id'])
-                    a = ''
-                    b = ''
-                    if span_match:
-                        a, b = span_match.group(1), span_match.group(2)
-                    # identify current comp span
-                    if int(a) == int(start_id):
-                        t['cols'][0] = t['id']
-                        print('current')
-                    # identify all other spans unrelated to comp span
-                    #else:
-                    elif int(a) != int(start_id) and int(a) > int(start_id): # ggf mit const? + int(self.const_count_var.get())
-                        # m = re.match(r"(\d+)-(\d+)$", t['id'])
-                        # if m:
-                        #     a,b = m.group(1), m.group(2)
-                            # na = id_map.get(a, a)
-                            # nb = id_map.get(b, b)
-                        t['id'] = f"{int(a)+(int(self.const_count_var.get())-1)}-{int(b)+(int(self.const_count_var.get())-1)}"
-                        t['cols'][0] = t['id']
-                        print('other')
-            # update_heads_and_deps(new_token_lines, id_map)
-
-            # update all subsequent heads if they refer to toks after new span/start after new span
-            for  t_ind, t in enumerate(new_token_lines): #[idx+(int(self.const_count_var.get())+1):]
-                cols = t['cols']
-                head = cols[6]
-                #if head != '_' and int(head) > idx and cols[0] not in list(range(int(start_id),int(start_id)+(int(self.const_count_var.get())))): #+(int(self.const_count_var.get())-1)
-                if head != '_' and int(head) >= idx and t_ind not in list(range(int(idx), idx+(int(self.const_count_var.get())+1))):
-                    t['cols'][6] = str(int(head)+(int(self.const_count_var.get())-1))
-
-        # prepare for output
-        out_lines = []
-        for c in self.token_data['comments']:
-            out_lines.append(c)
-        for t in new_token_lines:
-            out_lines.append(format_token_line(t['cols']))
-        # show output
-        final_text = '\n'.join(out_lines)
+            diff = annotate_existing(self.token_data, start_id, const_rows)
+            self.journal_record({'op': 'apply', 'mode': 'existing', 'start_id': start_id, 'rows': const_rows})
+        else:
+            # the loaded compound and all queued ones, ids and heads renumbered once
+            integrations = [pending for pending in self.pending_spans if pending[0] != start_id] + [span]
+            diff = insert_spans(self.token_data, integrations, self.renumber_var.get())
+            self.journal_record({'op': 'apply', 'mode': 'new', 'renumber': self.renumber_var.get(),
+                                 'integrations': [list(integration) for integration in integrations]})
+            self.clear_pending()
+        self.history.append(diff)
+        self.redo_history = []
+        self.fields_diff = diff
+        self.show_output()
+
+    # show the working sentence in the output box
+    def show_output(self):
         self.output_text.delete('1.0','end')
-        self.output_text.insert('1.0', final_text)
+        self.output_text.insert('1.0', format_sentence(self.token_data['comments'], self.token_data['token_lines']))
+        # integrated sentence, not written back yet
+        self.output_data = self.token_data if self.history else None
+        self.schedule_validation()
+
+    # check the fields again once the changes pause
+    def schedule_validation(self):
+        if self.validation_job is not None:
+            self.after_cancel(self.validation_job)
+        self.validation_job = self.after(validation_delay, self.start_validation)
+
+    # hand a snapshot of the working sentence and the values of the fields to the validation worker
+    # (the worker builds the sentence text from it, the main loop only copies the columns)
+    def start_validation(self):
+        self.validation_job = None
+        self.validation_count += 1
+        rows = [[row_vars[col].get().strip() for col in column_names] for title, row_vars in self.field_rows if row_vars is not None]
+        if self.token_data is None or not rows:
+            self.validation_pending = None
+            self.show_markers({}, [])
+            return
+        # checked against the sentence before the loaded fields were integrated, if they are applied already
+        applied = self.history and self.history[-1] is self.fields_diff
+        snapshot = snapshot_sentence(self.token_data, self.fields_diff if applied else None)
+        self.validation_requests.put((self.validation_count, (snapshot, self.start_id_var.get().strip(), rows, list(self.pending_spans),
+                                                              self.renumber_var.get(), self.annotate_existing_var)))
+        if self.validation_pending is None:
+            self.after(validation_poll, self.poll_validation)
+        self.validation_pending = self.validation_count
+
+    # worker thread: check the newest request (older ones still waiting are skipped) and queue the result
+    def validation_worker(self):
+        while True:
+            count, request = self.validation_requests.get()
+            while True:
+                try:
+                    count, request = self.validation_requests.get_nowait()
+                except queue.Empty:
+                    break
+            snapshot, *fields = request
+            try:
+                result = check_integration(snapshot_text(snapshot), *fields)
+            except Exception as e:
+                result = ({}, [f'Validation failed: {e}'])
+            self.validation_results.put((count, result))
+
+    # take the result of the newest check in the main loop, look again later while it is running
+    def poll_validation(self):
+        result = None
+        while True:
+            try:
+                count, checked = self.validation_results.get_nowait()
+            except queue.Empty:
+                break
+            if count == self.validation_pending:
+                result = checked
+        if self.validation_pending is None:
+            return
+        if result is None:
+            self.after(validation_poll, self.poll_validation)
+            return
+        self.validation_pending = None
+        self.show_markers(*result)
+
+    # mark the fields with problems and list the problems below the fields
+    def show_markers(self, markers, messages):
+        self.markers = markers
+        for row_ind, widget in self.shown_rows.items():
+            for i_col, entry in enumerate(widget['entries']):
+                entry.configure(style='Invalid.TEntry' if (row_ind, i_col) in markers else 'TEntry')
+        text = '\n'.join(messages[:validation_lines])
+        if len(messages) > validation_lines:
+            text += f'\n... and {len(messages) - validation_lines} more'
+        self.validation_label.config(text=text)
+
+    def reset_history(self):
+        self.history.clear()
+        self.redo_history = []
+        self.fields_diff = None
+
+    # undo the last integration of the working sentence
+    def undo(self):
+        if self.token_data is None or not self.history:
+            return
+        diff = self.history.pop()
+        revert_diff(self.token_data, diff)
+        self.redo_history.append(diff)
+        self.journal_record({'op': 'undo'})
+        # queued start ids refer to the sentence before
+        self.clear_pending()
+        self.show_output()
+
+    # integrate the last undone integration again
+    def redo(self):
+        if self.token_data is None or not self.redo_history:
+            return
+        diff = self.redo_history.pop()
+        apply_diff(self.token_data, diff)
+        self.history.append(diff)
+        self.journal_record({'op': 'redo'})
+        self.clear_pending()
+        self.show_output()
+
+    # journal the working sentence as loaded from the current sentence of the document
+    # (with its text if that is not the current text of the sentence, e.g. edited by hand)
+    def journal_load(self, raw):
+        self.journal_sent = None
+        if self.journal is None or self.sent_ind is None:
+            return
+        self.journal_sent = self.sent_ind
+        record = {'op': 'load'}
+        if raw != self.edited.get(self.sent_ind, self.shown_text).strip():
+            record['text'] = raw
+            self.edited[self.sent_ind] = raw
+        self.journal_record(record)
+
+    # append a change of the working sentence to the journal (whole-document mode) and keep its new text
+    def journal_record(self, record):
+        if self.journal is None or self.journal_sent is None:
+            return
+        record = dict({'sent': self.journal_sent, 'sent_id': sentence_id(self.shown_text)}, **record)
+        if record['op'] != 'load':
+            self.edited[self.journal_sent] = format_sentence(self.token_data['comments'], self.token_data['token_lines'])
+        try:
+            append_record(self.journal, record)
+        except OSError as e:
+            messagebox.showerror('Journal error', str(e))
+            return
+        # records not synced yet are synced after a pause
+        if self.journal['unsynced'] and not self.sync_pending:
+            self.sync_pending = True
+            self.after(int(sync_interval * 1000), self.sync_later)
+
+    def sync_later(self):
+        self.sync_pending = False
+        if self.journal is not None:
+            sync_journal(self.journal)
+
+    def close_document(self):
+        if self.journal is not None:
+            close_journal(self.journal)
+        self.journal = None
+        self.edited = {}
+        self.journal_sent = None
+
+    def close(self):
+        self.close_document()
+        self.destroy()
+
+    # open a .conllu file: index its sentences and show the first one
+    def open_document(self):
+        path = filedialog.askopenfilename(filetypes=[('CoNLL-U', '*.conllu'), ('All files', '*.*')])
+        if not path:
+            return
+        try:
+            document = index_sentences(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror('File error', str(e))
+            return
+        if not len(document['starts']):
+            messagebox.showerror('File error', f'No sentences found in {path}.')
+            return
+        self.close_document()
+        self.token_data = None
+        self.output_data = None
+        # changes of an earlier session that were not written back yet
+        edited = {}
+        jpath = journal_path(path)
+        if os.path.exists(jpath):
+            try:
+                records = read_journal(jpath)
+                if not records or records[0].get('op') != 'open' or \
+                        {key: records[0].get(key) for key in ('size', 'mtime_ns')} != file_state(path):
+                    raise ValueError('the file was changed after the journal was started')
+                edited = replay_journal(records, lambda sent_ind: read_sentence(document, sent_ind))
+            except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+                os.replace(jpath, jpath + '.stale')
+                messagebox.showwarning('Journal not used', f'{jpath} was not restored ({e}), it was renamed to {jpath}.stale.')
+            else:
+                if edited:
+                    messagebox.showinfo('Session restored', f'{len(edited)} changed sentences of an earlier session were restored. '
+                                        f"Click 'Write back to file' to write them into the file.")
+        try:
+            self.journal = open_journal(path)
+        except OSError as e:
+            messagebox.showwarning('No journal', f'Changes cannot be journaled ({e}), write them back before moving on.')
+        self.edited = edited
+        self.document = document
+        self.sent_ind = None
+        self.show_sentence(0)
+
+    # put one sentence of the open document into the input field (only this sentence is read and parsed)
+    def show_sentence(self, sent_ind):
+        if self.document is None:
+            messagebox.showwarning('No file', 'Open a .conllu file first.')
+            return
+        if not 0 <= sent_ind < len(self.document['starts']):
+            return
+        # without a journal, changes are lost when moving on
+        if self.journal is None and self.output_data is not None and not messagebox.askyesno('Not written back',
+                'The integrated sentence was not written back to the file. Discard it?'):
+            return
+        try:
+            text = self.edited[sent_ind] if sent_ind in self.edited else read_sentence(self.document, sent_ind)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror('File error', str(e))
+            return
+        self.sent_ind = sent_ind
+        self.shown_text = text
+        self.journal_sent = None
+        self.input_text.delete('1.0', 'end')
+        self.input_text.insert('1.0', text)
+        self.output_text.delete('1.0', 'end')
+        self.token_data = None
+        self.output_data = None
+        self.loaded_text = None
+        self.reset_history()
+        self.clear_pending()
+        self.schedule_validation()
+        sent_id = sentence_id(text)
+        self.document_label.config(text=f"{os.path.basename(self.document['path'])}: sentence {sent_ind + 1} of "
+                                        f"{len(self.document['starts'])}" + (f' (sent_id {sent_id})' if sent_id is not None else '')
+                                        + (' - changed, not written back' if sent_ind in self.edited else ''))
+
+    def next_sentence(self):
+        if self.sent_ind is not None:
+            self.show_sentence(self.sent_ind + 1)
+
+    def previous_sentence(self):
+        if self.sent_ind is not None:
+            self.show_sentence(self.sent_ind - 1)
+
+    # jump to a sentence by its sent_id comment, or by its number in the file if no sent_id matches
+    def goto_sentence(self):
+        if self.document is None:
+            messagebox.showwarning('No file', 'Open a .conllu file first.')
+            return
+        target = self.goto_var.get().strip()
+        sent_ind = self.document['sent_ids'].get(target)
+        if sent_ind is None and target.isdigit() and 1 <= int(target) <= len(self.document['starts']):
+            sent_ind = int(target) - 1
+        if sent_ind is None:
+            messagebox.showerror('Not found', f'No sentence with sent_id {target}.')
+            return
+        self.show_sentence(sent_ind)
+
+    # write the output sentence back in place of the current sentence and continue with it as input
+    # with a journal: write all changed sentences into the file in one pass and start a new journal
+    def write_back(self):
+        if self.document is None or self.sent_ind is None:
+            messagebox.showwarning('No file', 'Open a .conllu file first.')
+            return
+        txt = self.output_text.get('1.0', 'end').strip()
+        if self.journal is not None:
+            # output edited by hand: it is the text of the sentence now
+            if txt and txt != self.edited.get(self.sent_ind, self.shown_text).strip():
+                self.journal_sent = self.sent_ind
+                self.journal_record({'op': 'load', 'text': txt})
+                self.edited[self.sent_ind] = txt
+            if not self.edited:
+                messagebox.showwarning('Nothing to write', 'No sentence was changed. Apply changes first.')
+                return
+            try:
+                self.document, self.journal = compact_journal(self.document, self.journal, self.edited)
+            except (OSError, ValueError) as e:
+                messagebox.showerror('File error', str(e))
+                return
+            self.edited = {}
+            self.output_data = None
+            self.show_sentence(self.sent_ind)
+            return
+        if not txt:
+            messagebox.showwarning('Nothing to write', 'There is no output to write back. Apply changes first.')
+            return
+        try:
+            write_sentence(self.document, self.sent_ind, txt)
+        except (OSError, ValueError) as e:
+            messagebox.showerror('File error', str(e))
+            return
+        self.output_data = None
+        self.show_sentence(self.sent_ind)
 
     def copy_to_clipboard(self):
         txt = self.output_text.get('1.0','end').strip()
@@ -0,0 +1,175 @@
+"""
+Batch annotation without the GUI: integrates compound spans into the sentences of a corpus,
+the same way 'Apply and integrate' of the CoBra Annotator does in new-span mode.
+
+Input: a .jsonl file with one integration per line, e.g.
+    {"file": "GER_scientific/x.conllu", "sent_id": "3", "start_id": 5, "n_const": 3,
+     "constituents": [{"FORM": "Knie", "LEMMA": "Knie"}, {"FORM": "gelenk", "LEMMA": "Gelenk"},
+                      {"FORM": "arthroskopie", "LEMMA": "Arthroskopie"}]}
+    - file: path of the .conllu file, relative to --input-root
+    - sent_id: sent_id comment of the sentence (or its number in the file if no sent_id matches)
+    - start_id: id of the token that becomes the span
+    - n_const: number of constituents (default: number of constituents given)
+    - constituents: per constituent the columns to set (ID, FORM, LEMMA, UPOS, XPOS, FEATS, HEAD, DEPREL, DEPS, MISC),
+      all other columns are prefilled as in the GUI (empty ones become '_')
+    - span (optional): columns of the span row to set instead of the prefilled ones
+    - renumber (optional, default true): update token ids and heads after the span
+      (the same for all integrations of a sentence)
+All integrations of a sentence are applied together in one pass, so start_id and the ids and heads in the rows
+refer to the sentence as it is in the file (ids and heads in the rows as if only this span was integrated, as the GUI
+prefills them); ids, heads and DEPS of the other tokens are updated once for all of them.
+Output: the annotated files under --output-root (same relative paths, all other sentences byte for byte as they are)
+
+Usage:
+    python annotate_batch.py integrations.jsonl [--input-root DIR] [--output-root annotated] [--workers N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from annotation_engine import (column_names, import_conllu, find_token_index_by_id, index_sentences, read_sentence,
+                               write_sentences, span_defaults, constituent_defaults, insert_spans, format_sentence)
+
+
+# set the given columns ({column name: value}) in a prefilled row
+def override_row(row, columns):
+    unknown = [name for name in columns if name not in column_names]
+    if unknown:
+        raise ValueError(f"unknown column {', '.join(unknown)}")
+    return [str(columns[name]) if name in columns else value for name, value in zip(column_names, row)]
+
+
+# span row and constituent rows of one integration into a sentence, returns (start_id, span_row, const_rows)
+def spec_rows(token_data, spec):
+    start_id = str(spec['start_id'])
+    idx = find_token_index_by_id(token_data, start_id)
+    if idx is None:
+        raise KeyError(f'Token id {start_id} not found.')
+    constituents = spec.get('constituents', [])
+    n_const = int(spec.get('n_const', len(constituents)))
+    if not 2 <= n_const or len(constituents) > n_const:
+        raise ValueError(f'{len(constituents)} constituents given for n_const {n_const}')
+    orig_cols = token_data['token_lines'][idx]['cols']
+    span_row = override_row(span_defaults(orig_cols, int(start_id), n_const), spec.get('span', {}))
+    const_rows = [override_row(row, constituents[j] if j < len(constituents) else {})
+                  for j, row in enumerate(constituent_defaults(orig_cols, int(start_id), n_const))]
+    return start_id, span_row, const_rows
+
+
+# integrate the spans of all integrations ((line number, spec)) of a sentence text in one pass
+# returns the new sentence text (None if no integration could be applied), the number applied and the errors
+def apply_specs(text, specs):
+    token_data = import_conllu(text)
+    renumber = specs[0][1].get('renumber', True)
+    integrations = []
+    starts = set()
+    errors = []
+    for line_number, spec in specs:
+        try:
+            if spec.get('renumber', True) != renumber:
+                raise ValueError('renumber differs from the other integrations of the sentence')
+            integration = spec_rows(token_data, spec)
+            if integration[0] in starts:
+                raise ValueError(f'Token id {integration[0]} is integrated twice.')
+        except (KeyError, ValueError, IndexError) as e:
+            errors.append((line_number, str(e).strip("'")))
+            continue
+        starts.add(integration[0])
+        integrations.append(integration)
+    if not integrations:
+        return None, 0, errors
+    insert_spans(token_data, integrations, renumber)
+    return format_sentence(token_data['comments'], token_data['token_lines']), len(integrations), errors
+
+
+# apply all integrations of one file and write it to out_path
+# returns the number of integrations applied and the errors (spec line number, message)
+def annotate_file(task):
+    path, out_path, specs = task
+    try:
+        document = index_sentences(path)
+    except (OSError, ValueError) as e:
+        return 0, [(line_number, str(e)) for line_number, spec in specs]
+    # integrations per sentence
+    sentences = {}
+    applied = 0
+    errors = []
+    for line_number, spec in specs:
+        target = str(spec.get('sent_id', ''))
+        sent_ind = document['sent_ids'].get(target)
+        if sent_ind is None and target.isdigit() and 1 <= int(target) <= len(document['starts']):
+            sent_ind = int(target) - 1
+        if sent_ind is None:
+            errors.append((line_number, f'No sentence with sent_id {target}.'))
+            continue
+        sentences.setdefault(sent_ind, []).append((line_number, spec))
+    edited = {}
+    for sent_ind, sentence_specs in sentences.items():
+        try:
+            text, sentence_applied, sentence_errors = apply_specs(read_sentence(document, sent_ind), sentence_specs)
+        except (KeyError, ValueError, IndexError, UnicodeDecodeError) as e:
+            errors.extend((line_number, str(e).strip("'")) for line_number, spec in sentence_specs)
+            continue
+        if text is not None:
+            edited[sent_ind] = text
+        applied += sentence_applied
+        errors.extend(sentence_errors)
+    errors.sort()
+    if not edited:
+        return applied, errors
+
+    # unchanged sentences (and everything between them) are copied as they are
+    write_sentences(document, edited, out_path)
+    return applied, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Integrate compound spans into .conllu files from a .jsonl list, without the GUI.')
+    parser.add_argument('specs', help='.jsonl file with one integration per line')
+    parser.add_argument('--input-root', default='.',
+                        help='directory the file paths of the integrations are relative to (default: current directory)')
+    parser.add_argument('--output-root', default='annotated',
+                        help='directory to write the annotated files to, the same as --input-root to change them in place (default: annotated)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes, one file per worker at a time (default: 1, 0 = one per CPU core)')
+    args = parser.parse_args()
+
+    # integrations per file, in the order of the .jsonl file
+    files = {}
+    errors = []
+    with open(args.specs, encoding='utf8') as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                files.setdefault(spec['file'], []).append((line_number, spec))
+            except (ValueError, KeyError) as e:
+                errors.append(('', line_number, f'unreadable integration: {e}'))
+    tasks = [(os.path.join(args.input_root, filename), os.path.join(args.output_root, filename), specs)
+             for filename, specs in files.items()]
+
+    applied = 0
+    workers = args.workers or os.cpu_count()
+    pool = multiprocessing.Pool(workers) if workers > 1 and len(tasks) > 1 else None
+    try:
+        results = pool.imap(annotate_file, tasks) if pool else map(annotate_file, tasks)
+        for filename, (file_applied, file_errors) in zip(files, results):
+            applied += file_applied
+            errors.extend((filename, line_number, message) for line_number, message in file_errors)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    for filename, line_number, message in errors:
+        print(f'line {line_number} ({filename}): {message}', file=sys.stderr)
+    print(f'{applied} integrations applied in {len(tasks)} files, {len(errors)} failed')
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,576 @@
+"""
+Annotation engine of the CoBra Annotator, without the GUI: parsing a sentence, looking up tokens,
+building and integrating compound span rows and constituent rows (as structural diffs that can be
+undone and redone), and reading and writing the sentences of a .conllu file. CoBraAnnotatorv4.py
+builds its GUI on these functions and annotate_batch.py applies them to a whole corpus without a display.
+"""
+from array import array
+from bisect import bisect_right
+import mmap
+import os
+import re
+
+column_names = ["ID","FORM","LEMMA","UPOS","XPOS","FEATS","HEAD","DEPREL","DEPS","MISC"]
+
+# import user input
+def import_conllu(text):
+    lines = [ln for ln in text.strip().splitlines()]
+    comments = [ln for ln in lines if ln.startswith('#')]
+    token_lines = []
+    for ln in lines:
+        if ln.strip() == '' or ln.startswith('#'):
+            continue
+        cols = ln.split('\t')
+        if len(cols) < 10:
+            # pad columns to 10
+            cols += ['_'] * (10 - len(cols))
+        # token id
+        id_field = cols[0]
+        is_span = '-' in id_field
+        token_lines.append({'raw': ln, 'cols': cols, 'is_span': is_span, 'id': id_field})
+    return {'comments': comments, 'token_lines': token_lines, 'index': index_token_lines(token_lines)}
+
+# map every id (spans included, e.g. '4-6') to the index of its token line
+# the first line wins if an id occurs twice; apply_diff and revert_diff keep it up to date
+def index_token_lines(token_lines):
+    index = {}
+    for tok_ind, tok in enumerate(token_lines):
+        index.setdefault(tok['cols'][0], tok_ind)
+    return index
+
+# take token-id given by user and find correct token line (not a span line)
+def find_token_index_by_id(token_data, id_str):
+    tok_ind = token_data['index'].get(str(id_str))
+    if tok_ind is None or token_data['token_lines'][tok_ind]['is_span']:
+        return None
+    return tok_ind
+
+def format_token_line(cols):
+    return '\t'.join(cols)
+
+# whole-document mode: sentences of a .conllu file are found by their byte offsets
+# and only the current one is read and parsed
+
+# blank lines between sentences, and sent_id comments
+blank_lines = re.compile(rb'\n(?:[ \t\r]*\n)+')
+sent_id_line = re.compile(rb'^# sent_id = ?(.*?)\r?$', re.M)
+
+# index the sentences of a .conllu file in one pass over the memory-mapped file:
+# start and end byte offset of every sentence (end after its last line ending), sent_id -> sentence number
+def index_sentences(path):
+    starts = array('Q')
+    ends = array('Q')
+    sent_ids = {}
+    ending = b'\n'
+    with open(path, 'rb') as file:
+        # an empty file cannot be mapped
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+        first_newline = data.find(b'\n')
+        if first_newline > 0 and data[first_newline - 1:first_newline] == b'\r':
+            ending = b'\r\n'
+        pos = 0
+        blocks = [(match.start() + 1, match.end()) for match in blank_lines.finditer(data)] + [(len(data), len(data))]
+        for end, next_pos in blocks:
+            block = data[pos:end]
+            if block.strip():
+                # blank lines at the start of the file are no part of the first sentence
+                leading = block[:len(block) - len(block.lstrip())]
+                starts.append(pos + leading.rfind(b'\n') + 1)
+                ends.append(end)
+            pos = next_pos
+        for match in sent_id_line.finditer(data):
+            sent_ind = bisect_right(starts, match.start()) - 1
+            if sent_ind >= 0:
+                sent_ids.setdefault(match.group(1).decode('utf-8').strip(), sent_ind)
+        size = len(data)
+        if size:
+            data.close()
+    return {'path': path, 'starts': starts, 'ends': ends, 'sent_ids': sent_ids, 'ending': ending, 'size': size}
+
+# text of one sentence of an indexed document
+def read_sentence(document, sent_ind):
+    with open(document['path'], 'rb') as file:
+        file.seek(document['starts'][sent_ind])
+        block = file.read(document['ends'][sent_ind] - document['starts'][sent_ind])
+    return block.decode('utf-8').rstrip('\r\n')
+
+# sent_id comment of a sentence text (None if it has none)
+def sentence_id(text):
+    match = sent_id_line.search(text.encode('utf-8'))
+    return match.group(1).decode('utf-8').strip() if match else None
+
+# bytes of a sentence text with the line ending of the file
+# (with_ending False: no line ending after the last line, e.g. for the last sentence of a file)
+def encode_sentence(text, ending, with_ending=True):
+    block = ending.join(line.encode('utf-8') for line in text.strip().splitlines())
+    return block + ending if with_ending else block
+
+# write a sentence back in place of sentence sent_ind (with the line ending of the file)
+# and move the offsets of the sentences after it
+def write_sentence(document, sent_ind, text):
+    start = document['starts'][sent_ind]
+    end = document['ends'][sent_ind]
+    if os.path.getsize(document['path']) != document['size']:
+        raise ValueError(f"{document['path']} was changed by another program, open it again.")
+    with open(document['path'], 'r+b') as file:
+        file.seek(start)
+        old_block = file.read(end - start)
+        tail = file.read()
+        block = encode_sentence(text, document['ending'], old_block.endswith(b'\n'))
+        file.seek(start)
+        file.write(block)
+        file.write(tail)
+        file.truncate()
+    shift = len(block) - (end - start)
+    document['ends'][sent_ind] = start + len(block)
+    for later in range(sent_ind + 1, len(document['starts'])):
+        document['starts'][later] += shift
+        document['ends'][later] += shift
+    document['size'] += shift
+    # the sent_id may have been edited
+    old_id = sentence_id(old_block.decode('utf-8'))
+    if old_id is not None and document['sent_ids'].get(old_id) == sent_ind:
+        del document['sent_ids'][old_id]
+    new_id = sentence_id(text)
+    if new_id is not None:
+        document['sent_ids'].setdefault(new_id, sent_ind)
+
+# write the document with the sentences of edited ({sentence number: text}) replaced, to out_path
+# (default: the document itself); everything else is copied byte for byte, the new file replaces
+# out_path only when it is complete
+def write_sentences(document, edited, out_path=None):
+    out_path = out_path or document['path']
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(document['path'], 'rb') as file, open(out_path + '.tmp', 'wb') as out:
+        pos = 0
+        for sent_ind in sorted(edited):
+            start = document['starts'][sent_ind]
+            end = document['ends'][sent_ind]
+            copy_bytes(file, out, start - pos)
+            old_block = file.read(end - start)
+            out.write(encode_sentence(edited[sent_ind], document['ending'], old_block.endswith(b'\n')))
+            pos = end
+        copy_bytes(file, out, None)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(out_path + '.tmp', out_path)
+
+# copy n bytes (None: the rest) from one file to another in blocks
+def copy_bytes(file, out, n, block_size=1 << 20):
+    while n is None or n > 0:
+        block = file.read(block_size if n is None else min(block_size, n))
+        if not block:
+            break
+        out.write(block)
+        if n is not None:
+            n -= len(block)
+
+# map an id through remap, empty node ids (e.g. 8.1) by the word id in front of the dot
+def remap_id(value, remap):
+    if '.' in value:
+        word_id, node = value.split('.', 1)
+        return f"{remap(word_id)}.{node}"
+    return remap(value)
+
+# map the ids of a DEPS value (head:relation pairs separated by |, ; or spaces) through remap
+def remap_deps(deps, remap):
+    if deps == '_' or deps.strip() == '':
+        return deps
+    parts = deps.split('|') if '|' in deps else deps.split(';') if ';' in deps else deps.split(' ')
+    newparts = []
+    for part in parts:
+        part = part.strip()
+        if part == '':
+            continue
+        if ':' in part:
+            core_rel, relation = part.split(':',1)
+            newparts.append(f"{remap_id(core_rel, remap)}:{relation}")
+        else:
+            newparts.append(remap_id(part, remap))
+    return '|'.join(newparts)
+
+# integrate heads and dependency relations from user input
+def update_heads_and_deps(token_lines, id_map):
+    remap = lambda value: id_map.get(value, value)
+    for tok in token_lines:
+        if tok['is_span']:
+            continue
+        cols = tok['cols']
+        head = cols[6]
+        if head != '_' and head in id_map:
+            cols[6] = id_map[head]
+        cols[8] = remap_deps(cols[8], remap)
+        tok['cols'] = cols
+
+# id (str) after a new span of n_const constituents at start_num, as the GUI prefills them:
+# ids after the start token move by n_const - 1
+def shift_after(value, start_num, n_const):
+    if value.isdigit() and int(value) > start_num:
+        return str(int(value) + (n_const - 1))
+    return value
+
+# prefilled span row of a new span starting at the original token (as load_fields shows it)
+def span_defaults(orig_cols, start_num, n_const):
+    row = []
+    for i_col, colname in enumerate(column_names):
+        if colname == 'ID':
+            row.append(f"{start_num}-{start_num + n_const - 1}")
+        elif colname == "HEAD" and int(orig_cols[i_col]) > start_num:
+            row.append(str(int(orig_cols[i_col]) + (n_const - 1)))
+        elif colname == "DEPS":
+            row.append(remap_deps(orig_cols[i_col], lambda value: shift_after(value, start_num, n_const)))
+        else:
+            row.append(orig_cols[i_col] if i_col < len(orig_cols) else '_')
+    return row
+
+# prefilled constituent rows of a new span (empty strings for the fields the annotator fills in):
+# ids counted from the start token, tags inherited from the original token,
+# compound:nmod for all but the last constituent, which takes over DEPREL and HEAD of the original token
+def constituent_defaults(orig_cols, start_num, n_const):
+    rows = []
+    for j in range(n_const):
+        row = []
+        for i_col, col in enumerate(column_names):
+            if col == 'ID':
+                row.append(str(start_num + j))
+            elif col in ("UPOS", "XPOS", "FEATS"):
+                row.append(orig_cols[i_col])
+            elif col == "DEPS":
+                row.append(remap_deps(orig_cols[i_col], lambda value: shift_after(value, start_num, n_const)))
+            elif col == "DEPREL" and j != n_const - 1:
+                row.append("compound:nmod")
+            elif col == "DEPREL" and j == n_const - 1:
+                row.append(orig_cols[i_col])
+            elif col == "HEAD" and j == n_const - 1 and int(orig_cols[i_col]) > start_num:
+                row.append(str(int(orig_cols[i_col]) + (n_const - 1)))
+            elif col == "HEAD" and j == n_const - 1:
+                row.append(str(int(orig_cols[i_col])))
+            else:
+                row.append('')
+        rows.append(row)
+    return rows
+
+# empty fields of an entered row become '_'
+def fill_empty(row):
+    return [val if val != '' else '_' for val in row]
+
+# set a column of a token line (its id kept in sync)
+def set_column(tok, col_ind, value):
+    tok['cols'][col_ind] = value
+    if col_ind == 0:
+        tok['id'] = value
+
+# first line whose id or position a diff changes (the lines before it keep their index entries)
+def first_changed_line(diff, token_lines):
+    changed = [tok_ind for tok_ind, col_ind, old, new in diff['columns'] if col_ind == 0]
+    changed += [tok_ind for tok_ind, old_line, new_lines in diff['lines']]
+    return min(changed, default=len(token_lines))
+
+# drop the index entries of the lines from start on (before a diff changes them)
+def unindex_lines(token_data, start):
+    index = token_data['index']
+    for tok in token_data['token_lines'][start:]:
+        if index.get(tok['cols'][0], -1) >= start:
+            del index[tok['cols'][0]]
+
+# index the lines from start on again (after a diff changed them)
+def index_lines(token_data, start):
+    index = token_data['index']
+    token_lines = token_data['token_lines']
+    for tok_ind in range(start, len(token_lines)):
+        index.setdefault(token_lines[tok_ind]['cols'][0], tok_ind)
+
+# apply a structural diff to a sentence in place (line indexes of the diff as before it):
+# 'columns' are (line index, column index, old value, new value) of changed columns,
+# 'lines' are (line index, old line, new lines) of lines replaced by other lines, ordered by line index
+# only the index entries from the first changed id or replaced line on are updated
+def apply_diff(token_data, diff):
+    token_lines = token_data['token_lines']
+    start = first_changed_line(diff, token_lines)
+    unindex_lines(token_data, start)
+    for tok_ind, col_ind, old, new in diff['columns']:
+        set_column(token_lines[tok_ind], col_ind, new)
+    # from the end, so the line indexes before each replacement stay valid
+    for tok_ind, old_line, new_lines in reversed(diff['lines']):
+        token_lines[tok_ind:tok_ind + 1] = new_lines
+    index_lines(token_data, start)
+
+# undo apply_diff: the sentence is as before it again (the same line objects)
+def revert_diff(token_data, diff):
+    token_lines = token_data['token_lines']
+    # the first changed line has the same index before and after the diff
+    start = first_changed_line(diff, token_lines)
+    unindex_lines(token_data, start)
+    # new lines of replacement i start after the lines added by the replacements before it
+    shift = sum(len(new_lines) - 1 for tok_ind, old_line, new_lines in diff['lines'])
+    for tok_ind, old_line, new_lines in reversed(diff['lines']):
+        shift -= len(new_lines) - 1
+        token_lines[tok_ind + shift:tok_ind + shift + len(new_lines)] = [old_line]
+    for tok_ind, col_ind, old, new in diff['columns']:
+        set_column(token_lines[tok_ind], col_ind, old)
+    index_lines(token_data, start)
+
+# immutable copy of a sentence for another thread: the comments, the columns of every token line and,
+# if diff is given, the diff with the columns of its old lines (see snapshot_text)
+def snapshot_sentence(token_data, diff=None):
+    lines = tuple(tuple(tok['cols']) for tok in token_data['token_lines'])
+    if diff is None:
+        return tuple(token_data['comments']), lines, None
+    columns = tuple(diff['columns'])
+    replaced = tuple((tok_ind, tuple(old_line['cols']), len(new_lines)) for tok_ind, old_line, new_lines in diff['lines'])
+    return tuple(token_data['comments']), lines, (columns, replaced)
+
+# sentence text of a snapshot, as it was before its diff (as revert_diff would leave it)
+def snapshot_text(snapshot):
+    comments, lines, diff = snapshot
+    if diff is not None:
+        columns, replaced = diff
+        lines = list(lines)
+        shift = sum(n_new - 1 for tok_ind, old_cols, n_new in replaced)
+        for tok_ind, old_cols, n_new in reversed(replaced):
+            shift -= n_new - 1
+            lines[tok_ind + shift:tok_ind + shift + n_new] = [old_cols]
+        for tok_ind, col_ind, old, new in columns:
+            cols = list(lines[tok_ind])
+            cols[col_ind] = old
+            lines[tok_ind] = cols
+    return '\n'.join(list(comments) + [format_token_line(cols) for cols in lines])
+
+# annotate existing tokens (existing-span mode): every row replaces the token with its ID,
+# MISC is the entered value followed by the MISC of the start token; ids and heads are not changed
+# changes token_data in place and returns the diff (see apply_diff)
+def annotate_existing(token_data, start_id, rows):
+    idx = find_token_index_by_id(token_data, start_id)
+    if idx is None:
+        raise KeyError(f'Token id {start_id} not found.')
+    orig_misc = token_data['token_lines'][idx]['cols'][9]
+    columns = []
+    for row in rows:
+        cols = fill_empty(row[:9]) + [(row[9] if row[9] != '' else '_') + "|" + orig_misc]
+        # find token in original by ID
+        target_ind = find_token_index_by_id(token_data, cols[0])
+        if target_ind is not None:
+            old_cols = token_data['token_lines'][target_ind]['cols']
+            columns.extend((target_ind, col_ind, old_cols[col_ind], value)
+                           for col_ind, value in enumerate(cols) if value != old_cols[col_ind])
+    diff = {'columns': columns, 'lines': []}
+    apply_diff(token_data, diff)
+    return diff
+
+# replace the start token by a new span row and its constituent rows (new-span mode)
+# changes token_data in place and returns the diff (see apply_diff)
+def integrate_span(token_data, start_id, span_row, const_rows, renumber=True):
+    return insert_spans(token_data, [(start_id, span_row, const_rows)], renumber)
+
+# integrate any number of new spans into a sentence in one operation: every integration
+# (start_id, span_row, const_rows) replaces its start token by the span row and the constituent rows
+# with renumber, one map from old to new ids is built first, then ID, HEAD, DEPS and the ranges of other spans
+# are rewritten in a single pass over the token lines; heads that pointed to a start token point to its
+# last constituent (the head of the compound)
+# ids in the span and constituent rows count as the GUI prefills them, as if only their own span was integrated
+# changes token_data in place and returns the diff (see apply_diff), only changed columns are recorded
+def insert_spans(token_data, integrations, renumber=True):
+    token_lines = token_data['token_lines']
+    spans = {}
+    for start_id, span_row, const_rows in integrations:
+        idx = find_token_index_by_id(token_data, start_id)
+        if idx is None:
+            raise KeyError(f'Token id {start_id} not found.')
+        if idx in spans:
+            raise ValueError(f'Token id {start_id} is integrated twice.')
+        spans[idx] = (span_row, const_rows)
+
+    # first and last new id of every old word id (they only differ for start tokens)
+    first_ids = {'0': '0'}
+    last_ids = {'0': '0'}
+    if renumber:
+        shift = 0
+        for idx, tok in enumerate(token_lines):
+            old_id = tok['cols'][0]
+            if tok['is_span'] or not old_id.isdigit():
+                continue
+            first_ids[old_id] = str(int(old_id) + shift)
+            if idx in spans:
+                shift += len(spans[idx][1]) - 1
+            last_ids[old_id] = str(int(old_id) + shift)
+    first = lambda value: first_ids.get(value, value)
+    last = lambda value: last_ids.get(value, value)
+
+    columns = []
+    lines = []
+    for idx, tok in enumerate(token_lines):
+        if idx in spans:
+            lines.append((idx, tok, span_lines(tok['cols'][0], spans[idx][0], spans[idx][1], first_ids, last_ids, renumber)))
+            continue
+        if not renumber:
+            continue
+        cols = tok['cols']
+        if tok['is_span']:
+            span_start, span_end = cols[0].split('-', 1)
+            new_id = f"{first(span_start)}-{last(span_end)}"
+        else:
+            new_id = remap_id(cols[0], first)
+        for col_ind, value in ((0, new_id), (6, last(cols[6])), (8, remap_deps(cols[8], last))):
+            if value != cols[col_ind]:
+                columns.append((idx, col_ind, cols[col_ind], value))
+    diff = {'columns': columns, 'lines': lines}
+    apply_diff(token_data, diff)
+    return diff
+
+# span line and constituent lines of one integration, their ids translated from the numbering
+# of this span alone (start token at old_start, later old ids moved by the number of constituents - 1)
+# to the new ids of the whole sentence
+def span_lines(old_start, span_row, const_rows, first_ids, last_ids, renumber):
+    start_num = int(old_start)
+    n_const = len(const_rows)
+    new_start = int(first_ids.get(old_start, old_start))
+
+    # local id -> new id; ids outside the span are old ids (moved by n_const - 1 if after it)
+    def translate(value, ids):
+        if not renumber or not value.isdigit():
+            return value
+        local = int(value)
+        if start_num <= local < start_num + n_const:
+            return str(new_start + local - start_num)
+        old_id = str(local - (n_const - 1) if local > start_num else local)
+        return ids.get(old_id, value)
+
+    def translate_row(row, is_span):
+        cols = fill_empty(row)
+        if is_span and '-' in cols[0]:
+            span_start, span_end = cols[0].split('-', 1)
+            cols[0] = f"{translate(span_start, first_ids)}-{translate(span_end, last_ids)}"
+        else:
+            cols[0] = remap_id(cols[0], lambda value: translate(value, first_ids))
+        cols[6] = translate(cols[6], last_ids)
+        cols[8] = remap_deps(cols[8], lambda value: translate(value, last_ids))
+        return {'cols': cols, 'is_span': is_span, 'id': cols[0]}
+
+    return [translate_row(span_row, True)] + [translate_row(row, False) for row in const_rows]
+
+# sentence text of comments and token lines
+def format_sentence(comments, token_lines):
+    out_lines = []
+    for c in comments:
+        out_lines.append(c)
+    for t in token_lines:
+        out_lines.append(format_token_line(t['cols']))
+    return '\n'.join(out_lines)
+
+# problems of a sentence that break later steps (e.g. prep_conllu.py): word ids that are not numbers,
+# occur twice or are out of order, span ranges that do not match the tokens after them, heads (HEAD and DEPS)
+# that are not tokens of the sentence, and HEAD cycles
+# returns (line index, column index, message) per problem
+def check_sentence(token_lines):
+    problems = []
+    word_ids = {}
+    expected = 1
+    for tok_ind, tok in enumerate(token_lines):
+        value = tok['cols'][0]
+        if tok['is_span'] or '.' in value:
+            continue
+        if not value.isdigit() or value == '0':
+            problems.append((tok_ind, 0, f'ID {value} is not a token number'))
+            continue
+        if value in word_ids:
+            problems.append((tok_ind, 0, f'ID {value} occurs twice'))
+            continue
+        if int(value) != expected:
+            problems.append((tok_ind, 0, f'ID {value} out of order ({expected} expected)'))
+        word_ids[value] = tok_ind
+        expected = int(value) + 1
+
+    # span ranges: the words of the range follow the span line, spans do not overlap
+    span_end = 0
+    for tok_ind, tok in enumerate(token_lines):
+        if not tok['is_span']:
+            continue
+        value = tok['cols'][0]
+        first, _, last = value.partition('-')
+        if not (first.isdigit() and last.isdigit()) or int(first) >= int(last):
+            problems.append((tok_ind, 0, f'span {value} is not a range of token numbers'))
+            continue
+        missing = [str(word_id) for word_id in range(int(first), int(last) + 1) if str(word_id) not in word_ids]
+        if missing:
+            problems.append((tok_ind, 0, f"span {value}: no token {', '.join(missing)}"))
+        elif word_ids[first] != tok_ind + 1:
+            problems.append((tok_ind, 0, f'span {value} is not right before token {first}'))
+        elif int(first) <= span_end:
+            problems.append((tok_ind, 0, f'span {value} overlaps the span before it'))
+        span_end = max(span_end, int(last))
+
+    # heads must be 0 or a word of the sentence (DEPS heads may be empty nodes of a word)
+    heads = {}
+    for value, tok_ind in word_ids.items():
+        cols = token_lines[tok_ind]['cols']
+        head = cols[6]
+        if head == '_':
+            pass
+        elif head != '0' and head not in word_ids:
+            problems.append((tok_ind, 6, f'token {value}: HEAD {head} is not a token of the sentence'))
+        else:
+            heads[value] = head
+        for part in remap_deps(cols[8], lambda dep_head: dep_head).split('|'):
+            dep_head = part.split(':', 1)[0].split('.', 1)[0]
+            if part not in ('', '_') and dep_head != '0' and dep_head not in word_ids:
+                problems.append((tok_ind, 8, f'token {value}: DEPS head {dep_head} is not a token of the sentence'))
+
+    # HEAD cycles: follow the heads of every word until the root, a word already checked or a word on the way
+    checked = set()
+    for value in heads:
+        path = []
+        on_path = {}
+        while value in heads and value not in checked and value not in on_path:
+            on_path[value] = len(path)
+            path.append(value)
+            value = heads[value]
+        if value in on_path:
+            cycle = path[on_path[value]:]
+            message = 'HEAD cycle ' + ' -> '.join(cycle + [value])
+            problems.extend((word_ids[word_id], 6, message) for word_id in cycle)
+        checked.update(path)
+    problems.sort()
+    return problems
+
+# check a sentence text with loaded fields integrated as 'Apply and integrate' would do it (without changing
+# anything): rows are the entered rows of the fields, the span row first in new-span mode (existing False)
+# and pending the queued integrations; returns the problems of the fields as {(row, column index): message}
+# (row 0 the span row, row j the j-th constituent or existing token) and the messages of all problems
+def check_integration(text, start_id, rows, pending, renumber, existing):
+    token_data = import_conllu(text)
+    if find_token_index_by_id(token_data, start_id) is None:
+        return {}, [f'Start token {start_id} not found']
+    try:
+        if existing:
+            annotate_existing(token_data, start_id, rows)
+            field_lines = {}
+            for row_ind, row in enumerate(rows, start=1):
+                tok_ind = find_token_index_by_id(token_data, row[0])
+                if tok_ind is not None:
+                    field_lines[id(token_data['token_lines'][tok_ind])] = row_ind
+        else:
+            integrations = [integration for integration in pending if integration[0] != start_id] + \
+                           [(start_id, rows[0], rows[1:])]
+            diff = insert_spans(token_data, integrations, renumber)
+            new_lines = [new_lines for tok_ind, old_line, new_lines in diff['lines'] if old_line['cols'][0] == start_id]
+            field_lines = {id(line): row_ind for row_ind, line in enumerate(new_lines[0])}
+    except (KeyError, ValueError, IndexError) as e:
+        return {}, [str(e).strip("'")]
+    markers = {}
+    messages = []
+    # the span of the loaded fields covers its constituents only
+    if not existing:
+        span_line, const_lines = new_lines[0][0], new_lines[0][1:]
+        const_range = f"{const_lines[0]['cols'][0]}-{const_lines[-1]['cols'][0]}"
+        if span_line['cols'][0] != const_range:
+            markers[(0, 0)] = f"span {span_line['cols'][0]} does not match its constituents {const_range}"
+            messages.append(markers[(0, 0)])
+    for tok_ind, col_ind, message in check_sentence(token_data['token_lines']):
+        row_ind = field_lines.get(id(token_data['token_lines'][tok_ind]))
+        if row_ind is not None:
+            markers.setdefault((row_ind, col_ind), message)
+        if message not in messages:
+            messages.append(message)
+    return markers, messages
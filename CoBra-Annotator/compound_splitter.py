@@ -0,0 +1,262 @@
+"""
+Compound splitter of the CoBra Annotator: suggests constituents (FORM and LEMMA) for a compound token,
+so 'Load fields' can prefill the constituent rows of a new span.
+
+The known constituents are the const_*_text and const_*_lemma columns of data/compound_overview.csv
+and, optionally, a lexicon file with one constituent per line (form;lemma or just the form).
+They are kept in a prefix trie (constituents from the front of the word) and a suffix trie
+(constituents from its end), so all known constituents at a position are found in one walk.
+A split covers the whole word with known constituents, each but the last optionally followed by a
+linking element (-s-, -n-, -es-, e.g. Arbeit-s-zeit); at most the first or the last constituent may
+be unknown. Splits are ranked by how often their constituents occur, on a tie by the number of
+letters in known constituents.
+
+The tries are built once and cached next to this file (splitter_cache.pickle), the cache is built
+again when the overview or the lexicon change.
+
+Usage:
+    python compound_splitter.py Kreuzbandrekonstruktion [--n-const 3] [--lemma LEMMA]
+        [--overview ../data/compound_overview.csv] [--lexicon FILE]
+"""
+import argparse
+import csv
+import math
+import os
+import pickle
+
+here = os.path.dirname(os.path.abspath(__file__))
+default_overview = os.path.join(here, '..', 'data', 'compound_overview.csv')
+default_lexicon = os.path.join(here, 'splitter_lexicon.txt')
+default_cache = os.path.join(here, 'splitter_cache.pickle')
+# changes with the layout of the cached splitter
+cache_version = 1
+
+linking_elements = ('s', 'n', 'es')
+# score of an unknown constituent and of a linking element (a known constituent scores log(1 + count))
+unknown_score = -3.0
+linking_score = -0.5
+# shortest known and unknown constituent
+min_known = 2
+min_unknown = 3
+
+
+# (form, lemma) of every constituent of the overview rows
+def read_overview_constituents(path):
+    constituents = []
+    with open(path, newline='', encoding='utf8') as file:
+        for row in csv.DictReader(file, delimiter=';'):
+            for n in (1, 2, 3):
+                form = row.get(f'const_{n}_text', '_')
+                lemma = row.get(f'const_{n}_lemma', '_')
+                if form and form != '_':
+                    constituents.append((form, lemma if lemma and lemma != '_' else form))
+    return constituents
+
+
+# (form, lemma) of every line of a lexicon file (form;lemma, or the form only)
+def read_lexicon(path):
+    constituents = []
+    with open(path, encoding='utf8') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            form, _, lemma = line.partition(';')
+            constituents.append((form.strip(), lemma.strip() or form.strip()))
+    return constituents
+
+
+def add_to_trie(trie, key):
+    node = trie
+    for char in key:
+        node = node.setdefault(char, {})
+    # '' marks the end of a key
+    node[''] = True
+
+
+# splitter of (form, lemma) constituents: counts and most frequent lemma of every lowercased form
+# (lemmas count as forms too, e.g. Gewebe for Gewebeprobe), prefix trie and suffix trie (reversed forms)
+def build_splitter(constituents):
+    lemma_counts = {}
+    for form, lemma in constituents:
+        for key in {form.lower(), lemma.lower()}:
+            if len(key) >= min_known:
+                counts = lemma_counts.setdefault(key, {})
+                counts[lemma] = counts.get(lemma, 0) + 1
+    forms = {}
+    prefix_trie = {}
+    suffix_trie = {}
+    for key, counts in lemma_counts.items():
+        forms[key] = (sum(counts.values()), max(counts, key=counts.get))
+        add_to_trie(prefix_trie, key)
+        add_to_trie(suffix_trie, key[::-1])
+    return {'forms': forms, 'prefix': prefix_trie, 'suffix': suffix_trie}
+
+
+# (path, modification time, size) of the source files, to check the cache against
+def source_stamps(paths):
+    stamps = []
+    for path in paths:
+        stat = os.stat(path)
+        stamps.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+# splitter of the overview (and the lexicon, if it exists), from the cache if it is up to date
+def load_splitter(overview=default_overview, lexicon=default_lexicon, cache=default_cache):
+    sources = [overview] + ([lexicon] if lexicon and os.path.exists(lexicon) else [])
+    stamps = source_stamps(sources)
+    if cache and os.path.exists(cache):
+        try:
+            with open(cache, 'rb') as file:
+                cached = pickle.load(file)
+            if cached.get('version') == cache_version and cached.get('sources') == stamps:
+                return cached['splitter']
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+    constituents = read_overview_constituents(overview)
+    if len(sources) > 1:
+        constituents += read_lexicon(lexicon)
+    splitter = build_splitter(constituents)
+    if cache:
+        # a cache that cannot be written (e.g. read-only install) only costs the build at the next start
+        try:
+            with open(cache + '.tmp', 'wb') as file:
+                pickle.dump({'version': cache_version, 'sources': stamps, 'splitter': splitter}, file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache + '.tmp', cache)
+        except OSError:
+            pass
+    return splitter
+
+
+# end positions of the known forms that start at start (up to end)
+def prefix_matches(splitter, low, start, end):
+    node = splitter['prefix']
+    for pos in range(start, end):
+        node = node.get(low[pos])
+        if node is None:
+            return
+        if '' in node:
+            yield pos + 1
+
+
+# start positions of the known forms that end at end (down to start)
+def suffix_matches(splitter, low, start, end):
+    node = splitter['suffix']
+    for pos in range(end - 1, start - 1, -1):
+        node = node.get(low[pos])
+        if node is None:
+            return
+        if '' in node:
+            yield pos
+
+
+# splits of low[start:] into n_const parts from the front: (start, end of form, end of part) per part,
+# all parts known (the last one without a linking element) but the last, which may be unknown
+def front_splits(splitter, low, start, n_const):
+    if n_const == 1:
+        if low[start:] in splitter['forms'] or len(low) - start >= min_unknown:
+            yield [(start, len(low), len(low))]
+        return
+    for form_end in prefix_matches(splitter, low, start, len(low)):
+        for link in ('',) + linking_elements:
+            part_end = form_end + len(link)
+            if low[form_end:part_end] != link or part_end >= len(low):
+                continue
+            for rest in front_splits(splitter, low, part_end, n_const - 1):
+                yield [(start, form_end, part_end)] + rest
+
+
+# splits of low[:end] into n_const parts from the end, all parts known but the first, which may be unknown
+def back_splits(splitter, low, end, n_const, last=True):
+    if n_const == 1:
+        for link in ('',) if last else ('',) + linking_elements:
+            form_end = end - len(link)
+            if low[form_end:end] != link:
+                continue
+            if low[:form_end] in splitter['forms'] or form_end >= min_unknown:
+                yield [(0, form_end, end)]
+        return
+    for link in ('',) if last else ('',) + linking_elements:
+        form_end = end - len(link)
+        if form_end <= 0 or low[form_end:end] != link:
+            continue
+        for form_start in suffix_matches(splitter, low, 1, form_end):
+            for rest in back_splits(splitter, low, form_start, n_const - 1, last=False):
+                yield rest + [(form_start, form_end, end)]
+
+
+# ranked split suggestions for a compound word: lists of (FORM, LEMMA), one per constituent
+# FORM is the part of the word (with its linking element), LEMMA the lemma of the known form,
+# for an unknown last part the rest of the compound's lemma (if it starts like the word)
+def split_compound(splitter, word, n_const, lemma=None, limit=5):
+    low = word.lower()
+    if n_const < 2 or len(low) < n_const * min_known:
+        return []
+    forms = splitter['forms']
+    scored = {}
+    known_chars = {}
+    for parts in list(front_splits(splitter, low, 0, n_const)) + list(back_splits(splitter, low, len(low), n_const)):
+        bounds = tuple(parts)
+        if bounds in scored:
+            continue
+        score = 0.0
+        unknown = 0
+        known_chars[bounds] = 0
+        for start, form_end, part_end in parts:
+            form = low[start:form_end]
+            if form in forms:
+                score += math.log(1 + forms[form][0])
+                known_chars[bounds] += len(form)
+            else:
+                score += unknown_score
+                unknown += 1
+            if part_end != form_end:
+                score += linking_score
+        # only one unknown part (first or last)
+        if unknown <= 1:
+            scored[bounds] = score
+    suggestions = []
+    for bounds in sorted(scored, key=lambda bounds: (-scored[bounds], -known_chars[bounds])):
+        suggestion = []
+        for start, form_end, part_end in bounds:
+            form = low[start:form_end]
+            if form in forms:
+                part_lemma = forms[form][1]
+            elif part_end == len(low) and lemma and lemma.lower().startswith(low[:start]) and len(lemma) > start:
+                part_lemma = lemma[start].upper() + lemma[start + 1:]
+            else:
+                part_lemma = word[start].upper() + word[start + 1:form_end]
+            suggestion.append((word[start:part_end], part_lemma))
+        # a linking element and a known form with it (sehne-n, sehnen) give the same split
+        if suggestion not in suggestions:
+            suggestions.append(suggestion)
+            if len(suggestions) == limit:
+                break
+    return suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suggest constituents for a compound from the known constituents.')
+    parser.add_argument('word', help='compound to split')
+    parser.add_argument('--n-const', type=int, default=3,
+                        help='number of constituents (default: 3)')
+    parser.add_argument('--lemma', default=None,
+                        help='lemma of the compound, gives the lemma of an unknown last constituent')
+    parser.add_argument('--overview', default=default_overview,
+                        help='overview with the known constituents (default: ../data/compound_overview.csv)')
+    parser.add_argument('--lexicon', default=default_lexicon,
+                        help='further constituents, one per line as form;lemma (default: splitter_lexicon.txt, if it exists)')
+    args = parser.parse_args()
+
+    splitter = load_splitter(args.overview, args.lexicon)
+    suggestions = split_compound(splitter, args.word, args.n_const, args.lemma)
+    if not suggestions:
+        print('no split found')
+    for suggestion in suggestions:
+        print(' + '.join(f'{form} ({lemma})' for form, lemma in suggestion))
+
+
+if __name__ == '__main__':
+    main()
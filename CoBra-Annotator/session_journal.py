@@ -0,0 +1,137 @@
+"""
+Session journal of the CoBra Annotator in whole-document mode: every change to a sentence of the open
+.conllu file is appended to FILE.conllu.journal (one JSON record per line), so applying an integration
+costs one short line instead of rewriting the file, and a crashed session is restored when the file is
+opened again.
+
+Records ('sent' is the number of the sentence in the file, 'sent_id' its sent_id comment):
+    - {"op": "open", "size": ..., "mtime_ns": ...}: first line, the state of the file the journal belongs to
+    - {"op": "load", "sent": ..., "sent_id": ..., ["text": ...]}: the sentence is loaded into the fields,
+      undo and redo start over; with text if the annotator changed the sentence by hand (this is its text then)
+    - {"op": "apply", "sent": ..., "sent_id": ..., "mode": "new", "renumber": ..., "integrations": [[start_id, span_row, const_rows], ...]}
+    - {"op": "apply", "sent": ..., "sent_id": ..., "mode": "existing", "start_id": ..., "rows": [...]}
+    - {"op": "undo", "sent": ...}, {"op": "redo", "sent": ...}
+Replaying the records with the annotation engine gives the current text of every changed sentence.
+Compaction writes these sentences into the .conllu file in one pass and starts a new journal.
+
+Records are flushed at once and synced to disk (fsync) in batches: after sync_records records or when
+sync_interval seconds have passed since the last sync (the annotator also syncs after a pause).
+"""
+import json
+import os
+import time
+
+from annotation_engine import (import_conllu, insert_spans, annotate_existing, apply_diff, revert_diff, format_sentence,
+                               write_sentences, index_sentences)
+
+sync_records = 32
+sync_interval = 1.0
+
+
+def journal_path(path):
+    return path + '.journal'
+
+
+# size and modification time of the document, the journal only applies to this state of it
+def file_state(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+# records of a journal (a last line cut off by a crash is left out)
+def read_journal(path):
+    records = []
+    with open(path, encoding='utf8') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+# open the journal of a document for appending, with a new open record if there is none (or replace is set)
+def open_journal(path, replace=False):
+    jpath = journal_path(path)
+    new = replace or not os.path.exists(jpath) or os.path.getsize(jpath) == 0
+    if not new:
+        # a last line cut off by a crash is cut away, so the next record starts on a line of its own
+        with open(jpath, 'r+b') as file:
+            data = file.read()
+            file.truncate(data.rfind(b'\n') + 1)
+    journal = {'path': jpath, 'file': open(jpath, 'w' if new else 'a', encoding='utf8'), 'unsynced': 0, 'last_sync': time.monotonic()}
+    if new:
+        append_record(journal, dict({'op': 'open'}, **file_state(path)))
+        sync_journal(journal)
+    return journal
+
+
+# append a record, sync if enough records are waiting or the last sync is long enough ago
+def append_record(journal, record):
+    journal['file'].write(json.dumps(record, ensure_ascii=False) + '\n')
+    journal['file'].flush()
+    journal['unsynced'] += 1
+    if journal['unsynced'] >= sync_records or time.monotonic() - journal['last_sync'] >= sync_interval:
+        sync_journal(journal)
+
+
+def sync_journal(journal):
+    if journal['unsynced']:
+        os.fsync(journal['file'].fileno())
+        journal['unsynced'] = 0
+    journal['last_sync'] = time.monotonic()
+
+
+def close_journal(journal):
+    sync_journal(journal)
+    journal['file'].close()
+
+
+# current text of every sentence the records change ({sentence number: text});
+# read_text(sentence number) gives the text of a sentence in the file
+def replay_journal(records, read_text):
+    texts = {}
+    # working sentence with its undo and redo stacks per sentence
+    sentences = {}
+    for record in records:
+        op = record.get('op')
+        if op == 'open':
+            continue
+        sent_ind = record['sent']
+        if op == 'load' or sent_ind not in sentences:
+            text = record.get('text') if op == 'load' else None
+            if text is None:
+                text = texts[sent_ind] if sent_ind in texts else read_text(sent_ind)
+            sentences[sent_ind] = {'token_data': import_conllu(text), 'history': [], 'redo': []}
+        sentence = sentences[sent_ind]
+        token_data = sentence['token_data']
+        if op == 'apply':
+            if record['mode'] == 'existing':
+                diff = annotate_existing(token_data, record['start_id'], record['rows'])
+            else:
+                diff = insert_spans(token_data, [tuple(integration) for integration in record['integrations']], record['renumber'])
+            sentence['history'].append(diff)
+            sentence['redo'] = []
+        elif op == 'undo' and sentence['history']:
+            diff = sentence['history'].pop()
+            revert_diff(token_data, diff)
+            sentence['redo'].append(diff)
+        elif op == 'redo' and sentence['redo']:
+            diff = sentence['redo'].pop()
+            apply_diff(token_data, diff)
+            sentence['history'].append(diff)
+        if op == 'load':
+            if record.get('text') is not None:
+                texts[sent_ind] = record['text']
+        else:
+            texts[sent_ind] = format_sentence(token_data['comments'], token_data['token_lines'])
+    return texts
+
+
+# fold the changed sentences into the document and start a new journal
+# returns the document indexed again and the new journal
+def compact_journal(document, journal, texts):
+    if texts:
+        write_sentences(document, texts)
+    close_journal(journal)
+    return index_sentences(document['path']), open_journal(document['path'], replace=True)
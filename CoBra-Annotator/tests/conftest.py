@@ -0,0 +1,5 @@
+# the annotator modules import each other as top-level modules, as when they are run from CoBra-Annotator/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# structural diffs of the annotation engine: undo and redo restore the text and the id index
+
+from annotation_engine import (annotate_existing, apply_diff, constituent_defaults, fill_empty, find_token_index_by_id,
+                               format_sentence, import_conllu, index_token_lines, insert_spans, revert_diff,
+                               span_defaults)
+
+SENT = '\n'.join([
+    '# sent_id = 1',
+    '# text = Die Kreuzbandrekonstruktion und Meniskusteilresektion gelang .',
+    '1\tDie\tder\tDET\tART\t_\t2\tdet\t2:det\t_',
+    '2\tKreuzbandrekonstruktion\tKreuzbandrekonstruktion\tNOUN\tNN\t_\t5\tnsubj\t5:nsubj\t_',
+    '3\tund\tund\tCCONJ\tKON\t_\t4\tcc\t4:cc\t_',
+    '4\tMeniskusteilresektion\tMeniskusteilresektion\tNOUN\tNN\t_\t2\tconj\t2:conj|5:nsubj\t_',
+    '5\tgelang\tgelingen\tVERB\tVVFIN\t_\t0\troot\t0:root\t_',
+    '6\t.\t.\tPUNCT\t$.\t_\t5\tpunct\t5:punct\t_',
+])
+
+
+# integration of a three-constituent span at start_id, with the rows as the GUI prefills them
+def integration(token_data, start_id, forms):
+    cols = token_data['token_lines'][find_token_index_by_id(token_data, start_id)]['cols']
+    const_rows = constituent_defaults(cols, int(start_id), len(forms))
+    for row, form in zip(const_rows, forms):
+        row[1] = row[2] = form
+    return start_id, span_defaults(cols, int(start_id), len(forms)), [fill_empty(row) for row in const_rows]
+
+
+def state(token_data):
+    return format_sentence(token_data['comments'], token_data['token_lines']), dict(token_data['index'])
+
+
+def test_insert_spans_undo_redo_round_trip():
+    token_data = import_conllu(SENT)
+    states = [state(token_data)]
+    diffs = []
+    # the last one without renumbering, so its constituent ids clash with the words after it (the first line wins)
+    for renumber, start_id, forms in [(True, '4', ['Menisk', 'us', 'teilresektion']),
+                                      (True, '2', ['Kreuz', 'band', 'rekonstruktion']),
+                                      (False, '5', ['u', 'nd'])]:
+        diffs.append(insert_spans(token_data, [integration(token_data, start_id, forms)], renumber))
+        states.append(state(token_data))
+        assert token_data['index'] == index_token_lines(token_data['token_lines'])
+        if start_id == '2':
+            # the words after the spans moved, heads to a start token point to its last constituent
+            assert token_data['token_lines'][find_token_index_by_id(token_data, '6')]['cols'][1] == 'Menisk'
+            assert token_data['token_lines'][find_token_index_by_id(token_data, '5')]['cols'][6] == '8'
+
+    for diff, before in zip(reversed(diffs), reversed(states[:-1])):
+        revert_diff(token_data, diff)
+        assert state(token_data) == before
+        assert token_data['index'] == index_token_lines(token_data['token_lines'])
+    for diff, after in zip(diffs, states[1:]):
+        apply_diff(token_data, diff)
+        assert state(token_data) == after
+        assert token_data['index'] == index_token_lines(token_data['token_lines'])
+
+
+def test_annotate_existing_round_trip():
+    token_data = import_conllu(SENT)
+    before = state(token_data)
+    rows = [['2', 'Kreuzbandrekonstruktion', 'Kreuzband', 'NOUN', 'NN', '', '5', 'nsubj', '5:nsubj', 'checked']]
+    diff = annotate_existing(token_data, '2', rows)
+    assert diff['lines'] == []
+    after = state(token_data)
+    assert after[0].splitlines()[3].split('\t')[2] == 'Kreuzband'
+    revert_diff(token_data, diff)
+    assert state(token_data) == before
+    apply_diff(token_data, diff)
+    assert state(token_data) == after
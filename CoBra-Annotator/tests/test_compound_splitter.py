@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# split suggestions of the compound splitter and its cache
+
+import os
+
+import pytest
+
+from compound_splitter import build_splitter, load_splitter, split_compound
+
+CONSTITUENTS = [('Kreuz', 'Kreuz'), ('band', 'Band'), ('rekonstruktion', 'Rekonstruktion'), ('Arbeit', 'Arbeit'),
+                ('zeit', 'Zeit'), ('Knorpel', 'Knorpel'), ('zell', 'Zelle')]
+
+
+def test_known_constituents_and_linking_element():
+    splitter = build_splitter(CONSTITUENTS)
+    assert split_compound(splitter, 'Kreuzbandrekonstruktion', 3)[0] == \
+        [('Kreuz', 'Kreuz'), ('band', 'Band'), ('rekonstruktion', 'Rekonstruktion')]
+    assert split_compound(splitter, 'Arbeitszeit', 2)[0] == [('Arbeits', 'Arbeit'), ('zeit', 'Zeit')]
+
+
+def test_unknown_last_constituent_takes_the_lemma():
+    splitter = build_splitter(CONSTITUENTS)
+    suggestion = split_compound(splitter, 'Knorpelzelltransplantate', 3, 'Knorpelzelltransplantat')[0]
+    assert suggestion == [('Knorpel', 'Knorpel'), ('zell', 'Zelle'), ('transplantate', 'Transplantat')]
+
+
+def test_load_splitter_builds_and_reuses_the_cache(tmp_path):
+    overview = tmp_path / 'overview.csv'
+    overview.write_text('compound;comp_lemma;const_1_text;const_2_text;const_3_text;const_1_lemma;const_2_lemma;const_3_lemma\n'
+                        'Kreuzbandrekonstruktion;_;Kreuz;band;rekonstruktion;Kreuz;Band;Rekonstruktion\n', encoding='utf8')
+    cache = str(tmp_path / 'cache.pickle')
+    splitter = load_splitter(str(overview), None, cache)
+    assert os.path.exists(cache)
+    assert load_splitter(str(overview), None, cache) == splitter
+    assert split_compound(splitter, 'Kreuzbandrekonstruktion', 3)[0][1] == ('band', 'Band')
+
+
+def test_missing_overview_raises_oserror(tmp_path):
+    # the annotator shows this error instead of split suggestions
+    with pytest.raises(OSError):
+        load_splitter(str(tmp_path / 'missing.csv'), None, str(tmp_path / 'cache.pickle'))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# session journal: replay after a crash (last line cut off) and compaction into the document
+
+from annotation_engine import (constituent_defaults, fill_empty, find_token_index_by_id, format_sentence, import_conllu,
+                               index_sentences, insert_spans, read_sentence, span_defaults)
+from session_journal import (append_record, close_journal, compact_journal, journal_path, open_journal, read_journal,
+                             replay_journal)
+
+SENTENCES = [
+    '# sent_id = 1\n1\tDie\tder\tDET\tART\t_\t2\tdet\t_\t_\n2\tKreuzbandrekonstruktion\tKreuzbandrekonstruktion\tNOUN\tNN\t_\t3\tnsubj\t_\t_\n'
+    '3\tgelang\tgelingen\tVERB\tVVFIN\t_\t0\troot\t_\t_',
+    '# sent_id = 2\n1\tEs\tes\tPRON\tPPER\t_\t2\tnsubj\t_\t_\n2\theilt\theilen\tVERB\tVVFIN\t_\t0\troot\t_\t_',
+]
+
+
+# apply record of a three-constituent span at start_id, with the rows as the GUI prefills them
+def apply_record(text, sent_ind, start_id, forms):
+    token_data = import_conllu(text)
+    cols = token_data['token_lines'][find_token_index_by_id(token_data, start_id)]['cols']
+    const_rows = constituent_defaults(cols, int(start_id), len(forms))
+    for row, form in zip(const_rows, forms):
+        row[1] = row[2] = form
+    integration = [start_id, span_defaults(cols, int(start_id), len(forms)), [fill_empty(row) for row in const_rows]]
+    return {'op': 'apply', 'sent': sent_ind, 'sent_id': str(sent_ind + 1), 'mode': 'new', 'renumber': True,
+            'integrations': [integration]}
+
+
+def expected_text(text, record):
+    token_data = import_conllu(text)
+    insert_spans(token_data, [tuple(integration) for integration in record['integrations']], record['renumber'])
+    return format_sentence(token_data['comments'], token_data['token_lines'])
+
+
+def test_replay_after_truncated_last_line(tmp_path):
+    path = str(tmp_path / 'doc.conllu')
+    with open(path, 'w', encoding='utf8', newline='\n') as file:
+        file.write('\n\n'.join(SENTENCES) + '\n\n')
+    document = index_sentences(path)
+    read_text = lambda sent_ind: read_sentence(document, sent_ind)
+
+    record = apply_record(SENTENCES[0], 0, '2', ['Kreuz', 'band', 'rekonstruktion'])
+    journal = open_journal(path)
+    append_record(journal, {'op': 'load', 'sent': 0, 'sent_id': '1'})
+    append_record(journal, record)
+    append_record(journal, {'op': 'undo', 'sent': 0})
+    append_record(journal, {'op': 'redo', 'sent': 0})
+    close_journal(journal)
+    # a crash while writing the next record leaves half a line
+    with open(journal_path(path), 'a', encoding='utf8') as file:
+        file.write('{"op": "undo", "se')
+
+    records = read_journal(journal_path(path))
+    assert [entry['op'] for entry in records] == ['open', 'load', 'apply', 'undo', 'redo']
+    assert replay_journal(records, read_text) == {0: expected_text(SENTENCES[0], record)}
+
+    # reopening cuts the half line away, the next record starts on a line of its own
+    journal = open_journal(path)
+    append_record(journal, {'op': 'undo', 'sent': 0})
+    close_journal(journal)
+    records = read_journal(journal_path(path))
+    assert [entry['op'] for entry in records] == ['open', 'load', 'apply', 'undo', 'redo', 'undo']
+    assert replay_journal(records, read_text) == {0: SENTENCES[0]}
+
+
+def test_compaction_writes_the_replayed_sentences(tmp_path):
+    path = str(tmp_path / 'doc.conllu')
+    with open(path, 'w', encoding='utf8', newline='\n') as file:
+        file.write('\n\n'.join(SENTENCES) + '\n\n')
+    document = index_sentences(path)
+    record = apply_record(SENTENCES[0], 0, '2', ['Kreuz', 'band', 'rekonstruktion'])
+    journal = open_journal(path)
+    append_record(journal, {'op': 'load', 'sent': 0, 'sent_id': '1'})
+    append_record(journal, record)
+    texts = replay_journal(read_journal(journal_path(path)), lambda sent_ind: read_sentence(document, sent_ind))
+
+    document, journal = compact_journal(document, journal, texts)
+    close_journal(journal)
+    assert read_sentence(document, 0) == expected_text(SENTENCES[0], record)
+    assert read_sentence(document, 1) == SENTENCES[1]
+    assert [entry['op'] for entry in read_journal(journal_path(path))] == ['open']
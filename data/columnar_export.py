@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Typed columnar export of the two tables prep_conllu.py writes as .csv files.
+Output: comp_info_example_all_annotations and comp_extraction_for_transparency_example
+as .parquet (compressed) or .arrow (Arrow IPC file, can be memory-mapped without parsing)
+
+Schema of the all-annotations table:
+    - filename, language, register: dictionary-encoded strings
+      (language and register are empty for hyphen rows, which have no such columns in the .csv)
+    - sent_id: int32
+    - tok_id, tok_text, tok_lemma, deprel, misc, prev_tok, second_prev_tok: strings
+Schema of the transparency-analysis table:
+    - compound, comp_lemma, const_*_text, const_*_lemma: strings
+    - gold_branching, language, register, gold_brackets: dictionary-encoded strings
+Values are the same as in the .csv files (tok_id of spans as '(12, 14)', missing values as '_').
+
+Loading, e.g.:
+    pd.read_parquet('comp_extraction_for_transparency_example.parquet')
+    pyarrow.ipc.open_file(pyarrow.memory_map('comp_extraction_for_transparency_example.arrow')).read_all()
+
+Needs pyarrow (pip install pyarrow).
+"""
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# column types, everything else is a plain string column
+dictionary_columns = {'filename', 'language', 'register', 'gold_branching', 'gold_brackets'}
+int_columns = {'sent_id'}
+
+FORMATS = ['parquet', 'arrow']
+
+
+# pyarrow type of a column
+def column_type(name):
+    if name in dictionary_columns:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in int_columns:
+        return pa.int32()
+    return pa.string()
+
+
+# typed table from csv rows (fresh rows or the stringified rows of the manifest)
+def rows_to_table(header, rows):
+    columns = [[] for name in header]
+    for row in rows:
+        # hyphen rows have no language and register
+        if len(row) == len(header) - 2 and header[1:3] == ['language', 'register']:
+            row = row[:1] + [None, None] + row[1:]
+        for column, value in zip(columns, row):
+            column.append(value)
+    arrays = []
+    for name, column in zip(header, columns):
+        if name in int_columns:
+            column = [int(value) for value in column]
+        elif name not in dictionary_columns:
+            column = [str(value) for value in column]
+        arrays.append(pa.array(column, type=column_type(name)))
+    return pa.Table.from_arrays(arrays, schema=pa.schema([(name, column_type(name)) for name in header]))
+
+
+# write one table as stem.parquet or stem.arrow
+def write_table(stem, header, rows, fmt):
+    table = rows_to_table(header, rows)
+    if fmt == 'parquet':
+        pq.write_table(table, stem + '.parquet')
+    else:
+        with pa.OSFile(stem + '.arrow', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
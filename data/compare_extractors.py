@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Comparison of the single-pass compound scan in prep_conllu.py (extract_sentence)
+with the elif chain it replaced (extract_sentence_legacy, kept below as it was).
+Input: .conllu files given as arguments (default: all .conllu files in the current directory)
+Output (printed):
+    - files where the two extractors give different rows or masked sentences
+    - files an extractor fails on, with the exception (counted apart, never as the same)
+    - tokens per second for both extractors
+
+Known difference: for nmod-hyphen-nmod-hyphen-const compounds the legacy chain glued
+the hyphen's text instead of the last constituent's lemma onto comp_lemma.
+"""
+
+import copy
+import glob
+import sys
+import time
+
+from conllu_stream import read_conllu_sentences
+from prep_conllu import extract_sentence, get_language, get_register
+
+
+def extract_sentence_legacy(sentence, s_ind, filename, language, register):
+    long_data_list = []
+    long_data_list_analysis = []
+    comp_analysis_row = ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']
+    span_length = 0
+    comp_collect = []
+
+    for token_ind, entire_tok in enumerate(sentence):
+        # detect compound span by '-' in tok_id and 'compound:nmod' in next tok
+        # leave text and lemma, extract general info+append and
+        # start building compound entry for analysis file
+        if 'id' in entire_tok and entire_tok['id'] != '' and isinstance(entire_tok['id'], tuple) and 'compound:nmod' in sentence[token_ind + 1]['deprel']: # and 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' not in entire_tok['deprel']  and '-' in entire_tok['id']
+            # print(entire_tok['deprel'])
+            # get general info
+            tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'], entire_tok['lemma'] if 'lemma' in entire_tok else '_',
+                        entire_tok['deprel'] if 'deprel' in entire_tok else '_', entire_tok['misc'] if 'misc' in entire_tok else '_', sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
+                        sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
+            long_data_list.append(tok_list)
+
+            # set span_length
+            span_id1 = entire_tok['id'][0]
+            span_id2 = entire_tok['id'][1]
+            span_length = int(span_id2)-int(span_id1)+1
+
+            # build whole-compound if span_length is 2 / look for hyphen
+            if span_length == 2:
+                # there are hyphens
+                if ('text' in sentence[token_ind +1] and sentence[token_ind +1]['text'] != '' and sentence[token_ind +1]['text'] == '-') or ('text' in sentence[token_ind -1] and sentence[token_ind -1]['text'] != '' and sentence[token_ind -1]['text'] == '-'):
+                    # hyphen before (const+hyphen+span)
+                    if 'text' in sentence[token_ind - 1] and sentence[token_ind - 1]['text'] != '' and sentence[token_ind - 1]['text'] == '-':
+                        whole_comp_text = sentence[token_ind - 4]['text'] + sentence[token_ind - 1]['text'] + entire_tok['text']
+                        if 'lemma' in entire_tok:
+                            whole_comp_lemma = sentence[token_ind - 4]['lemma'] + sentence[token_ind - 1]['lemma'] + \
+                                          entire_tok['lemma']
+                        else:
+                            whole_comp_lemma = '_'
+                            # whole-comp
+                        comp_analysis_row[0] = whole_comp_text
+                        comp_analysis_row[1] = whole_comp_lemma
+                        # const_text
+                        comp_analysis_row[2] = sentence[token_ind - 2]['text']
+                        comp_analysis_row[3] = sentence[token_ind + 1]['text']
+                        comp_analysis_row[4] = sentence[token_ind + 2]['text']
+                        # const_lemma
+                        comp_analysis_row[5] = sentence[token_ind - 2]['lemma'] if 'lemma' in sentence[token_ind - 2] else '_'
+                        comp_analysis_row[6] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
+                        comp_analysis_row[7] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if sentence[token_ind - 2]['head'] == sentence[token_ind + 1]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif sentence[token_ind - 2]['head'] != sentence[token_ind + 1]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+
+                    # hyphen after (span+hyphen+const)
+                    else:
+                        whole_comp_text = entire_tok['text'] + sentence[token_ind +1]['text'] + sentence[token_ind + 2]['text']
+                        if 'lemma' in entire_tok:
+                            whole_comp_lemma = entire_tok['lemma'] + sentence[token_ind +1]['lemma'] + sentence[token_ind + 2]['lemma']
+                        else:
+                            whole_comp_lemma = '_'
+                        # whole comp
+                        comp_analysis_row[0] = whole_comp_text
+                        comp_analysis_row[1] = whole_comp_lemma
+                        # const_text
+                        comp_analysis_row[2] = sentence[token_ind + 1]['text']
+                        comp_analysis_row[3] = sentence[token_ind + 2]['text']
+                        comp_analysis_row[4] = sentence[token_ind + 4]['text']
+                        # const_lemma
+                        comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
+                        comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
+                        comp_analysis_row[7] = sentence[token_ind + 4]['lemma'] if 'lemma' in sentence[token_ind + 4] else '_'
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+                # no hyphens
+                else:
+                    # span first
+                    if 'compound:nmod' in sentence[token_ind +1]['deprel'] and 'compound:nmod' not in sentence[token_ind -1]['deprel']:
+                        whole_comp_text = entire_tok['text'] + ' ' + sentence[token_ind + 3]['text']
+                        if 'lemma' in entire_tok:
+                            whole_comp_lemma = entire_tok['lemma'] + ' ' + sentence[token_ind + 3]['lemma']
+                        else:
+                            whole_comp_lemma = '_'
+                        # whole comp
+                        comp_analysis_row[0] = whole_comp_text
+                        comp_analysis_row[1] = whole_comp_lemma
+                        comp_analysis_row[2] = sentence[token_ind + 1]['text']
+                        comp_analysis_row[3] = sentence[token_ind + 2]['text']
+                        comp_analysis_row[4] = sentence[token_ind + 3]['text']
+                        # const_lemma
+                        comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
+                        comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
+                        comp_analysis_row[7] = sentence[token_ind + 3]['lemma'] if 'lemma' in sentence[token_ind + 3] else '_'
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+                    # span second
+                    else:
+                        whole_comp_text = sentence[token_ind - 1]['text'] + ' ' + entire_tok['text']
+                        if 'lemma' in entire_tok:
+                            whole_comp_lemma = sentence[token_ind - 1]['lemma'] + ' ' + entire_tok['lemma']
+                        else:
+                            whole_comp_lemma = '_'
+                        # whole comp
+                        comp_analysis_row[0] = whole_comp_text
+                        comp_analysis_row[1] = whole_comp_lemma
+                        # const_text
+                        comp_analysis_row[2] = sentence[token_ind - 1]['text']
+                        comp_analysis_row[3] = sentence[token_ind + 1]['text']
+                        comp_analysis_row[4] = sentence[token_ind + 2]['text']
+                        # const_lemma
+                        comp_analysis_row[5] = sentence[token_ind - 1]['lemma'] if 'lemma' in sentence[token_ind - 1] else '_'
+                        comp_analysis_row[6] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
+                        comp_analysis_row[7] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if sentence[token_ind - 1]['head'] == sentence[token_ind + 1]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif sentence[token_ind - 1]['head'] != sentence[token_ind + 1]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+            # if span is 3 store text of span-tok in analysis row, then collect constituents (text/lemma)
+            elif span_length == 3:
+                # whole comp
+                comp_analysis_row[0] = entire_tok['text']
+                comp_analysis_row[1] = entire_tok['lemma'] if 'lemma' in entire_tok else '_'
+                # const_text
+                comp_analysis_row[2] = sentence[token_ind + 1]['text']
+                comp_analysis_row[3] = sentence[token_ind + 2]['text']
+                comp_analysis_row[4] = sentence[token_ind + 3]['text']
+                # const_lemma
+                comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
+                comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
+                comp_analysis_row[7] = sentence[token_ind + 3]['lemma'] if 'lemma' in sentence[token_ind + 3] else '_'
+                # check head-structure considering possible hyphenation to determine branching structure
+                # then store branching-structure in analysis_row
+                if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
+                    comp_analysis_row[8] = 'BC'
+                elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
+                    comp_analysis_row[8] = 'AB'
+
+            # append
+            comp_analysis_row[9] = language
+            comp_analysis_row[10] = register
+            long_data_list_analysis.append(comp_analysis_row)
+            # clear
+            comp_analysis_row = ['compound', 'comp_lemma', 'const_1_text', 'const_2_text', 'const_3_text','const_1_lemma', 'const_2_lemma', 'const_3_lemma', 'gold_branching','language','register']
+
+        # detect first constituent of non-span compound (nmod in this token and in the next, but not in the previous)
+        # leave text and lemma, extract general info+append and
+        # start building compound entry for analysis file
+        elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' in entire_tok['deprel'] and ('compound:nmod' in sentence[token_ind +1]['deprel'] or ('-' in sentence[token_ind +1]['text'] and 'compound:nmod' in sentence[token_ind +2]['deprel'] if 'deprel' in sentence[token_ind +2] else 'compound:nmod' in sentence[token_ind +3]['deprel'])) and (('deprel'in sentence[token_ind -1] and 'compound:nmod' not in sentence[token_ind -1]['deprel']) or 'deprel' not in sentence[token_ind -1]):
+            # get general info
+            tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
+                        entire_tok['lemma'] if 'lemma' in entire_tok else '_',
+                        entire_tok['deprel'] if 'deprel' in entire_tok else '_',
+                        entire_tok['misc'] if 'misc' in entire_tok else '_',
+                        sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
+                        sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
+            long_data_list.append(tok_list)
+            comp_collect.append(entire_tok)
+
+
+
+        # detect non-last-constituent (nmod in this token and in the previous, but not in the next)
+        # leave text and lemma, extract general info+append and
+        # continue building compound entry for analysis file
+        elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' in entire_tok['deprel'] and (('deprel' in sentence[token_ind -1] and'compound:nmod' in sentence[token_ind -1]['deprel']) or '-' in sentence[token_ind -1]['text']) and 'compound:nmod' not in sentence[token_ind +1]['deprel']:
+            # get general info
+            tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
+                        entire_tok['lemma'] if 'lemma' in entire_tok else '_',
+                        entire_tok['deprel'] if 'deprel' in entire_tok else '_',
+                        entire_tok['misc'] if 'misc' in entire_tok else '_',
+                        sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
+                        sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
+            long_data_list.append(tok_list)
+            comp_collect.append(entire_tok)
+
+
+        # detect last-constituent (no nmod in this token but in the previous)
+        # leave text and lemma, extract general info+append and
+        # continue building compound entry for analysis file
+        # possible spellings here: 3span-nmod-nmod-const, nmod-nmod-const, nmod-span-nmod-const, 2span-nmod-nmod-const
+        elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' not in entire_tok['deprel'] and '-' not in entire_tok['text'] and (('deprel' in sentence[token_ind -1] and 'compound:nmod' in sentence[token_ind -1]['deprel']) or ('-' in sentence[token_ind -1]['text'] and 'compound:nmod' in sentence[token_ind -2]['deprel'])):
+            # get general info
+            tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
+                        entire_tok['lemma'] if 'lemma' in entire_tok else '_',
+                        entire_tok['deprel'] if 'deprel' in entire_tok else '_',
+                        entire_tok['misc'] if 'misc' in entire_tok else '_',
+                        sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
+                        sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
+            long_data_list.append(tok_list)
+            comp_collect.append(entire_tok)
+
+            # finish building compound entry, append and clear analysis_row, reset span_length
+            # distinguish between span-comp and non-span-comp and hyphenated comp for building the whole-comp in analysis_row
+            # only build whole compound if span_length is 0, if 2 or 3 it is already build in the span-elif
+            if span_length == 0:
+                # look for hyphens, collect constituents and hyphens
+                # no hyphen
+                if len(comp_collect) == 3:
+                    # whole comp
+                    comp_analysis_row[0] = comp_collect[0]['text'] + ' ' + comp_collect[1]['text'] + ' ' + comp_collect[2]['text']
+                    comp_analysis_row[1] = comp_collect[0]['lemma'] + ' ' + comp_collect[1]['lemma'] + ' ' + comp_collect[2]['lemma']
+                    # const_text
+                    comp_analysis_row[2] = comp_collect[0]['text']
+                    comp_analysis_row[3] = comp_collect[1]['text']
+                    comp_analysis_row[4] = comp_collect[2]['text']
+                    # const_lemma
+                    comp_analysis_row[5] = comp_collect[0]['lemma']
+                    comp_analysis_row[6] = comp_collect[1]['lemma']
+                    comp_analysis_row[7] = comp_collect[2]['lemma']
+                    # check head-structure considering possible hyphenation to determine branching structure
+                    # then store branching-structure in analysis_row
+                    if comp_collect[0]['head'] == comp_collect[1]['head']:
+                        comp_analysis_row[8] = 'BC'
+                    elif comp_collect[0]['head'] != comp_collect[1]['head']:
+                        comp_analysis_row[8] = 'AB'
+
+
+                # 1 hyphen
+                if len(comp_collect) == 4:
+                    # hyphen after first
+                    if comp_collect[1]['text'] == '-':
+                        # whole comp
+                        comp_analysis_row[0] = comp_collect[0]['text'] + comp_collect[1]['text'] + ' ' + \
+                                               comp_collect[2]['text'] + ' ' + comp_collect[3]['text']
+                        comp_analysis_row[1] = comp_collect[0]['lemma'] + comp_collect[1]['lemma'] + ' ' + \
+                                               comp_collect[2]['lemma'] + ' ' + comp_collect[3]['lemma']
+                        # const_text / add hyphen to first
+                        comp_analysis_row[2] = comp_collect[0]['text'] + comp_collect[1]['text']
+                        comp_analysis_row[3] = comp_collect[2]['text']
+                        comp_analysis_row[4] = comp_collect[3]['text']
+                        # const_lemma / add hyphen to first
+                        comp_analysis_row[5] = comp_collect[0]['lemma'] + comp_collect[1]['lemma']
+                        comp_analysis_row[6] = comp_collect[2]['lemma']
+                        comp_analysis_row[7] = comp_collect[3]['lemma']
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if comp_collect[0]['head'] == comp_collect[2]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif comp_collect[0]['head'] != comp_collect[2]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+
+
+                    # hyphen after second
+                    elif comp_collect[3]['text'] == '-':
+                        # whole comp
+                        comp_analysis_row[0] = comp_collect[0]['text'] + ' ' + comp_collect[1]['text'] + \
+                                               comp_collect[2]['text'] + comp_collect[3]['text']
+                        comp_analysis_row[1] = comp_collect[0]['lemma'] + ' ' + comp_collect[1]['lemma'] + \
+                                               comp_collect[2]['lemma'] + comp_collect[3]['lemma']
+                        # const_text / add hyphen to second
+                        comp_analysis_row[2] = comp_collect[0]['text']
+                        comp_analysis_row[3] = comp_collect[1]['text'] + comp_collect[2]['text']
+                        comp_analysis_row[4] = comp_collect[3]['text']
+                        # const_lemma / add hyphen to second
+                        comp_analysis_row[5] = comp_collect[0]['lemma']
+                        comp_analysis_row[6] = comp_collect[1]['lemma'] + comp_collect[2]['lemma']
+                        comp_analysis_row[7] = comp_collect[3]['lemma']
+                        # check head-structure considering possible hyphenation to determine branching structure
+                        # then store branching-structure in analysis_row
+                        if comp_collect[0]['head'] == comp_collect[1]['head']:
+                            comp_analysis_row[8] = 'BC'
+                        elif comp_collect[0]['head'] != comp_collect[1]['head']:
+                            comp_analysis_row[8] = 'AB'
+
+
+                # 2 hyphens
+                if len(comp_collect) == 5:
+                    # whole comp
+                    comp_analysis_row[0] = comp_collect[0]['text'] + comp_collect[1]['text'] + \
+                                           comp_collect[2]['text'] + comp_collect[3]['text'] + comp_collect[4]['text']
+                    comp_analysis_row[1] = comp_collect[0]['lemma'] + comp_collect[1]['lemma'] + \
+                                           comp_collect[2]['lemma'] + comp_collect[3]['lemma'] + comp_collect[3]['text']
+                    # const_text / add hyphen to first and second
+                    comp_analysis_row[2] = comp_collect[0]['text'] + comp_collect[1]['text']
+                    comp_analysis_row[3] = comp_collect[2]['text'] + comp_collect[3]['text']
+                    comp_analysis_row[4] = comp_collect[4]['text']
+                    # const_lemma / add hyphen to first and second
+                    comp_analysis_row[5] = comp_collect[0]['lemma'] + comp_collect[1]['lemma']
+                    comp_analysis_row[6] = comp_collect[2]['lemma'] + comp_collect[3]['lemma']
+                    comp_analysis_row[7] = comp_collect[4]['lemma']
+                    # check head-structure considering possible hyphenation to determine branching structure
+                    # then store branching-structure in analysis_row
+                    if comp_collect[0]['head'] == comp_collect[2]['head']:
+                        comp_analysis_row[8] = 'BC'
+                    elif comp_collect[0]['head'] != comp_collect[2]['head']:
+                        comp_analysis_row[8] = 'AB'
+
+            # append
+            if comp_analysis_row != ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']:
+                comp_analysis_row[9] = language
+                comp_analysis_row[10] = register
+                long_data_list_analysis.append(comp_analysis_row)
+            # clear
+            comp_analysis_row = ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']
+            span_length = 0
+            comp_collect = []
+
+        # catch hyphens
+        elif 'text' in entire_tok and entire_tok['text'] != '' and entire_tok['text'] == '-' and ('compound:nmod' in sentence[token_ind +1][
+            'deprel'] or 'compound:nmod' in sentence[token_ind - 1]['deprel']):
+            # get general info
+            tok_list = [filename, s_ind + 1, entire_tok['id'], entire_tok['text'],
+                        entire_tok['lemma'] if 'lemma' in entire_tok else '_',
+                        entire_tok['deprel'] if 'deprel' in entire_tok else '_',
+                        entire_tok['misc'] if 'misc' in entire_tok else '_',
+                        sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
+                        sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
+            long_data_list.append(tok_list)
+            comp_collect.append(entire_tok)
+
+        # all other toks replace text and lemma with '_'
+        else:
+            sentence[token_ind]['text'] = '_'
+            sentence[token_ind]['lemma'] = '_'
+
+    return long_data_list, long_data_list_analysis
+
+
+# run one extractor on copies of the sentences (both mask tokens in place)
+def run_extractor(extractor, sentences, filename, language, register):
+    sentences = copy.deepcopy(sentences)
+    long_data_list = []
+    long_data_list_analysis = []
+    start = time.perf_counter()
+    for s_ind, sentence in enumerate(sentences):
+        tok_rows, analysis_rows = extractor(sentence, s_ind, filename, language, register)[:2]
+        long_data_list.extend(tok_rows)
+        # the legacy rows have no gold_brackets column
+        long_data_list_analysis.extend(row[:11] for row in analysis_rows)
+    runtime = time.perf_counter() - start
+    return (long_data_list, long_data_list_analysis, sentences), runtime
+
+
+def main():
+    documents = sys.argv[1:] or sorted(glob.glob('./*.conllu'))
+    tokens = 0
+    runtimes = {'legacy': 0, 'single-pass': 0}
+    same = 0
+    failed = 0
+    for doc in documents:
+        filename = doc[2:] if doc.startswith('./') else doc
+        language = get_language(filename)
+        register = get_register(filename)
+        sentences = [sentence for comments, sentence in read_conllu_sentences(doc)]
+        tokens += sum(len(sentence) for sentence in sentences)
+        results = {}
+        for name, extractor in [('legacy', extract_sentence_legacy), ('single-pass', extract_sentence)]:
+            try:
+                results[name], runtime = run_extractor(extractor, sentences, filename, language, register)
+                runtimes[name] += runtime
+            except Exception as e:
+                print(f'{doc}: {name} extractor failed ({type(e).__name__}: {e})')
+                results[name] = None
+        # a file one of the extractors failed on is never the same, even if both failed
+        if None in results.values():
+            failed += 1
+        elif results['legacy'] == results['single-pass']:
+            same += 1
+        else:
+            print(f'{doc}: extracted rows differ')
+
+    print(f'same rows and masked sentences for {same} of {len(documents)} files ({tokens} tokens), '
+          f'{failed} files an extractor failed on')
+    for name, runtime in runtimes.items():
+        print(f'{name}: {runtime:.3f}s, {tokens / runtime:.0f} tokens/s' if runtime else f'{name}: no file extracted')
+
+
+if __name__ == '__main__':
+    main()
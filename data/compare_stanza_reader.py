@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Comparison of the streaming reader (conllu_stream.py) with the stanza path
+prep_conllu.py used before (CoNLL.conll2doc + Document.to_dict for the whole file).
+Input: .conllu files given as arguments (default: all .conllu files in the current directory)
+Output (printed):
+    - per path: runtime, time until the first sentence is ready, peak memory
+    - number of files where both paths extract the same csv rows (with and without MISC)
+
+Known differences: stanza moves start_char/end_char and SpaceAfter inside MISC,
+the streaming reader keeps MISC as written. Files with span lines after their
+constituents are renumbered by stanza and read as written by the streaming reader.
+
+Needs stanza (pip install stanza).
+"""
+
+import glob
+import sys
+import time
+import tracemalloc
+
+from stanza.utils.conll import CoNLL
+
+from conllu_stream import read_conllu_sentences
+from prep_conllu import extract_sentence, get_language, get_register
+
+
+# sentences of a file through stanza, the whole document is parsed first
+def stanza_sentences(doc):
+    entire_dict = CoNLL.conll2doc(doc).to_dict()
+    for sentence in entire_dict:
+        yield sentence
+
+
+# sentences of a file through the streaming reader
+def streamed_sentences(doc):
+    for comments, sentence in read_conllu_sentences(doc):
+        yield sentence
+
+
+# drop the misc column from the rows of the all-annotations csv
+# (hyphen rows have no language/register columns, so misc sits further left there)
+def without_misc(rows):
+    return [row[:8] + row[9:] if len(row) == 11 else row[:6] + row[7:] for row in rows]
+
+
+# run the extraction on one path and measure it
+def run_path(doc, sentences):
+    language = get_language(doc)
+    register = get_register(doc)
+    long_data_list = []
+    long_data_list_analysis = []
+    first_sentence = None
+    tracemalloc.start()
+    start = time.perf_counter()
+    for s_ind, sentence in enumerate(sentences(doc)):
+        if first_sentence is None:
+            first_sentence = time.perf_counter() - start
+        tok_rows, analysis_rows, locations = extract_sentence(sentence, s_ind, doc, language, register)
+        long_data_list.extend(tok_rows)
+        long_data_list_analysis.extend(analysis_rows)
+    runtime = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return long_data_list, long_data_list_analysis, runtime, first_sentence or runtime, peak
+
+
+def main():
+    documents = sys.argv[1:] or sorted(glob.glob('./*.conllu'))
+    totals = {'stanza': [0, 0, 0], 'stream': [0, 0, 0]}
+    same = 0
+    same_apart_from_misc = 0
+    for doc in documents:
+        results = {}
+        for name, sentences in [('stanza', stanza_sentences), ('stream', streamed_sentences)]:
+            try:
+                results[name] = run_path(doc, sentences)
+            except Exception as e:
+                tracemalloc.stop()
+                print(f'{doc}: {name} path failed ({type(e).__name__}: {e})')
+                results[name] = None
+        if results['stanza'] is None or results['stream'] is None:
+            continue
+        for name, (_, _, runtime, first_sentence, peak) in results.items():
+            totals[name][0] += runtime
+            totals[name][1] += first_sentence
+            totals[name][2] = max(totals[name][2], peak)
+        if results['stanza'][:2] == results['stream'][:2]:
+            same += 1
+        elif without_misc(results['stanza'][0]) == without_misc(results['stream'][0]) and results['stanza'][1] == results['stream'][1]:
+            same_apart_from_misc += 1
+        else:
+            print(f'{doc}: extracted rows differ')
+
+    for name, (runtime, first_sentence, peak) in totals.items():
+        print(f'{name}: {runtime:.3f}s total, {first_sentence:.3f}s until first sentence, peak memory {peak / 1024:.0f} KiB')
+    print(f'same rows for {same} of {len(documents)} files, same apart from MISC for {same_apart_from_misc} more')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite index from constituents to compound occurrences.
+Built by prep_conllu.py --index FILE as a by-product of the extraction (standard library only).
+
+Tables:
+    - compounds: id, filename, sent_id, tok_id (span token or first constituent, as in the csv),
+      compound, comp_lemma, gold_branching, language, register, gold_brackets
+    - constituents: compound_id, position (1-N, all constituents of the compound), text, lemma
+The constituents are indexed by lemma and by text (each with position), so lookups
+only touch the matching index entries, no matter how many compounds there are.
+
+Usage, e.g. which compounds have Knorpel as constituent 2 and in which sentences:
+    python compound_index.py comp_index.sqlite --lemma Knorpel --position 2
+    find_compounds('comp_index.sqlite', lemma='Knorpel', position=2)
+Where a compound occurs: find_occurrences('comp_index.sqlite', 'Knorpelzelltransplantate')
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+
+# columns of a result row
+result_header = ['filename', 'sent_id', 'tok_id', 'position', 'const_text', 'const_lemma',
+                 'compound', 'comp_lemma', 'gold_branching', 'language', 'register']
+
+schema = '''
+CREATE TABLE compounds (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    sent_id INTEGER NOT NULL,
+    tok_id TEXT NOT NULL,
+    compound TEXT,
+    comp_lemma TEXT,
+    gold_branching TEXT,
+    language TEXT,
+    register TEXT,
+    gold_brackets TEXT
+);
+CREATE TABLE constituents (
+    compound_id INTEGER NOT NULL REFERENCES compounds(id),
+    position INTEGER NOT NULL,
+    text TEXT,
+    lemma TEXT
+);
+'''
+
+# created after the bulk insert, which is faster than keeping them up to date row by row
+indexes = '''
+CREATE INDEX constituents_lemma ON constituents(lemma, position, compound_id);
+CREATE INDEX constituents_text ON constituents(text, position, compound_id);
+CREATE INDEX compounds_branching ON compounds(gold_branching);
+CREATE INDEX compounds_compound ON compounds(compound, language, register);
+'''
+
+
+# write a new index from the analysis rows and their (filename, sent_id, tok_id) locations
+# (into a temporary file first, so readers never see a half-written index)
+def build_index(path, analysis_rows, locations):
+    if os.path.exists(path + '.tmp'):
+        os.remove(path + '.tmp')
+    connection = sqlite3.connect(path + '.tmp')
+    try:
+        # no journal needed, the file only replaces the index once it is complete
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.executescript(schema)
+        compounds = []
+        constituents = []
+        for row, (filename, sent_id, tok_id) in zip(analysis_rows, locations):
+            # spans of unknown length only have a placeholder row
+            if row[0] == 'compound':
+                continue
+            compound_id = len(compounds) + 1
+            compounds.append((compound_id, filename, int(sent_id), str(tok_id), row[0], row[1], row[8], row[9], row[10], row[11]))
+            # all constituents from const_texts/const_lemmas (const_1_* to const_3_* only hold three-constituent compounds)
+            for position, (text, lemma) in enumerate(zip(row[12].split('|'), row[13].split('|')), start=1):
+                constituents.append((compound_id, position, text, lemma))
+        connection.executemany('INSERT INTO compounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', compounds)
+        connection.executemany('INSERT INTO constituents VALUES (?, ?, ?, ?)', constituents)
+        connection.executescript(indexes)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(path + '.tmp', path)
+
+
+# analysis rows (all columns of the analysis table of prep_conllu.py) and locations stored in an index,
+# in the order they were added (used by merge_shards.py to put the indexes of several shards together)
+def read_index(path):
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        constituents = {}
+        for compound_id, text, lemma in connection.execute('SELECT compound_id, text, lemma FROM constituents ORDER BY compound_id, position'):
+            constituents.setdefault(compound_id, []).append((text, lemma))
+        analysis_rows = []
+        locations = []
+        for compound_id, filename, sent_id, tok_id, compound, comp_lemma, gold_branching, language, register, gold_brackets in connection.execute('SELECT * FROM compounds ORDER BY id'):
+            texts = [text for text, lemma in constituents[compound_id]]
+            lemmas = [lemma for text, lemma in constituents[compound_id]]
+            # const_1_* to const_3_* as prep_conllu.py fills them: three constituents only
+            fixed = texts + lemmas if len(texts) == 3 else ['_'] * 6
+            analysis_rows.append([compound, comp_lemma] + fixed + [gold_branching, language, register, gold_brackets,
+                                                                   '|'.join(texts), '|'.join(lemmas)])
+            locations.append((filename, sent_id, tok_id))
+        return analysis_rows, locations
+    finally:
+        connection.close()
+
+
+# compounds with a matching constituent (text and/or lemma, optionally at a position 1-N),
+# optionally only with a given gold_branching, language or register
+# returns rows with the columns of result_header
+def find_compounds(path, text=None, lemma=None, position=None, gold_branching=None, language=None, register=None):
+    if text is None and lemma is None:
+        raise ValueError('give the text or the lemma of a constituent')
+    conditions = []
+    params = []
+    for column, value in [('c.text', text), ('c.lemma', lemma), ('c.position', position), ('k.gold_branching', gold_branching),
+                          ('k.language', language), ('k.register', register)]:
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+    query = ('SELECT k.filename, k.sent_id, k.tok_id, c.position, c.text, c.lemma, '
+             'k.compound, k.comp_lemma, k.gold_branching, k.language, k.register '
+             'FROM constituents c JOIN compounds k ON k.id = c.compound_id '
+             'WHERE ' + ' AND '.join(conditions) + ' ORDER BY k.id, c.position')
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return connection.execute(query, params).fetchall()
+    finally:
+        connection.close()
+
+
+# all occurrences (filename, sent_id, tok_id, language, register) of a compound (whole-compound text)
+def find_occurrences(path, compound):
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return connection.execute('SELECT filename, sent_id, tok_id, language, register FROM compounds WHERE compound = ? ORDER BY id',
+                                  (compound,)).fetchall()
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look up compounds by constituent in an index written by prep_conllu.py --index.')
+    parser.add_argument('index', help='.sqlite index file')
+    parser.add_argument('--text', help='constituent text')
+    parser.add_argument('--lemma', help='constituent lemma')
+    parser.add_argument('--position', type=int, help='constituent position (1 for the first constituent)')
+    parser.add_argument('--gold-branching', choices=['AB', 'BC'], help='only compounds with this branching')
+    parser.add_argument('--language', help='only compounds in this language (EN, GER)')
+    parser.add_argument('--register', help='only compounds in this register (general, scientific)')
+    args = parser.parse_args()
+    if args.text is None and args.lemma is None:
+        parser.error('give --text or --lemma')
+
+    rows = find_compounds(args.index, text=args.text, lemma=args.lemma, position=args.position,
+                          gold_branching=args.gold_branching, language=args.language, register=args.register)
+    writer = csv.writer(sys.stdout, delimiter=';')
+    writer.writerow(result_header)
+    writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Type-level aggregation of the compound occurrences in the transparency-analysis table.
+Occurrences are folded into one row per compound type, keyed by (comp_lemma, language, register)
+(compounds without a lemma, comp_lemma '_', by their text instead), so the embedding lookups and
+model fits of the transparency analysis run once per type and can be weighted by count.
+
+Output: compound_types.csv (or prep_conllu.py --types FILE) with the columns of the analysis table
+(compound and constituents of the first occurrence) and
+    - gold_branching: the label of most occurrences (on a tie the one of the first occurrence)
+    - count, count_AB, count_BC: number of occurrences, with each gold_branching
+    - disagreement: True if occurrences of the type have different gold_branching labels
+    - locations: filename:sent_id:tok_id of every occurrence, separated by | (empty without locations)
+
+Usage:
+    python prep_conllu.py --types compound_types.csv
+    python compound_types.py --index comp_index.sqlite (e.g. after merge_shards.py --index)
+    python compound_types.py --csv compound_overview.csv (no locations)
+"""
+
+import argparse
+import csv
+
+from compound_index import read_index
+
+# columns of the analysis table (as in prep_conllu.py) and of the types table
+analysis_columns = ['compound', 'comp_lemma', 'const_1_text', 'const_2_text', 'const_3_text', 'const_1_lemma', 'const_2_lemma',
+                    'const_3_lemma', 'gold_branching', 'language', 'register', 'gold_brackets', 'const_texts', 'const_lemmas']
+type_header = analysis_columns + ['count', 'count_AB', 'count_BC', 'disagreement', 'locations']
+
+
+# analysis row of a csv row (a dict); tables without the last three columns (e.g. compound_overview.csv)
+# get const_texts and const_lemmas from const_1_* to const_3_* and gold_brackets '_'
+def csv_analysis_row(row):
+    values = [row.get(column, '_') for column in analysis_columns]
+    if 'const_texts' not in row:
+        values[12] = '|'.join(row[f'const_{position}_text'] for position in range(1, 4))
+        values[13] = '|'.join(row[f'const_{position}_lemma'] for position in range(1, 4))
+    return values
+
+
+# fold analysis rows (and their (filename, sent_id, tok_id) locations, if known) into type rows,
+# in the order the types first occur
+def aggregate_types(analysis_rows, locations=None):
+    types = {}
+    for row_ind, row in enumerate(analysis_rows):
+        # spans of unknown length only have a placeholder row
+        if row[0] == 'compound':
+            continue
+        key = (row[1] if row[1] != '_' else row[0], row[9], row[10])
+        entry = types.get(key)
+        if entry is None:
+            entry = types[key] = {'row': list(row[:len(analysis_columns)]), 'branching': {}, 'locations': []}
+        entry['branching'][row[8]] = entry['branching'].get(row[8], 0) + 1
+        if locations is not None:
+            filename, sent_id, tok_id = locations[row_ind]
+            entry['locations'].append(f'{filename}:{sent_id}:{tok_id}')
+    type_rows = []
+    for entry in types.values():
+        counts = entry['branching']
+        row = entry['row']
+        # max keeps the first label on a tie, dicts keep the order the labels came in
+        row[8] = max(counts, key=counts.get)
+        type_rows.append(row + [sum(counts.values()), counts.get('AB', 0), counts.get('BC', 0),
+                                len(counts) > 1, '|'.join(entry['locations'])])
+    return type_rows
+
+
+# write the types table as csv (same format as the other exports)
+def write_types(path, type_rows):
+    with open(path, 'w', newline='', encoding='utf8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(type_header)
+        writer.writerows(type_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold compound occurrences into compound types with counts.')
+    parser.add_argument('--index', default=None,
+                        help='compound index (prep_conllu.py --index or merge_shards.py --index), gives the locations')
+    parser.add_argument('--csv', default='comp_extraction_for_transparency_example.csv',
+                        help='analysis table to aggregate without --index (default: comp_extraction_for_transparency_example.csv)')
+    parser.add_argument('--output', default='compound_types.csv',
+                        help='types table to write (default: compound_types.csv)')
+    args = parser.parse_args()
+
+    if args.index:
+        analysis_rows, locations = read_index(args.index)
+    else:
+        # only the analysis columns (e.g. compound_overview.csv also has semRel columns)
+        with open(args.csv, newline='', encoding='utf8') as file:
+            analysis_rows = [csv_analysis_row(row) for row in csv.DictReader(file, delimiter=';')]
+        locations = None
+    type_rows = aggregate_types(analysis_rows, locations)
+    write_types(args.output, type_rows)
+    occurrences = sum(row[type_header.index('count')] for row in type_rows)
+    disagreements = sum(1 for row in type_rows if row[type_header.index('disagreement')])
+    print(f'{occurrences} occurrences, {len(type_rows)} types, {disagreements} with different gold_branching')
+
+
+if __name__ == '__main__':
+    main()
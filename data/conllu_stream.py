@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader and writer for .conllu files.
+
+Sentences are read one at a time, so memory stays flat and extraction can start
+right away, no matter how large the parser output is.
+Tokens come in the same light dict structure as stanza's Document.to_dict():
+    - 'id' is an int for words and a (start, end) tuple for spans
+    - 'head' is an int
+    - columns with '_' are left out, except text and lemma of tokens whose text is '_'
+    - empty nodes (ids like 8.1) are skipped, like stanza does
+so the compound extraction in prep_conllu.py runs on them unchanged.
+
+Large files can be split into chunks at blank lines (sentence boundaries),
+so that several processes can work on the same file.
+
+Masked sentences are written back from their original lines, only FORM and LEMMA
+of masked tokens are rewritten, everything else is copied through unchanged.
+
+Compressed files (.conllu.gz, .conllu.xz, .conllu.bz2) are read the same way: a background
+thread decompresses them block by block ahead of the reader, so decompression overlaps with
+the extraction (gzip, lzma and bz2 release the GIL while they work). They are not split into chunks.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+
+FIELDS = ['id', 'text', 'lemma', 'upos', 'xpos', 'feats', 'head', 'deprel', 'deps', 'misc']
+
+# compression modules by file suffix, and the suffixes of .conllu files read as input
+COMPRESSIONS = {'.gz': gzip, '.xz': lzma, '.bz2': bz2}
+CONLLU_SUFFIXES = ['.conllu'] + ['.conllu' + suffix for suffix in COMPRESSIONS]
+
+# size of the blocks the background thread decompresses, and how many it keeps ready
+BLOCK_SIZE = 1024 * 1024
+READ_AHEAD = 8
+
+
+# compression suffix of a path ('' for uncompressed files)
+def compression_suffix(path):
+    suffix = os.path.splitext(path)[1]
+    return suffix if suffix in COMPRESSIONS else ''
+
+
+# path without the compression suffix and .conllu (e.g. for the _onlycomp.conllu file next to it)
+def conllu_stem(path):
+    path = path[:len(path) - len(compression_suffix(path))]
+    return path[:-7] if path.endswith('.conllu') else path
+
+
+# raw binary stream of a compressed file, decompressed by a background thread
+# (wrapped in io.BufferedReader by open_conllu, so lines can be read from it as from a file)
+class DecompressingReader(io.RawIOBase):
+    def __init__(self, path, module):
+        self.blocks = queue.Queue(READ_AHEAD)
+        self.block = b''
+        self.pos = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.decompress, args=(path, module), daemon=True)
+        self.thread.start()
+
+    # runs in the background thread: b'' after the last block, an exception if reading fails
+    def decompress(self, path, module):
+        try:
+            with module.open(path, 'rb') as file:
+                for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+                    self.blocks.put(block)
+                    if self.stop.is_set():
+                        return
+            self.blocks.put(b'')
+        except Exception as error:
+            self.blocks.put(error)
+
+    def readable(self):
+        return True
+
+    # block None: end of the file reached
+    def readinto(self, buffer):
+        if self.block is None:
+            return 0
+        if self.pos == len(self.block):
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                self.block = None
+                return 0
+            self.block = block
+            self.pos = 0
+        size = min(len(buffer), len(self.block) - self.pos)
+        buffer[:size] = self.block[self.pos:self.pos + size]
+        self.pos += size
+        return size
+
+    def close(self):
+        # let the thread finish (it may be waiting for room in the queue)
+        self.stop.set()
+        while self.thread.is_alive():
+            try:
+                self.blocks.get_nowait()
+            except queue.Empty:
+                self.thread.join(0.01)
+        super().close()
+
+
+# open a .conllu file, compressed or not (by its suffix, or by suffix if given)
+# compressed files are read through a DecompressingReader and written through the compression module
+def open_conllu(path, mode='rb', suffix=None):
+    module = COMPRESSIONS.get(compression_suffix(path) if suffix is None else suffix)
+    if module is None:
+        return open(path, mode)
+    if mode == 'rb':
+        return io.BufferedReader(DecompressingReader(path, module), BLOCK_SIZE)
+    # buffered, so the compressor gets large blocks instead of single lines,
+    # gzip at level 6 like the gzip command (the default 9 is about twice as slow for little gain)
+    return io.BufferedWriter(module.open(path, mode, **({'compresslevel': 6} if module is gzip else {})), BLOCK_SIZE)
+
+
+# convert one token line into a token dict (None for empty nodes)
+def parse_token_line(line):
+    cols = line.split('\t')
+    if len(cols) < 10:
+        # pad columns to 10
+        cols += ['_'] * (10 - len(cols))
+    id_field = cols[0]
+    if '.' in id_field:
+        return None
+    token = {}
+    for field, value in zip(FIELDS, cols):
+        if value == '_' or (value == '' and field == 'feats'):
+            continue
+        token[field] = value
+    if '-' in id_field:
+        start, end = id_field.split('-', 1)
+        token['id'] = (int(start), int(end))
+    else:
+        token['id'] = int(id_field)
+    if 'head' in token:
+        token['head'] = int(token['head'])
+    # keep text and lemma if text is '_' (masked tokens)
+    if cols[1] == '_':
+        token['text'] = cols[1]
+        token['lemma'] = cols[2]
+    return token
+
+
+# check if a line (bytes, not blank) is a token line, not a comment or an empty node
+def is_token_line(line):
+    line = line.strip(b' \n\r\t')
+    return line[:1] != b'#' and b'.' not in line.split(b'\t', 1)[0]
+
+
+# token dicts of a sentence's lines, each paired with the index of its line
+def parse_block(lines):
+    sentence = []
+    for line_ind, raw_line in enumerate(lines):
+        line = raw_line.decode('utf-8').strip(' \n\r\t')
+        if line[0] == '#':
+            continue
+        token = parse_token_line(line)
+        if token is not None:
+            sentence.append((token, line_ind))
+    return sentence
+
+
+# yield (lines, sentence) for every sentence in a .conllu file,
+# lines being its original lines as bytes (comments, token lines and empty nodes, with line endings)
+# and sentence the list of token dicts, each paired with the index of its line
+# with prefilter (bytes), only sentences containing it are parsed, the others come as (lines, None)
+# with parse False, no sentence is parsed (the caller parses the lines itself)
+# start and end are byte offsets at sentence boundaries (see find_sentence_chunks)
+def read_conllu_blocks(path, start=0, end=None, prefilter=None, parse=True):
+    with open_conllu(path) as file:
+        if start:
+            file.seek(start)
+        pos = start
+        lines = []
+        has_token = False
+        for raw_line in file:
+            if end is not None and pos >= end:
+                break
+            pos += len(raw_line)
+            if not raw_line.strip(b' \n\r\t'):
+                if has_token:
+                    yield lines, None if not parse or (prefilter is not None and prefilter not in b''.join(lines)) else parse_block(lines)
+                    lines = []
+                    has_token = False
+                continue
+            lines.append(raw_line)
+            if not has_token and is_token_line(raw_line):
+                has_token = True
+        if has_token:
+            yield lines, None if not parse or (prefilter is not None and prefilter not in b''.join(lines)) else parse_block(lines)
+
+
+# yield (comments, sentence) for every sentence in a .conllu file,
+# sentence being the list of token dicts
+# start and end are byte offsets at sentence boundaries (see find_sentence_chunks)
+def read_conllu_sentences(path, start=0, end=None):
+    for lines, sentence in read_conllu_blocks(path, start, end):
+        comments = [line.decode('utf-8').strip(' \n\r\t') for line in lines if line.lstrip()[:1] == b'#']
+        yield comments, [token for token, line_ind in sentence]
+
+
+# count the sentences read_conllu_sentences would yield between start and end
+# without parsing the token lines
+def count_sentences(path, start=0, end=None):
+    count = 0
+    with open_conllu(path) as file:
+        if start:
+            file.seek(start)
+        pos = start
+        has_token = False
+        for raw_line in file:
+            if end is not None and pos >= end:
+                break
+            pos += len(raw_line)
+            if not raw_line.strip(b' \n\r\t'):
+                if has_token:
+                    count += 1
+                    has_token = False
+            elif not has_token and is_token_line(raw_line):
+                has_token = True
+        if has_token:
+            count += 1
+    return count
+
+
+# (start, end) byte range of every sentence read_conllu_blocks would yield,
+# from its first line (comments included) to the end of its last line
+def find_sentence_ranges(path):
+    ranges = []
+    with open_conllu(path) as file:
+        pos = 0
+        start = None
+        end = None
+        has_token = False
+        for raw_line in file:
+            line_start = pos
+            pos += len(raw_line)
+            if not raw_line.strip(b' \n\r\t'):
+                if has_token:
+                    ranges.append((start, end))
+                    start = None
+                    has_token = False
+                continue
+            if start is None:
+                start = line_start
+            end = pos
+            if not has_token and is_token_line(raw_line):
+                has_token = True
+        if has_token:
+            ranges.append((start, end))
+    return ranges
+
+
+# split a file into (start, end) byte ranges of roughly chunk_size bytes,
+# every range ends after a blank line so no sentence is cut in two
+# (compressed files cannot be read from the middle, they are one chunk (0, None))
+def find_sentence_chunks(path, chunk_size):
+    if compression_suffix(path):
+        return [(0, None)]
+    size = os.path.getsize(path)
+    chunks = []
+    start = 0
+    with open(path, 'rb') as file:
+        while start + chunk_size < size:
+            file.seek(start + chunk_size)
+            # skip the rest of the current line, then move on to the next blank line
+            file.readline()
+            for raw_line in iter(file.readline, b''):
+                if not raw_line.strip():
+                    break
+            end = file.tell()
+            if end >= size:
+                break
+            chunks.append((start, end))
+            start = end
+    chunks.append((start, size))
+    return chunks
+
+
+# write the original lines of one sentence (from read_conllu_blocks) to a binary file,
+# followed by a blank line; only tokens masked in place (text and lemma '_')
+# get their FORM and LEMMA columns replaced, all other lines are copied as they are
+# (sentence None: sentence skipped by the prefilter, all its tokens get masked)
+def write_masked_sentence(file, lines, sentence):
+    lines = list(lines)
+    if sentence is None:
+        masked = [line_ind for line_ind, line in enumerate(lines) if is_token_line(line)]
+    else:
+        masked = [line_ind for token, line_ind in sentence if token.get('text') == '_' and token.get('lemma') == '_']
+    for line_ind in masked:
+        line = lines[line_ind]
+        body = line.rstrip(b'\r\n')
+        cols = body.split(b'\t')
+        if cols[1:3] != [b'_', b'_']:
+            cols[1:3] = [b'_', b'_']
+            lines[line_ind] = b'\t'.join(cols) + (line[len(body):] or b'\n')
+    # blank line after the sentence, with the line ending the file uses
+    ending = lines[-1][len(lines[-1].rstrip(b'\r\n')):]
+    if not ending:
+        ending = b'\r\n' if lines[0].endswith(b'\r\n') else b'\n'
+        lines[-1] += ending
+    file.writelines(lines)
+    file.write(ending)
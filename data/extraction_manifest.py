@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest for incremental runs of prep_conllu.py.
+
+The manifest is a .json file that stores for every input file:
+    - the sha256 hash of its content (plus size and mtime, so unchanged files are not hashed again)
+    - the rows it contributed to both csv exports (and the locations of the analysis rows)
+A rerun only extracts new or changed files and rebuilds both csv files from the stored rows.
+All cached rows are dropped when the extraction code (prep_conllu.py, conllu_stream.py) changes.
+"""
+
+import hashlib
+import json
+import os
+
+import conllu_stream
+
+
+# sha256 hash of a file's content
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# hash of the extraction code, cached rows are only valid for the code that produced them
+def extractor_hash(script_path):
+    sha = hashlib.sha256()
+    for path in [script_path, conllu_stream.__file__]:
+        sha.update(file_hash(path).encode('ascii'))
+    return sha.hexdigest()
+
+
+# load the manifest, start an empty one if there is none yet or the extraction code changed
+def load_manifest(path, script_path):
+    extractor = extractor_hash(script_path)
+    if os.path.exists(path):
+        with open(path, encoding='utf8') as file:
+            manifest = json.load(file)
+        if manifest.get('extractor') == extractor:
+            return manifest
+    return {'extractor': extractor, 'files': {}}
+
+
+# write the manifest, only keeping the files of the current run
+# (written to a temporary file first, so an interrupted run never leaves a broken manifest)
+def save_manifest(manifest, path, filenames):
+    manifest['files'] = {filename: manifest['files'][filename] for filename in filenames if filename in manifest['files']}
+    with open(path + '.tmp', 'w', encoding='utf8') as file:
+        json.dump(manifest, file, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+# check if a file is unchanged since the last run and its output still exists
+# the content hash of changed files is kept in stat_cache for update_entry
+def is_unchanged(manifest, filename, doc, out_path, stat_cache):
+    stat = os.stat(doc)
+    entry = manifest['files'].get(filename)
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+        content_hash = entry['hash']
+    else:
+        content_hash = file_hash(doc)
+    stat_cache[filename] = (content_hash, stat.st_size, stat.st_mtime_ns)
+    if entry is None or entry['hash'] != content_hash or not os.path.exists(out_path):
+        return False
+    entry['size'] = stat.st_size
+    entry['mtime'] = stat.st_mtime_ns
+    return True
+
+
+# store the rows of a freshly extracted file
+# values are stored the way csv.writer writes them, so cached and fresh runs give the same csv
+def update_entry(manifest, filename, stat_cache, tok_rows, analysis_rows, locations):
+    content_hash, size, mtime = stat_cache[filename]
+    manifest['files'][filename] = {
+        'hash': content_hash,
+        'size': size,
+        'mtime': mtime,
+        'tok_rows': [[str(value) for value in row] for row in tok_rows],
+        'analysis_rows': [[str(value) for value in row] for row in analysis_rows],
+        'locations': [[filename, sent_id, str(tok_id)] for filename, sent_id, tok_id in locations],
+    }
+
+
+# cached rows and locations of an unchanged file
+def cached_rows(manifest, filename):
+    entry = manifest['files'][filename]
+    return entry['tok_rows'], entry['analysis_rows'], entry['locations']
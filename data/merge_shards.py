@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Merge step for sharded runs of prep_conllu.py (--shards N --shard-index I).
+Input: the partial outputs of all N shards in the current directory (or --dir):
+    - comp_files.shard-I-of-N.json (rows per file of the shard)
+    - comp_info_example_all_annotations.shard-I-of-N.csv
+    - comp_extraction_for_transparency_example.shard-I-of-N.csv
+Output:
+    - comp_info_example_all_annotations.csv and comp_extraction_for_transparency_example.csv,
+      the same as one unsharded run over all files
+    - with --columnar: the same tables as typed .parquet or .arrow files (see columnar_export.py)
+    - with --index FILE: one index from the shard indexes FILE with .shard-I-of-N before the suffix (see compound_index.py)
+
+Procedure:
+    - check that every shard 0 to N-1 is there exactly once
+    - cut the rows of each shard into files with the row counts from comp_files.shard-I-of-N.json
+    - write the rows of all files sorted by filename, like prep_conllu.py does
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+
+import columnar_export
+from compound_index import build_index, read_index
+from prep_conllu import all_annotations_header, analysis_header, output_name
+
+
+# read the rows of a csv export without the header
+def read_rows(path):
+    with open(path, newline='', encoding='utf8') as file:
+        return list(csv.reader(file, delimiter=';'))[1:]
+
+
+# rows of a shard per filename: {filename: (tok_rows, analysis_rows)}
+def read_shard(directory, shards, shard_index, counts):
+    def path(stem):
+        return os.path.join(directory, output_name(stem, '.csv', shards, shard_index))
+    tok_rows = read_rows(path('comp_info_example_all_annotations'))
+    analysis_rows = read_rows(path('comp_extraction_for_transparency_example'))
+    if sum(count[1] for count in counts) != len(tok_rows) or sum(count[2] for count in counts) != len(analysis_rows):
+        raise SystemExit(f'shard {shard_index}: row counts do not match comp_files.shard-{shard_index}-of-{shards}.json')
+    file_rows = {}
+    tok_ind = 0
+    analysis_ind = 0
+    for filename, tok_count, analysis_count in counts:
+        file_rows[filename] = (tok_rows[tok_ind:tok_ind + tok_count], analysis_rows[analysis_ind:analysis_ind + analysis_count])
+        tok_ind += tok_count
+        analysis_ind += analysis_count
+    return file_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge the partial outputs of sharded prep_conllu.py runs.')
+    parser.add_argument('--dir', default='.',
+                        help='directory with the partial outputs of all shards (default: current directory)')
+    parser.add_argument('--columnar', choices=columnar_export.FORMATS, default=None,
+                        help='also write both tables as typed .parquet or .arrow files (needs pyarrow)')
+    parser.add_argument('--index', default=None,
+                        help='merge the shard indexes written with prep_conllu.py --index into this .sqlite file')
+    args = parser.parse_args()
+    if args.columnar and columnar_export.pa is None:
+        parser.error('--columnar needs pyarrow (pip install pyarrow)')
+
+    # find the shards and check they are complete
+    shard_files = {}
+    for path in glob.glob(os.path.join(args.dir, 'comp_files.shard-*-of-*.json')):
+        with open(path, encoding='utf8') as file:
+            shard = json.load(file)
+        shard_files.setdefault(shard['shards'], {})[shard['shard_index']] = shard['files']
+    if len(shard_files) != 1:
+        raise SystemExit(f'expected the shards of one run in {args.dir}, found runs with {sorted(shard_files)} shards')
+    shards, counts = shard_files.popitem()
+    missing = [shard_index for shard_index in range(shards) if shard_index not in counts]
+    if missing:
+        raise SystemExit(f'missing shards: {missing}')
+
+    # collect the rows of all files
+    file_rows = {}
+    for shard_index in range(shards):
+        for filename, rows in read_shard(args.dir, shards, shard_index, counts[shard_index]).items():
+            if filename in file_rows:
+                raise SystemExit(f'{filename} is in more than one shard')
+            file_rows[filename] = rows
+
+    # create lists for csv export in file order
+    long_data_list = [all_annotations_header]
+    long_data_list_analysis = [analysis_header]
+    for filename in sorted(file_rows):
+        long_data_list.extend(file_rows[filename][0])
+        long_data_list_analysis.extend(file_rows[filename][1])
+    print(f'merged {shards} shards with {len(file_rows)} files')
+
+    # export general comp info
+    with open('comp_info_example_all_annotations.csv', 'w', newline='', encoding='utf8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(long_data_list)
+
+    # export analysis file for transparency analysis
+    with open('comp_extraction_for_transparency_example.csv', 'w', newline='', encoding='utf8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(long_data_list_analysis)
+
+    # export both tables with typed columns
+    if args.columnar:
+        columnar_export.write_table('comp_info_example_all_annotations', all_annotations_header, long_data_list[1:], args.columnar)
+        columnar_export.write_table('comp_extraction_for_transparency_example', analysis_header, long_data_list_analysis[1:], args.columnar)
+
+    # index from constituents to compound locations, the compounds of all shards in file order
+    if args.index:
+        index_stem, index_suffix = os.path.splitext(args.index)
+        index_rows = {}
+        for shard_index in range(shards):
+            shard_path = os.path.join(args.dir, output_name(os.path.basename(index_stem), index_suffix, shards, shard_index))
+            for row, location in zip(*read_index(shard_path)):
+                index_rows.setdefault(location[0], ([], []))
+                index_rows[location[0]][0].append(row)
+                index_rows[location[0]][1].append(location)
+        analysis_rows = [row for filename in sorted(index_rows) for row in index_rows[filename][0]]
+        locations = [location for filename in sorted(index_rows) for location in index_rows[filename][1]]
+        build_index(args.index, analysis_rows, locations)
+
+
+if __name__ == '__main__':
+    main()
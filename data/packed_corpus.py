@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Packed binary container for a corpus of .conllu files.
+
+Every token line is stored as ten integer ids, one per CoNLL-U column, into per-column
+string tables, so repeated FEATS, UPOS/XPOS, DEPREL (and most FORM/LEMMA) values are kept once.
+All other lines (comments, blank lines, lines with an unusual line ending or layout) are
+stored as they are in a table of raw lines. A sentence table holds the lines of every sentence
+as read_conllu_blocks in conllu_stream.py yields them.
+Unpacking gives back every file byte for byte (compressed .conllu.gz/.xz/.bz2 files are packed
+decompressed and compressed again when unpacked, so their content is the same, not their bytes).
+
+File layout (.conllup):
+    - b'CONLLUP1' and the length of the header (uint64, little endian)
+    - header: zlib-compressed json with the string tables, the documents (filename, line ending,
+      first line and number of lines, first sentence and number of sentences, size of the .conllu file)
+      and where each array is
+    - arrays: zlib-compressed, per column the table id of every line (uint8/16/32, depending on the table size),
+      the raw line id of every line (0 = token line, n = raw line n - 1) and the (first, end) line of every sentence
+
+Usage:
+    python packed_corpus.py --pack corpus.conllup [--input-root DIR]
+    python packed_corpus.py --unpack corpus.conllup --output-root DIR
+    python prep_conllu.py --packed corpus.conllup (reads the packed documents directly)
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+from conllu_stream import FIELDS, is_token_line, open_conllu, parse_token_line
+
+MAGIC = b'CONLLUP1'
+
+# marker of empty nodes (ids like 8.1) in the id column view
+EMPTY_NODE = object()
+
+
+# str of a line that is valid in any encoding (bytes that are no utf-8 survive as surrogates)
+def decode_line(raw_line):
+    return raw_line.decode('utf-8', 'surrogateescape')
+
+
+# smallest array typecode for ids up to size
+def id_typecode(size):
+    if size < 2 ** 8:
+        return 'B'
+    if size < 2 ** 16:
+        return 'H'
+    return 'I'
+
+
+# ten column values of a token line that can be stored in the column tables, None for lines kept raw
+# (comments, blank lines, another line ending, no utf-8, spaces around the line, not 10 columns, unreadable ids or heads)
+def token_columns(raw_line, ending):
+    if not raw_line.endswith(ending) or not is_token_line(raw_line):
+        return None
+    try:
+        body = raw_line[:-len(ending)].decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    if '\r' in body or '\n' in body or body != body.strip(' \t'):
+        return None
+    columns = body.split('\t')
+    if len(columns) != 10:
+        return None
+    try:
+        parse_token_line(body)
+    except ValueError:
+        return None
+    return columns
+
+
+# (first, end) line of every sentence read_conllu_blocks would yield, blank lines in between are left out when reading
+def sentence_lines(raw_lines):
+    sentences = []
+    first = None
+    has_token = False
+    for line_ind, raw_line in enumerate(raw_lines):
+        if not raw_line.strip(b' \n\r\t'):
+            if has_token:
+                sentences.append((first, line_ind))
+                first = None
+                has_token = False
+            continue
+        if first is None:
+            first = line_ind
+        if not has_token and is_token_line(raw_line):
+            has_token = True
+    if has_token:
+        sentences.append((first, len(raw_lines)))
+    return sentences
+
+
+# pack the docs (paths) under their filenames into one container
+def pack_corpus(path, documents, filenames):
+    tables = [{} for field in FIELDS]
+    raw_table = {}
+    columns = [[] for field in FIELDS]
+    raw_ids = []
+    sentences = []
+    entries = []
+    for doc in documents:
+        with open_conllu(doc) as file:
+            raw_lines = file.readlines()
+        # the line ending of most lines, lines with another one are kept raw
+        crlf = sum(1 for raw_line in raw_lines if raw_line.endswith(b'\r\n'))
+        ending = b'\r\n' if crlf * 2 > len(raw_lines) else b'\n'
+        doc_sentences = sentence_lines(raw_lines)
+        entries.append({
+            'filename': filenames[doc],
+            'ending': ending.decode('ascii'),
+            'first_line': len(raw_ids),
+            'lines': len(raw_lines),
+            'first_sentence': len(sentences),
+            'sentences': len(doc_sentences),
+            'size': sum(len(raw_line) for raw_line in raw_lines),
+        })
+        for first, end in doc_sentences:
+            sentences.append((first, end))
+        for raw_line in raw_lines:
+            values = token_columns(raw_line, ending)
+            if values is None:
+                raw_ids.append(raw_table.setdefault(decode_line(raw_line), len(raw_table)) + 1)
+                values = ['_'] * 10
+            else:
+                raw_ids.append(0)
+            for table, column, value in zip(tables, columns, values):
+                column.append(table.setdefault(value, len(table)))
+
+    arrays = [array(id_typecode(len(table)), column) for table, column in zip(tables, columns)]
+    arrays.append(array(id_typecode(len(raw_table) + 1), raw_ids))
+    arrays.append(array('I', [line_ind for sentence in sentences for line_ind in sentence]))
+    blobs = []
+    layout = []
+    offset = 0
+    for values in arrays:
+        if sys.byteorder != 'little':
+            values.byteswap()
+        blob = zlib.compress(values.tobytes())
+        layout.append([values.typecode, offset, len(blob)])
+        blobs.append(blob)
+        offset += len(blob)
+    header = zlib.compress(json.dumps({
+        'tables': [list(table) for table in tables],
+        'raw': list(raw_table),
+        'documents': entries,
+        'arrays': layout,
+    }).encode('ascii'))
+    with open(path + '.tmp', 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for blob in blobs:
+            file.write(blob)
+    os.replace(path + '.tmp', path)
+    return len(entries), len(sentences)
+
+
+# load a container, with everything the readers need precomputed
+def open_packed(path):
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is no packed corpus')
+        header = json.loads(zlib.decompress(file.read(struct.unpack('<Q', file.read(8))[0])))
+        data = file.read()
+    arrays = []
+    for typecode, offset, length in header['arrays']:
+        values = array(typecode)
+        values.frombytes(zlib.decompress(data[offset:offset + length]))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        arrays.append(values)
+    tables = header['tables']
+    sentences = arrays[11]
+    return {
+        'documents': {entry['filename']: entry for entry in header['documents']},
+        'order': [entry['filename'] for entry in header['documents']],
+        'tables': tables,
+        'table_bytes': [[value.encode('utf-8', 'surrogateescape') for value in table] for table in tables],
+        'raw_bytes': [None] + [line.encode('utf-8', 'surrogateescape') for line in header['raw']],
+        'blank': [False] + [not line.strip(' \n\r\t') for line in header['raw']],
+        'views': column_views(tables),
+        'columns': arrays[:10],
+        'raw_ids': arrays[10],
+        'sentences': list(zip(sentences[::2], sentences[1::2])),
+    }
+
+
+# token dict values of every table entry, as parse_token_line would set them (None: column left out)
+def column_views(tables):
+    views = []
+    for field, table in zip(FIELDS, tables):
+        view = []
+        for value in table:
+            if value == '_' or (value == '' and field == 'feats'):
+                view.append(None)
+            elif field == 'id':
+                if '.' in value:
+                    view.append(EMPTY_NODE)
+                elif '-' in value:
+                    start, end = value.split('-', 1)
+                    view.append((int(start), int(end)))
+                else:
+                    view.append(int(value))
+            elif field == 'head':
+                view.append(int(value))
+            else:
+                view.append(value)
+        views.append(view)
+    return views
+
+
+# containers opened in this process, workers reuse them for all their tasks
+opened = {}
+
+
+def get_packed(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in opened:
+        opened.clear()
+        opened[key] = open_packed(path)
+    return opened[key]
+
+
+# original bytes of the lines start to end (column by column, which is much faster than line by line)
+def lines_bytes(corpus, start, end, ending):
+    values = [[table[table_id] for table_id in column[start:end]] for table, column in zip(corpus['table_bytes'], corpus['columns'])]
+    raw_bytes = corpus['raw_bytes']
+    return [raw_bytes[raw_id] if raw_id else b'\t'.join(line_values) + ending
+            for raw_id, line_values in zip(corpus['raw_ids'][start:end], zip(*values))]
+
+
+# token dicts of token lines, None for empty nodes (the same as parse_token_line gives)
+# (column by column, like lines_bytes)
+def lines_tokens(corpus, line_inds):
+    values = [[view[column[line_ind]] for line_ind in line_inds] for view, column in zip(corpus['views'], corpus['columns'])]
+    tokens = []
+    for line_values in zip(*values):
+        if line_values[0] is EMPTY_NODE:
+            tokens.append(None)
+            continue
+        token = {field: value for field, value in zip(FIELDS, line_values) if value is not None}
+        # keep text and lemma if text is '_' (masked tokens)
+        if line_values[1] is None:
+            token['text'] = '_'
+            token['lemma'] = '_' if line_values[2] is None else line_values[2]
+        tokens.append(token)
+    return tokens
+
+
+# table ids per column whose value contains a prefilter (bytes without tab or line break)
+def prefilter_hits(corpus, prefilter):
+    return [(column, {table_id for table_id, value in enumerate(table) if prefilter in value})
+            for column, table in zip(corpus['columns'], corpus['table_bytes'])]
+
+
+# yield (lines, sentence) for the sentences start to end (numbers within the doc) of a packed doc,
+# the same as read_conllu_blocks on the original .conllu file yields for them
+def read_packed_blocks(path, filename, start=0, end=None, prefilter=None):
+    corpus = get_packed(path)
+    entry = corpus['documents'][filename]
+    ending = entry['ending'].encode('ascii')
+    raw_ids = corpus['raw_ids']
+    blank = corpus['blank']
+    end = entry['sentences'] if end is None else end
+    hits = None
+    if prefilter is not None and b'\t' not in prefilter and b'\n' not in prefilter:
+        hits = [(column, ids) for column, ids in prefilter_hits(corpus, prefilter) if ids]
+    for first, last in corpus['sentences'][entry['first_sentence'] + start:entry['first_sentence'] + end]:
+        first += entry['first_line']
+        last += entry['first_line']
+        all_lines = lines_bytes(corpus, first, last, ending)
+        line_inds = [line_ind for line_ind in range(first, last) if not blank[raw_ids[line_ind]]]
+        lines = [all_lines[line_ind - first] for line_ind in line_inds]
+        if prefilter is not None:
+            if hits is None:
+                found = prefilter in b''.join(lines)
+            else:
+                found = any(prefilter in lines[ind] for ind, line_ind in enumerate(line_inds) if raw_ids[line_ind]) or \
+                    any(column[line_ind] in ids for column, ids in hits for line_ind in line_inds if not raw_ids[line_ind])
+            if not found:
+                yield lines, None
+                continue
+        tokens = iter(lines_tokens(corpus, [line_ind for line_ind in line_inds if not raw_ids[line_ind]]))
+        sentence = []
+        for ind, line_ind in enumerate(line_inds):
+            if raw_ids[line_ind]:
+                # raw lines are parsed like parse_block does
+                line = lines[ind].decode('utf-8').strip(' \n\r\t')
+                if line[0] == '#':
+                    continue
+                token = parse_token_line(line)
+            else:
+                token = next(tokens)
+            if token is not None:
+                sentence.append((token, ind))
+        yield lines, sentence
+
+
+# write all docs back as .conllu files under output_root
+def unpack_corpus(path, output_root):
+    corpus = open_packed(path)
+    for filename in corpus['order']:
+        entry = corpus['documents'][filename]
+        ending = entry['ending'].encode('ascii')
+        out_path = os.path.join(output_root, filename)
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with open_conllu(out_path, 'wb') as file:
+            file.writelines(lines_bytes(corpus, entry['first_line'], entry['first_line'] + entry['lines'], ending))
+    return len(corpus['order'])
+
+
+def main():
+    # imported here, prep_conllu.py imports this module
+    from prep_conllu import find_documents
+
+    parser = argparse.ArgumentParser(description='Pack .conllu files into one container with interned column values, or unpack it.')
+    parser.add_argument('--pack', metavar='FILE', help='pack all .conllu files in the current directory or under --input-root into FILE')
+    parser.add_argument('--input-root', default=None,
+                        help='like prep_conllu.py --input-root, the filenames in the container are relative to it')
+    parser.add_argument('--unpack', metavar='FILE', help='write the .conllu files of FILE back under --output-root')
+    parser.add_argument('--output-root', default='.', help='directory to unpack into (default: current directory)')
+    args = parser.parse_args()
+    if not args.pack and not args.unpack:
+        parser.error('give --pack or --unpack')
+
+    if args.pack:
+        root = args.input_root or '.'
+        documents = find_documents(args.input_root)
+        filenames = {doc: Path(os.path.relpath(doc, root)).as_posix() for doc in documents}
+        files, sentences = pack_corpus(args.pack, documents, filenames)
+        size = sum(os.path.getsize(doc) for doc in documents)
+        print(f'{files} files, {sentences} sentences: {size} bytes packed into {os.path.getsize(args.pack)} bytes')
+    if args.unpack:
+        print(f'{unpack_corpus(args.unpack, args.output_root)} files written to {args.output_root}')
+
+
+if __name__ == '__main__':
+    main()
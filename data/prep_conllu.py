@@ -9,414 +9,614 @@ Input: .conllu files with annotated compounds in sentence context
 Output:
     - one .csv file with individual compounds and all annotation info
     - one .csv file with individual compounds and selected info (for semantic transparency analysis)
+    - one _onlycomp.conllu file per input file with all non-compound tokens masked
     
 Procedure:
     - convert all .conllu.txt files to .conllu
-    - take all .conllu files
-    - extract compounds and annotation from each .conllu file
+    - take all .conllu files (in the current directory or under --input-root, or from a --packed corpus),
+      also compressed ones (.conllu.gz, .conllu.xz, .conllu.bz2, decompressed on the fly)
+      (with --shards/--shard-index: only the files of one shard, picked by a hash of the filename)
+    - stream each .conllu file sentence by sentence (see conllu_stream.py)
+    - skip sentences without 'compound:nmod' in their raw bytes (they cannot contain
+      a compound and are only masked), parse the rest
+    - extract compounds and annotation from each sentence
+      (with --workers: files and chunks of large files in parallel, merged back in file/sentence order)
+      (with --manifest: only new or changed files, the rows of unchanged files come from the manifest)
     - create output .csv files
+      (with --columnar: also typed .parquet or .arrow files, see columnar_export.py)
+      (with --shards: partial outputs named *.shard-I-of-N.*, combined by merge_shards.py)
+      (with --index: also an sqlite index from constituents to compound locations, see compound_index.py)
+      (with --types: also a table of compound types with counts and locations, see compound_types.py)
+      (with --compress-output: _onlycomp.conllu files compressed, e.g. _onlycomp.conllu.gz)
 """
 
+import argparse
 import glob
-import json
-from stanza.utils.conll import CoNLL
-from stanza.models.common.doc import Document
 import csv
-import ast
+import hashlib
+import itertools
+import json
+import multiprocessing
 import os
+import re
+import shutil
 from pathlib import Path
 
-# convert files ending in .conllu.txt to .conllu
-for path in Path('.').glob('*.conllu.txt'): # get .conllu.txt files
-    new_path = path.with_suffix('') # create new path without .txt suffix
-    path.rename(new_path) # rename file
-
-# read all conllu docs
-documents = glob.glob('./*.conllu')
-
-# create lists for csv export
-long_data_list = [['filename', 'language', 'register', 'sent_id', 'tok_id', 'tok_text', 'tok_lemma', 'deprel', 'misc', 'prev_tok', 'second_prev_tok']]
-long_data_list_analysis = [['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']]
-
-comp_analysis_row = ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']
-span_length = 0
-comp_collect = []
-
-# get comps from each doc
-for doc_ind, doc in enumerate(documents):
-    #print(doc)
-    entire_doc = CoNLL.conll2doc(doc)
-    entire_dict = entire_doc.to_dict()
-    print('entire: ', entire_dict)
-    filename = doc[2:]
-    print(filename)
-    
-    # get language info from filename
+from conllu_stream import (read_conllu_blocks, write_masked_sentence, count_sentences, find_sentence_chunks, open_conllu,
+                           compression_suffix, conllu_stem, COMPRESSIONS, CONLLU_SUFFIXES)
+from extraction_manifest import load_manifest, save_manifest, is_unchanged, update_entry, cached_rows
+import columnar_export
+from compound_index import build_index
+from compound_types import aggregate_types, write_types
+import packed_corpus
+
+# headers of the csv exports
+all_annotations_header = ['filename', 'language', 'register', 'sent_id', 'tok_id', 'tok_text', 'tok_lemma', 'deprel', 'misc', 'prev_tok', 'second_prev_tok']
+# const_1_* to const_3_* are the constituents of a three-constituent compound ('_' for other numbers of constituents),
+# const_texts and const_lemmas hold all constituents of any compound, separated by |
+analysis_header = ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register','gold_brackets','const_texts','const_lemmas']
+
+
+# get language info from filename
+def get_language(filename):
     if any(x in filename for x in ['.eng.', 'anno_sw', 'dd_anno', 'sw_anno', 'sw_dd']):
-        language = 'EN'
+        return 'EN'
     elif any(x in filename for x in ['.ger.', 'anno_kg', 'anno_mm']):
-        language = 'GER'
-    else:
-        language = 'NA'
-    
-    # get register info from filename
+        return 'GER'
+    return 'NA'
+
+
+# get register info from filename
+def get_register(filename):
     if any(x in filename for x in ['.eng.', '.ger.']):
-        register = 'scientific'
+        return 'scientific'
+    return 'general'
+
+
+# token kinds for the compound scan (bit flags)
+SPAN = 1     # span token, id like 12-14
+DEPREL = 2   # has a deprel
+NMOD = 4     # deprel contains compound:nmod
+HYPHEN = 8   # text is '-'
+DASH = 16    # text contains '-'
+
+# layouts of span compounds, positions relative to the span token:
+#   compound: (position, separator in front) of the parts of the whole compound
+#   constituents: positions of the three constituents (their heads give the branching, see bracketing)
+span_layouts = {
+    # const+hyphen+span
+    'hyphen_before': {'compound': [(-4, ''), (-1, ''), (0, '')], 'constituents': [-2, 1, 2]},
+    # span+hyphen+const
+    'hyphen_after': {'compound': [(0, ''), (1, ''), (2, '')], 'constituents': [1, 2, 4]},
+    # 2span-nmod-nmod-const
+    'span_first': {'compound': [(0, ''), (3, ' ')], 'constituents': [1, 2, 3]},
+    # nmod-2span-nmod-nmod
+    'span_second': {'compound': [(-1, ''), (0, ' ')], 'constituents': [-1, 1, 2]},
+    # Nspan-nmod-...-const (N >= 3): the N tokens after the span (constituents None)
+    'span_n': {'compound': [(0, '')], 'constituents': None},
+}
+
+# bracket strings of the gold_branching labels of three constituents
+label_brackets = {'AB': '((A B) C)', 'BC': '(A (B C))'}
+
+
+# classify a token for the compound scan
+def token_kind(token):
+    kind = 0
+    if isinstance(token.get('id'), tuple):
+        kind |= SPAN
+    deprel = token.get('deprel')
+    if deprel:
+        kind |= DEPREL
+        if 'compound:nmod' in deprel:
+            kind |= NMOD
+    text = token.get('text', '')
+    if '-' in text:
+        kind |= DASH
+        if text == '-':
+            kind |= HYPHEN
+    return kind
+
+
+# kind of a token further on in the sentence, 0 past its end
+def next_kind(sentence, token_ind):
+    return token_kind(sentence[token_ind]) if token_ind < len(sentence) else 0
+
+
+# general info of a compound token for the all-annotations csv
+def token_row(sentence, token_ind, s_ind, filename, language, register):
+    entire_tok = sentence[token_ind]
+    return [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
+            entire_tok.get('lemma', '_'), entire_tok.get('deprel', '_'), entire_tok.get('misc', '_'),
+            sentence[token_ind - 1].get('text', '_'), sentence[token_ind - 2].get('text', '_')]
+
+
+# same head for the first two constituents means BC, otherwise AB
+def branching(first, second):
+    return 'BC' if first.get('head') == second.get('head') else 'AB'
+
+
+# nested brackets of the tree the heads of the constituents (token dicts in order, any number) form,
+# e.g. ((A B) (C D)), None if they form no tree (no single constituent with its head outside the compound,
+# a cycle or crossing heads); heads are taken by their position in the constituent list, so they may point
+# left or right
+# one shift-reduce pass: the two subtrees on top of the stack are joined when the root of one has the root
+# of the other as head and has all its own modifiers already (left modifiers join before right ones)
+def head_brackets(constituents):
+    positions = {token.get('id'): const_ind for const_ind, token in enumerate(constituents)}
+    heads = [positions.get(token.get('head')) for token in constituents]
+    # modifiers of every constituent not joined yet
+    waiting = [0] * len(constituents)
+    for const_ind, head in enumerate(heads):
+        if head == const_ind:
+            return None
+        if head is not None:
+            waiting[head] += 1
+    stack = []
+    for const_ind in range(len(constituents)):
+        stack.append((chr(ord('A') + const_ind), const_ind))
+        while len(stack) > 1:
+            (left, left_root), (right, right_root) = stack[-2], stack[-1]
+            if heads[left_root] == right_root and not waiting[left_root]:
+                root = right_root
+            elif heads[right_root] == left_root and not waiting[right_root]:
+                root = left_root
+            else:
+                break
+            waiting[root] -= 1
+            stack[-2:] = [(f'({left} {right})', root)]
+    if len(stack) == 1 and heads[stack[0][1]] is None:
+        return stack[0][0]
+    return None
+
+
+# bracket string and gold_branching label of a compound from the heads of its constituents
+# three constituents: the label from the heads of the first two (AB/BC, as always) and its bracket string
+# (heads left as they were before a span was inserted can form another tree, so the label decides)
+# other numbers: the brackets of the tree the heads form ('_' if they form none) and the label '_'
+def bracketing(constituents):
+    if len(constituents) == 3:
+        label = branching(constituents[0], constituents[1])
+        return label_brackets[label], label
+    return head_brackets(constituents) or '_', '_'
+
+
+# const_1_* to const_3_* (three constituents only) and const_texts/const_lemmas of the analysis row
+def constituent_columns(const_text, const_lemma):
+    if len(const_text) == 3:
+        fixed = const_text + const_lemma
     else:
-        register = 'general'
-        
-    #comp_analysis_row[9] = language
-    #comp_analysis_row[10] = register
-    
-    for s_ind, sentence in enumerate(entire_dict):
-        for token_ind, entire_tok in enumerate(sentence):
-            print(entire_tok)
-            print(type(entire_tok['id']))
-            # detect compound span by '-' in tok_id and 'compound:nmod' in next tok
-            # leave text and lemma, extract general info+append and
-            # start building compound entry for analysis file
-            if 'id' in entire_tok and entire_tok['id'] != '' and isinstance(entire_tok['id'], tuple) and 'compound:nmod' in sentence[token_ind + 1]['deprel']: # and 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' not in entire_tok['deprel']  and '-' in entire_tok['id']
-                # print(entire_tok['deprel'])
-                # get general info
-                tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'], entire_tok['lemma'] if 'lemma' in entire_tok else '_',
-                            entire_tok['deprel'] if 'deprel' in entire_tok else '_', entire_tok['misc'] if 'misc' in entire_tok else '_', sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
-                            sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
-                long_data_list.append(tok_list)
-
-                # set span_length
-                span_id1 = entire_tok['id'][0]
-                span_id2 = entire_tok['id'][1]
-                span_length = int(span_id2)-int(span_id1)+1
-                print('Span length: ', span_length)
-
-                # build whole-compound if span_length is 2 / look for hyphen
-                if span_length == 2:
-                    # there are hyphens
-                    if ('text' in sentence[token_ind +1] and sentence[token_ind +1]['text'] != '' and sentence[token_ind +1]['text'] == '-') or ('text' in sentence[token_ind -1] and sentence[token_ind -1]['text'] != '' and sentence[token_ind -1]['text'] == '-'):
-                        # hyphen before (const+hyphen+span)
-                        if 'text' in sentence[token_ind - 1] and sentence[token_ind - 1]['text'] != '' and sentence[token_ind - 1]['text'] == '-':
-                            whole_comp_text = sentence[token_ind - 4]['text'] + sentence[token_ind - 1]['text'] + entire_tok['text']
-                            if 'lemma' in entire_tok:
-                                whole_comp_lemma = sentence[token_ind - 4]['lemma'] + sentence[token_ind - 1]['lemma'] + \
-                                              entire_tok['lemma']
-                            else:
-                                whole_comp_lemma = '_'
-                                # whole-comp
-                            comp_analysis_row[0] = whole_comp_text
-                            comp_analysis_row[1] = whole_comp_lemma
-                            # const_text
-                            comp_analysis_row[2] = sentence[token_ind - 2]['text']
-                            comp_analysis_row[3] = sentence[token_ind + 1]['text']
-                            comp_analysis_row[4] = sentence[token_ind + 2]['text']
-                            # const_lemma
-                            comp_analysis_row[5] = sentence[token_ind - 2]['lemma'] if 'lemma' in sentence[token_ind - 2] else '_'
-                            comp_analysis_row[6] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
-                            comp_analysis_row[7] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if sentence[token_ind - 2]['head'] == sentence[token_ind + 1]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif sentence[token_ind - 2]['head'] != sentence[token_ind + 1]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-
-                        # hyphen after (span+hyphen+const)
-                        else:
-                            whole_comp_text = entire_tok['text'] + sentence[token_ind +1]['text'] + sentence[token_ind + 2]['text']
-                            if 'lemma' in entire_tok:
-                                whole_comp_lemma = entire_tok['lemma'] + sentence[token_ind +1]['lemma'] + sentence[token_ind + 2]['lemma']
-                            else:
-                                whole_comp_lemma = '_'
-                            # whole comp
-                            comp_analysis_row[0] = whole_comp_text
-                            comp_analysis_row[1] = whole_comp_lemma
-                            # const_text
-                            comp_analysis_row[2] = sentence[token_ind + 1]['text']
-                            comp_analysis_row[3] = sentence[token_ind + 2]['text']
-                            comp_analysis_row[4] = sentence[token_ind + 4]['text']
-                            # const_lemma
-                            comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
-                            comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
-                            comp_analysis_row[7] = sentence[token_ind + 4]['lemma'] if 'lemma' in sentence[token_ind + 4] else '_'
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-                    # no hyphens
-                    else:
-                        # span first
-                        if 'compound:nmod' in sentence[token_ind +1]['deprel'] and 'compound:nmod' not in sentence[token_ind -1]['deprel']:
-                            print('spanfirst span2 no hyphens')
-                            whole_comp_text = entire_tok['text'] + ' ' + sentence[token_ind + 3]['text']
-                            if 'lemma' in entire_tok:
-                                whole_comp_lemma = entire_tok['lemma'] + ' ' + sentence[token_ind + 3]['lemma']
-                            else:
-                                whole_comp_lemma = '_'
-                            # whole comp
-                            comp_analysis_row[0] = whole_comp_text
-                            comp_analysis_row[1] = whole_comp_lemma
-                            comp_analysis_row[2] = sentence[token_ind + 1]['text']
-                            comp_analysis_row[3] = sentence[token_ind + 2]['text']
-                            comp_analysis_row[4] = sentence[token_ind + 3]['text']
-                            # const_lemma
-                            comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
-                            comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
-                            comp_analysis_row[7] = sentence[token_ind + 3]['lemma'] if 'lemma' in sentence[token_ind + 3] else '_'
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-                        # span second
-                        else:
-                            print('spansecond span2 no hyphens')
-                            whole_comp_text = sentence[token_ind - 1]['text'] + ' ' + entire_tok['text']
-                            if 'lemma' in entire_tok:
-                                whole_comp_lemma = sentence[token_ind - 1]['lemma'] + ' ' + entire_tok['lemma']
-                            else:
-                                whole_comp_lemma = '_'
-                            # whole comp
-                            comp_analysis_row[0] = whole_comp_text
-                            comp_analysis_row[1] = whole_comp_lemma
-                            # const_text
-                            comp_analysis_row[2] = sentence[token_ind - 1]['text']
-                            comp_analysis_row[3] = sentence[token_ind + 1]['text']
-                            comp_analysis_row[4] = sentence[token_ind + 2]['text']
-                            # const_lemma
-                            comp_analysis_row[5] = sentence[token_ind - 1]['lemma'] if 'lemma' in sentence[token_ind - 1] else '_'
-                            comp_analysis_row[6] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
-                            comp_analysis_row[7] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if sentence[token_ind - 1]['head'] == sentence[token_ind + 1]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif sentence[token_ind - 1]['head'] != sentence[token_ind + 1]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-                # if span is 3 store text of span-tok in analysis row, then collect constituents (text/lemma)
-                elif span_length == 3:
-                    # whole comp
-                    comp_analysis_row[0] = entire_tok['text']
-                    comp_analysis_row[1] = entire_tok['lemma'] if 'lemma' in entire_tok else '_'
-                    # const_text
-                    comp_analysis_row[2] = sentence[token_ind + 1]['text']
-                    comp_analysis_row[3] = sentence[token_ind + 2]['text']
-                    comp_analysis_row[4] = sentence[token_ind + 3]['text']
-                    # const_lemma
-                    comp_analysis_row[5] = sentence[token_ind + 1]['lemma'] if 'lemma' in sentence[token_ind + 1] else '_'
-                    comp_analysis_row[6] = sentence[token_ind + 2]['lemma'] if 'lemma' in sentence[token_ind + 2] else '_'
-                    comp_analysis_row[7] = sentence[token_ind + 3]['lemma'] if 'lemma' in sentence[token_ind + 3] else '_'
-                    # check head-structure considering possible hyphenation to determine branching structure
-                    # then store branching-structure in analysis_row
-                    if sentence[token_ind + 1]['head'] == sentence[token_ind + 2]['head']:
-                        comp_analysis_row[8] = 'BC'
-                    elif sentence[token_ind + 1]['head'] != sentence[token_ind + 2]['head']:
-                        comp_analysis_row[8] = 'AB'
-
-                # append
-                print(comp_analysis_row)
-                comp_analysis_row[9] = language
-                comp_analysis_row[10] = register
-                long_data_list_analysis.append(comp_analysis_row)
-                # clear
-                comp_analysis_row = ['compound', 'comp_lemma', 'const_1_text', 'const_2_text', 'const_3_text','const_1_lemma', 'const_2_lemma', 'const_3_lemma', 'gold_branching','language','register']
-                print('Appended analysis_row in span3')
-
-            # detect first constituent of non-span compound (nmod in this token and in the next, but not in the previous)
-            # leave text and lemma, extract general info+append and
-            # start building compound entry for analysis file
-            elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' in entire_tok['deprel'] and ('compound:nmod' in sentence[token_ind +1]['deprel'] or ('-' in sentence[token_ind +1]['text'] and 'compound:nmod' in sentence[token_ind +2]['deprel'] if 'deprel' in sentence[token_ind +2] else 'compound:nmod' in sentence[token_ind +3]['deprel'])) and (('deprel'in sentence[token_ind -1] and 'compound:nmod' not in sentence[token_ind -1]['deprel']) or 'deprel' not in sentence[token_ind -1]):
-                print(entire_tok['deprel'])
-                # get general info
-                tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
-                            entire_tok['lemma'] if 'lemma' in entire_tok else '_',
-                            entire_tok['deprel'] if 'deprel' in entire_tok else '_',
-                            entire_tok['misc'] if 'misc' in entire_tok else '_',
-                            sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
-                            sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
-                long_data_list.append(tok_list)
-                comp_collect.append(entire_tok)
-
-
-
-            # detect non-last-constituent (nmod in this token and in the previous, but not in the next)
-            # leave text and lemma, extract general info+append and
-            # continue building compound entry for analysis file
-            elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' in entire_tok['deprel'] and (('deprel' in sentence[token_ind -1] and'compound:nmod' in sentence[token_ind -1]['deprel']) or '-' in sentence[token_ind -1]['text']) and 'compound:nmod' not in sentence[token_ind +1]['deprel']:
-                print(entire_tok['deprel'])
-                # get general info
-                tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
-                            entire_tok['lemma'] if 'lemma' in entire_tok else '_',
-                            entire_tok['deprel'] if 'deprel' in entire_tok else '_',
-                            entire_tok['misc'] if 'misc' in entire_tok else '_',
-                            sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
-                            sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
-                long_data_list.append(tok_list)
-                comp_collect.append(entire_tok)
-
-
-            # detect last-constituent (no nmod in this token but in the previous)
-            # leave text and lemma, extract general info+append and
-            # continue building compound entry for analysis file
-            # possible spellings here: 3span-nmod-nmod-const, nmod-nmod-const, nmod-span-nmod-const, 2span-nmod-nmod-const
-            elif 'deprel' in entire_tok and entire_tok['deprel'] != '' and 'compound:nmod' not in entire_tok['deprel'] and '-' not in entire_tok['text'] and (('deprel' in sentence[token_ind -1] and 'compound:nmod' in sentence[token_ind -1]['deprel']) or ('-' in sentence[token_ind -1]['text'] and 'compound:nmod' in sentence[token_ind -2]['deprel'])):
-                print(entire_tok['deprel'])
-                # get general info
-                tok_list = [filename, language, register, s_ind + 1, entire_tok['id'], entire_tok['text'],
-                            entire_tok['lemma'] if 'lemma' in entire_tok else '_',
-                            entire_tok['deprel'] if 'deprel' in entire_tok else '_',
-                            entire_tok['misc'] if 'misc' in entire_tok else '_',
-                            sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
-                            sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
-                long_data_list.append(tok_list)
-                comp_collect.append(entire_tok)
-
-                # finish building compound entry, append and clear analysis_row, reset span_length
-                # distinguish between span-comp and non-span-comp and hyphenated comp for building the whole-comp in analysis_row
-                # only build whole compound if span_length is 0, if 2 or 3 it is already build in the span-elif
-                print('Span length: ', span_length)
-                if span_length == 0:
-                    # look for hyphens, collect constituents and hyphens
-                    # no hyphen
-                    if len(comp_collect) == 3:
-                        print('comp_collect: ', comp_collect)
-                        # whole comp
-                        comp_analysis_row[0] = comp_collect[0]['text'] + ' ' + comp_collect[1]['text'] + ' ' + comp_collect[2]['text']
-                        comp_analysis_row[1] = comp_collect[0]['lemma'] + ' ' + comp_collect[1]['lemma'] + ' ' + comp_collect[2]['lemma']
-                        # const_text
-                        comp_analysis_row[2] = comp_collect[0]['text']
-                        comp_analysis_row[3] = comp_collect[1]['text']
-                        comp_analysis_row[4] = comp_collect[2]['text']
-                        # const_lemma
-                        comp_analysis_row[5] = comp_collect[0]['lemma']
-                        comp_analysis_row[6] = comp_collect[1]['lemma']
-                        comp_analysis_row[7] = comp_collect[2]['lemma']
-                        # check head-structure considering possible hyphenation to determine branching structure
-                        # then store branching-structure in analysis_row
-                        if comp_collect[0]['head'] == comp_collect[1]['head']:
-                            comp_analysis_row[8] = 'BC'
-                        elif comp_collect[0]['head'] != comp_collect[1]['head']:
-                            comp_analysis_row[8] = 'AB'
-
-
-                    # 1 hyphen
-                    if len(comp_collect) == 4:
-                        # hyphen after first
-                        if comp_collect[1]['text'] == '-':
-                            # whole comp
-                            comp_analysis_row[0] = comp_collect[0]['text'] + comp_collect[1]['text'] + ' ' + \
-                                                   comp_collect[2]['text'] + ' ' + comp_collect[3]['text']
-                            comp_analysis_row[1] = comp_collect[0]['lemma'] + comp_collect[1]['lemma'] + ' ' + \
-                                                   comp_collect[2]['lemma'] + ' ' + comp_collect[3]['lemma']
-                            # const_text / add hyphen to first
-                            comp_analysis_row[2] = comp_collect[0]['text'] + comp_collect[1]['text']
-                            comp_analysis_row[3] = comp_collect[2]['text']
-                            comp_analysis_row[4] = comp_collect[3]['text']
-                            # const_lemma / add hyphen to first
-                            comp_analysis_row[5] = comp_collect[0]['lemma'] + comp_collect[1]['lemma']
-                            comp_analysis_row[6] = comp_collect[2]['lemma']
-                            comp_analysis_row[7] = comp_collect[3]['lemma']
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if comp_collect[0]['head'] == comp_collect[2]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif comp_collect[0]['head'] != comp_collect[2]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-
-
-                        # hyphen after second
-                        elif comp_collect[3]['text'] == '-':
-                            # whole comp
-                            comp_analysis_row[0] = comp_collect[0]['text'] + ' ' + comp_collect[1]['text'] + \
-                                                   comp_collect[2]['text'] + comp_collect[3]['text']
-                            comp_analysis_row[1] = comp_collect[0]['lemma'] + ' ' + comp_collect[1]['lemma'] + \
-                                                   comp_collect[2]['lemma'] + comp_collect[3]['lemma']
-                            # const_text / add hyphen to second
-                            comp_analysis_row[2] = comp_collect[0]['text']
-                            comp_analysis_row[3] = comp_collect[1]['text'] + comp_collect[2]['text']
-                            comp_analysis_row[4] = comp_collect[3]['text']
-                            # const_lemma / add hyphen to second
-                            comp_analysis_row[5] = comp_collect[0]['lemma']
-                            comp_analysis_row[6] = comp_collect[1]['lemma'] + comp_collect[2]['lemma']
-                            comp_analysis_row[7] = comp_collect[3]['lemma']
-                            # check head-structure considering possible hyphenation to determine branching structure
-                            # then store branching-structure in analysis_row
-                            if comp_collect[0]['head'] == comp_collect[1]['head']:
-                                comp_analysis_row[8] = 'BC'
-                            elif comp_collect[0]['head'] != comp_collect[1]['head']:
-                                comp_analysis_row[8] = 'AB'
-
-
-                    # 2 hyphens
-                    if len(comp_collect) == 5:
-                        # whole comp
-                        comp_analysis_row[0] = comp_collect[0]['text'] + comp_collect[1]['text'] + \
-                                               comp_collect[2]['text'] + comp_collect[3]['text'] + comp_collect[4]['text']
-                        comp_analysis_row[1] = comp_collect[0]['lemma'] + comp_collect[1]['lemma'] + \
-                                               comp_collect[2]['lemma'] + comp_collect[3]['lemma'] + comp_collect[3]['text']
-                        # const_text / add hyphen to first and second
-                        comp_analysis_row[2] = comp_collect[0]['text'] + comp_collect[1]['text']
-                        comp_analysis_row[3] = comp_collect[2]['text'] + comp_collect[3]['text']
-                        comp_analysis_row[4] = comp_collect[4]['text']
-                        # const_lemma / add hyphen to first and second
-                        comp_analysis_row[5] = comp_collect[0]['lemma'] + comp_collect[1]['lemma']
-                        comp_analysis_row[6] = comp_collect[2]['lemma'] + comp_collect[3]['lemma']
-                        comp_analysis_row[7] = comp_collect[4]['lemma']
-                        # check head-structure considering possible hyphenation to determine branching structure
-                        # then store branching-structure in analysis_row
-                        if comp_collect[0]['head'] == comp_collect[2]['head']:
-                            comp_analysis_row[8] = 'BC'
-                        elif comp_collect[0]['head'] != comp_collect[2]['head']:
-                            comp_analysis_row[8] = 'AB'
-
-                # append
-                print(comp_analysis_row)
-                if comp_analysis_row != ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']:
-                    comp_analysis_row[9] = language
-                    comp_analysis_row[10] = register
+        fixed = ['_'] * 6
+    return fixed, ['|'.join(const_text), '|'.join(const_lemma)]
+
+
+# pick the layout of a span compound from the span length and the tokens around it
+def span_layout(span_length, prev_kind, next_kind):
+    if span_length >= 3:
+        return 'span_n'
+    if span_length != 2:
+        return None
+    # there are hyphens
+    if prev_kind & HYPHEN:
+        return 'hyphen_before'
+    if next_kind & HYPHEN:
+        return 'hyphen_after'
+    # no hyphens
+    if not prev_kind & NMOD:
+        return 'span_first'
+    return 'span_second'
+
+
+# analysis row of a span compound of span_length tokens
+# (positions before the sentence start wrap around to its end, as they always did)
+def span_analysis_row(sentence, token_ind, layout, span_length, language, register):
+    layout = span_layouts[layout]
+    entire_tok = sentence[token_ind]
+    parts = [(sentence[token_ind + pos], sep) for pos, sep in layout['compound']]
+    whole_comp_text = ''.join(sep + tok['text'] for tok, sep in parts)
+    if 'lemma' in entire_tok:
+        whole_comp_lemma = ''.join(sep + tok.get('lemma', '_') for tok, sep in parts)
+    else:
+        whole_comp_lemma = '_'
+    positions = layout['constituents'] or range(1, span_length + 1)
+    constituents = [sentence[token_ind + pos] for pos in positions]
+    brackets, label = bracketing(constituents)
+    fixed, joined = constituent_columns([tok['text'] for tok in constituents], [tok.get('lemma', '_') for tok in constituents])
+    return [whole_comp_text, whole_comp_lemma] + fixed + [label, language, register, brackets] + joined
+
+
+# collected tokens of a non-span compound (constituents and hyphens) grouped into constituents:
+# a hyphen belongs to the constituent before it, the first token of each constituent carries its head
+def chain_groups(comp_collect):
+    groups = []
+    for tok_ind, token in enumerate(comp_collect):
+        if token['text'] == '-' and groups:
+            groups[-1].append(tok_ind)
+        else:
+            groups.append([tok_ind])
+    return groups
+
+
+# analysis row of a non-span compound from its collected tokens (three or more constituents), None otherwise
+# constituents are separated by a space (e.g. nmod nmod const, nmod-hyphen nmod const), unless every
+# constituent but the last ends with a hyphen (nmod-hyphen-nmod-hyphen-const)
+def chain_analysis_row(comp_collect, language, register):
+    groups = chain_groups(comp_collect)
+    if len(groups) < 3:
+        return None
+    const_text = [''.join(comp_collect[ind]['text'] for ind in group) for group in groups]
+    const_lemma = [''.join(comp_collect[ind].get('lemma', '_') for ind in group) for group in groups]
+    sep = '' if all(len(group) > 1 for group in groups[:-1]) else ' '
+    brackets, label = bracketing([comp_collect[group[0]] for group in groups])
+    fixed, joined = constituent_columns(const_text, const_lemma)
+    return [sep.join(const_text), sep.join(const_lemma)] + fixed + [label, language, register, brackets] + joined
+
+
+# get comps from one sentence (list of token dicts)
+# returns the rows for both csv exports and the location (sent_id, tok_id) of every
+# analysis row (span token or first constituent), all non-compound tokens
+# get their text and lemma replaced with '_' in place
+# single forward scan over the token kinds (bit flags), keeping the state of the current compound
+# (span_length of a span compound, collected tokens of a non-span compound);
+# tokens that cannot belong to a compound are masked right away, only the others
+# look at the kinds of the tokens after them
+def extract_sentence(sentence, s_ind, filename, language, register):
+    long_data_list = []
+    long_data_list_analysis = []
+    comp_locations = []
+    span_length = 0
+    comp_collect = []
+
+    # kinds before the first token wrap around to the sentence end (as sentence[token_ind - 1] did)
+    prev_1 = token_kind(sentence[-1]) if sentence else 0
+    prev_2 = token_kind(sentence[-2]) if len(sentence) > 1 else 0
+
+    for token_ind, entire_tok in enumerate(sentence):
+        # most tokens: no constituent right before and no span, hyphen or nmod here, mask them
+        # (masked tokens count as kind 0 for the tokens after them)
+        if not prev_1 & (NMOD | DASH) and entire_tok['text'] != '-' and type(entire_tok['id']) is int and 'compound:nmod' not in entire_tok.get('deprel', ''):
+            entire_tok['text'] = '_'
+            entire_tok['lemma'] = '_'
+            prev_2, prev_1 = prev_1, 0
+            continue
+
+        kind = token_kind(entire_tok)
+        next_1 = next_kind(sentence, token_ind + 1)
+
+        # span compound: span token followed by a compound:nmod constituent
+        # extract general info+append, build the compound entry for the analysis file
+        # from the tokens around the span
+        if kind & SPAN and next_1 & NMOD:
+            long_data_list.append(token_row(sentence, token_ind, s_ind, filename, language, register))
+            span_length = entire_tok['id'][1] - entire_tok['id'][0] + 1
+            layout = span_layout(span_length, prev_1, next_1)
+            if layout:
+                long_data_list_analysis.append(span_analysis_row(sentence, token_ind, layout, span_length, language, register))
+            else:
+                long_data_list_analysis.append(analysis_header[:9] + [language, register] + analysis_header[11:])
+            comp_locations.append((s_ind + 1, entire_tok['id']))
+
+        # first constituent of non-span compound (nmod in this token and in the next
+        # or after a hyphen, but not in the previous), start collecting
+        elif kind & NMOD and not prev_1 & NMOD and (next_1 & NMOD or (next_1 & DASH and next_kind(sentence, token_ind + 2) & NMOD if next_kind(sentence, token_ind + 2) & DEPREL else next_kind(sentence, token_ind + 3) & NMOD)):
+            long_data_list.append(token_row(sentence, token_ind, s_ind, filename, language, register))
+            comp_collect.append(entire_tok)
+
+        # further non-last constituent (nmod in this token and in the previous or a hyphen before),
+        # any number of them for compounds of more than three constituents
+        elif kind & NMOD and prev_1 & (NMOD | DASH):
+            long_data_list.append(token_row(sentence, token_ind, s_ind, filename, language, register))
+            comp_collect.append(entire_tok)
+
+        # last constituent (no nmod in this token but in the previous, or before the previous hyphen)
+        # finish the compound entry, only if it is no span compound (those are built at the span token)
+        elif kind & DEPREL and not kind & (NMOD | DASH) and (prev_1 & NMOD or (prev_1 & DASH and prev_2 & NMOD)):
+            long_data_list.append(token_row(sentence, token_ind, s_ind, filename, language, register))
+            comp_collect.append(entire_tok)
+            if span_length == 0:
+                comp_analysis_row = chain_analysis_row(comp_collect, language, register)
+                if comp_analysis_row:
                     long_data_list_analysis.append(comp_analysis_row)
-                print('Appended analysis_row in span0')
-                # clear
-                comp_analysis_row = ['compound','comp_lemma','const_1_text','const_2_text','const_3_text','const_1_lemma','const_2_lemma','const_3_lemma','gold_branching','language','register']
-                span_length = 0
-                comp_collect = []
-
-            # catch hyphens
-            elif 'text' in entire_tok and entire_tok['text'] != '' and entire_tok['text'] == '-' and ('compound:nmod' in sentence[token_ind +1][
-                'deprel'] or 'compound:nmod' in sentence[token_ind - 1]['deprel']):
-                print(entire_tok['deprel'])
-                # get general info
-                tok_list = [filename, s_ind + 1, entire_tok['id'], entire_tok['text'],
-                            entire_tok['lemma'] if 'lemma' in entire_tok else '_',
-                            entire_tok['deprel'] if 'deprel' in entire_tok else '_',
-                            entire_tok['misc'] if 'misc' in entire_tok else '_',
-                            sentence[token_ind - 1]['text'] if 'text' in sentence[token_ind - 1] else '_',
-                            sentence[token_ind - 2]['text'] if 'text' in sentence[token_ind - 2] else '_']
-                long_data_list.append(tok_list)
-                comp_collect.append(entire_tok)
-
-            # all other toks replace text and lemma with '_'
+                    comp_locations.append((s_ind + 1, comp_collect[0]['id']))
+            span_length = 0
+            comp_collect = []
+
+        # catch hyphens (rows without language and register)
+        elif kind & HYPHEN and (next_1 | prev_1) & NMOD:
+            tok_list = token_row(sentence, token_ind, s_ind, filename, language, register)
+            long_data_list.append(tok_list[:1] + tok_list[3:])
+            comp_collect.append(entire_tok)
+
+        # all other toks replace text and lemma with '_'
+        else:
+            entire_tok['text'] = '_'
+            entire_tok['lemma'] = '_'
+            kind &= ~(HYPHEN | DASH)
+
+        prev_2, prev_1 = prev_1, kind
+
+    return long_data_list, long_data_list_analysis, comp_locations
+
+
+# get comps from the sentences of a doc between two byte offsets
+# while streaming the masked sentences to out_path
+# returns the rows for both csv exports, the (filename, sent_id, tok_id) of every analysis row
+# and (sentences, sentences skipped by the prefilter)
+# sentence ids continue after s_offset sentences (for chunks of large docs)
+# docs of a packed corpus are read from the container, start and end are sentence numbers then
+def extract_chunk(doc, filename, start, end, s_offset, out_path, packed=None):
+    language = get_language(filename)
+    register = get_register(filename)
+
+    long_data_list = []
+    long_data_list_analysis = []
+    comp_locations = []
+    sentences = 0
+    skipped = 0
+    if packed:
+        blocks = packed_corpus.read_packed_blocks(packed, filename, start, end, b'compound:nmod')
+    else:
+        blocks = read_conllu_blocks(doc, start, end, b'compound:nmod')
+    # parts of chunked docs are compressed like the file they are joined into
+    with open_conllu(out_path, 'wb', compression_suffix(part_target(out_path)[0])) as out_file:
+        # sentences without compound:nmod come unparsed (sentence None), they have no compound
+        for s_ind, (lines, sentence) in enumerate(blocks, start=s_offset):
+            sentences += 1
+            if sentence is None:
+                skipped += 1
             else:
-                print('No compound')
-                entire_dict[s_ind][token_ind]['text'] = '_'
-                entire_dict[s_ind][token_ind]['lemma'] = '_'
-
-    # export modified .conllu
-    new_doc = Document(entire_dict)
-    CoNLL.write_doc2conll(new_doc, filename[:-7] + "_onlycomp.conllu")
-
-# export general comp info
-with open('comp_info_example_all_annotations.csv', 'w', newline='', encoding='utf8') as file:
-    writer = csv.writer(file, delimiter=';')
-    writer.writerows(long_data_list)
-
-# export analysis file for transparency analysis
-with open('comp_extraction_for_transparency_example.csv', 'w', newline='', encoding='utf8') as file:
-    writer = csv.writer(file, delimiter=';')
-    writer.writerows(long_data_list_analysis)
+                tok_rows, analysis_rows, locations = extract_sentence([token for token, line_ind in sentence], s_ind, filename, language, register)
+                long_data_list.extend(tok_rows)
+                long_data_list_analysis.extend(analysis_rows)
+                comp_locations.extend((filename, sent_id, tok_id) for sent_id, tok_id in locations)
+            # export modified sentence, original lines with masked FORM and LEMMA
+            write_masked_sentence(out_file, lines, sentence)
+    return long_data_list, long_data_list_analysis, comp_locations, (sentences, skipped)
+
+
+# _onlycomp.conllu file of a doc, next to the doc (compression: e.g. '.gz' for _onlycomp.conllu.gz)
+def onlycomp_path(doc, compression=''):
+    return conllu_stem(doc) + "_onlycomp.conllu" + compression
+
+
+# file a part of a chunked doc's output belongs to and the part number (None if it is no part)
+def part_target(path):
+    match = re.search(r'\.part(\d+)$', path)
+    if match is None:
+        return path, None
+    return path[:match.start()], int(match.group(1))
+
+
+# get comps from each sentence of a doc while streaming the masked sentences to _onlycomp.conllu
+def extract_file(doc, filename):
+    return extract_chunk(doc, filename, 0, None, 0, onlycomp_path(doc))
+
+
+# unpack a task for pool.imap
+def extract_task(task):
+    return extract_chunk(*task)
+
+
+# split the docs into extraction tasks (doc, filename, start, end, s_offset, out_path):
+# one task per doc, docs larger than chunk_size get one task per chunk
+# map_func counts the sentences in front of each chunk (builtin map or pool.starmap)
+def plan_tasks(documents, filenames, chunk_size, map_func, compression=''):
+    tasks = []
+    for doc in documents:
+        out_path = onlycomp_path(doc, compression)
+        chunks = find_sentence_chunks(doc, chunk_size)
+        if len(chunks) == 1:
+            tasks.append((doc, filenames[doc], 0, None, 0, out_path))
+            continue
+        counts = list(map_func(count_sentences, [(doc, start, end) for start, end in chunks]))
+        s_offset = 0
+        for chunk_ind, ((start, end), count) in enumerate(zip(chunks, counts)):
+            tasks.append((doc, filenames[doc], start, end, s_offset, f"{out_path}.part{chunk_ind}"))
+            s_offset += count
+    return tasks
+
+
+# split the docs of a packed corpus into extraction tasks (doc, filename, start, end, s_offset, out_path, packed),
+# docs larger than chunk_size (as .conllu files) get one task per range of sentences
+def plan_packed_tasks(packed, documents, filenames, chunk_size, compression=''):
+    corpus = packed_corpus.get_packed(packed)
+    tasks = []
+    for doc in documents:
+        out_path = onlycomp_path(doc, compression)
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        entry = corpus['documents'][filenames[doc]]
+        parts = max(1, -(-entry['size'] // chunk_size))
+        if parts == 1:
+            tasks.append((doc, filenames[doc], 0, None, 0, out_path, packed))
+            continue
+        bounds = [entry['sentences'] * part // parts for part in range(parts + 1)]
+        for part in range(parts):
+            tasks.append((doc, filenames[doc], bounds[part], bounds[part + 1], bounds[part], f"{out_path}.part{part}", packed))
+    return tasks
+
+
+# glue the _onlycomp.conllu parts of chunked docs back together in order
+# (compressed parts are whole gzip/xz/bz2 streams, which can be concatenated as well)
+def join_parts(tasks):
+    for task in tasks:
+        part_path = task[5]
+        out_path, part = part_target(part_path)
+        if part is None:
+            continue
+        with open(out_path, 'wb' if part == 0 else 'ab') as out_file, open(part_path, 'rb') as part_file:
+            shutil.copyfileobj(part_file, out_file)
+        os.remove(part_path)
+
+
+# all .conllu docs (also compressed ones) in the current directory or (recursively) under input_root,
+# leaving out _onlycomp.conllu files written by an earlier run
+def find_documents(input_root):
+    documents = []
+    for suffix in CONLLU_SUFFIXES:
+        if input_root is None:
+            documents.extend(glob.glob('./*' + suffix))
+        else:
+            documents.extend(glob.glob(os.path.join(input_root, '**', '*' + suffix), recursive=True))
+    documents.sort()
+    stems = {conllu_stem(doc) for doc in documents}
+    return [doc for doc in documents if not (conllu_stem(doc).endswith('_onlycomp') and conllu_stem(doc)[:-9] in stems)]
+
+
+# stable shard of a file from the hash of its name (the same on every machine)
+def shard_of(filename, shards):
+    return int(hashlib.sha1(filename.encode('utf-8')).hexdigest(), 16) % shards
+
+
+# name of an output file, with the shard in it if this run is one shard of several
+def output_name(stem, suffix, shards, shard_index):
+    if shards > 1:
+        return f'{stem}.shard-{shard_index}-of-{shards}{suffix}'
+    return stem + suffix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract annotated compounds from all .conllu files in the current directory.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes (default: 1, 0 = one per CPU core)')
+    parser.add_argument('--chunk-size', type=float, default=64,
+                        help='split .conllu files larger than this many MB into chunks at sentence boundaries (default: 64)')
+    parser.add_argument('--manifest', default=None,
+                        help='.json manifest with content hashes and extracted rows, only new or changed files get extracted again')
+    parser.add_argument('--columnar', choices=columnar_export.FORMATS, default=None,
+                        help='also write both tables as typed .parquet or .arrow files (needs pyarrow)')
+    parser.add_argument('--input-root', default=None,
+                        help='take the .conllu files from this directory and its subdirectories instead of the current directory')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='split the files into this many shards by a hash of their name (default: 1)')
+    parser.add_argument('--shard-index', type=int, default=0,
+                        help='only extract this shard (0 to shards-1) and write partial outputs, see merge_shards.py')
+    parser.add_argument('--index', default=None,
+                        help='also write an .sqlite index from constituent lemma/text to compound locations, see compound_index.py')
+    parser.add_argument('--packed', default=None,
+                        help='read the docs from a packed corpus (see packed_corpus.py), _onlycomp.conllu files go under --input-root')
+    parser.add_argument('--types', default=None,
+                        help='also write a .csv table of compound types (comp_lemma, language, register) with counts, see compound_types.py')
+    parser.add_argument('--compress-output', choices=[suffix[1:] for suffix in COMPRESSIONS], default=None,
+                        help='write the _onlycomp.conllu files compressed (e.g. gz: _onlycomp.conllu.gz)')
+    args = parser.parse_args()
+    if args.columnar and columnar_export.pa is None:
+        parser.error('--columnar needs pyarrow (pip install pyarrow)')
+    if args.shards < 1 or not 0 <= args.shard_index < args.shards:
+        parser.error('--shard-index has to be between 0 and --shards - 1')
+    if args.packed and args.manifest:
+        parser.error('--manifest only works with .conllu files, not with --packed')
+    root = args.input_root or '.'
+    compression = '.' + args.compress_output if args.compress_output else ''
+
+    if args.packed:
+        # docs of a packed corpus, placed under the input root by their filenames
+        filenames = {os.path.join(root, filename): filename for filename in packed_corpus.get_packed(args.packed)['order']}
+        documents = list(filenames)
+    else:
+        # convert files ending in .conllu.txt to .conllu (only the ones of this shard)
+        for path in Path(root).glob('**/*.conllu.txt' if args.input_root else '*.conllu.txt'): # get .conllu.txt files
+            new_path = path.with_suffix('') # create new path without .txt suffix
+            if shard_of(os.path.relpath(new_path, root), args.shards) == args.shard_index:
+                path.rename(new_path) # rename file
+
+        # read all conllu docs, filenames are relative to the input root
+        documents = find_documents(args.input_root)
+        filenames = {doc: Path(os.path.relpath(doc, root)).as_posix() for doc in documents}
+    # only the docs of this shard
+    documents = [doc for doc in documents if shard_of(filenames[doc], args.shards) == args.shard_index]
+
+    # with a manifest only new or changed docs get extracted, the rest comes from the cache
+    manifest = None
+    stat_cache = {}
+    changed_documents = documents
+    if args.manifest:
+        manifest = load_manifest(args.manifest, __file__)
+        changed_documents = [doc for doc in documents
+                             if not is_unchanged(manifest, filenames[doc], doc, onlycomp_path(doc, compression), stat_cache)]
+        print(f'{len(documents) - len(changed_documents)} unchanged files taken from {args.manifest}')
+
+    # get comps from each doc (or chunk), in a process pool if more than one worker
+    # results come back in task order, so the output is the same as in a serial run
+    file_rows = {}
+    sentences = 0
+    skipped = 0
+    workers = args.workers or os.cpu_count()
+    pool = multiprocessing.Pool(workers) if workers > 1 and changed_documents else None
+    map_func = pool.starmap if pool else itertools.starmap
+    try:
+        if args.packed:
+            tasks = plan_packed_tasks(args.packed, changed_documents, filenames, int(args.chunk_size * 1024 * 1024), compression)
+        else:
+            tasks = plan_tasks(changed_documents, filenames, int(args.chunk_size * 1024 * 1024), map_func, compression)
+        results = pool.imap(extract_task, tasks) if pool else map(extract_task, tasks)
+        for task, (tok_rows, analysis_rows, locations, sentence_counts) in zip(tasks, results):
+            if task[2] == 0:
+                print(task[1])
+            sentences += sentence_counts[0]
+            skipped += sentence_counts[1]
+            rows = file_rows.setdefault(task[0], ([], [], []))
+            rows[0].extend(tok_rows)
+            rows[1].extend(analysis_rows)
+            rows[2].extend(locations)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    join_parts(tasks)
+    print(f'prefilter skipped {skipped} of {sentences} sentences (no compound:nmod)')
+
+    # create lists for csv export
+    long_data_list = [all_annotations_header]
+    long_data_list_analysis = [analysis_header]
+    comp_locations = []
+    file_counts = []
+    for doc in documents:
+        if doc in file_rows:
+            tok_rows, analysis_rows, locations = file_rows[doc]
+            if manifest:
+                update_entry(manifest, filenames[doc], stat_cache, tok_rows, analysis_rows, locations)
+        else:
+            tok_rows, analysis_rows, locations = cached_rows(manifest, filenames[doc])
+        long_data_list.extend(tok_rows)
+        long_data_list_analysis.extend(analysis_rows)
+        comp_locations.extend(locations)
+        file_counts.append([filenames[doc], len(tok_rows), len(analysis_rows)])
+    if manifest:
+        save_manifest(manifest, args.manifest, [filenames[doc] for doc in documents])
+
+    # export general comp info
+    with open(output_name('comp_info_example_all_annotations', '.csv', args.shards, args.shard_index), 'w', newline='', encoding='utf8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(long_data_list)
+
+    # export analysis file for transparency analysis
+    with open(output_name('comp_extraction_for_transparency_example', '.csv', args.shards, args.shard_index), 'w', newline='', encoding='utf8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(long_data_list_analysis)
+
+    # export both tables with typed columns
+    if args.columnar:
+        columnar_export.write_table(output_name('comp_info_example_all_annotations', '', args.shards, args.shard_index),
+                                    all_annotations_header, long_data_list[1:], args.columnar)
+        columnar_export.write_table(output_name('comp_extraction_for_transparency_example', '', args.shards, args.shard_index),
+                                    analysis_header, long_data_list_analysis[1:], args.columnar)
+
+    # index from constituents to compound locations
+    if args.index:
+        index_stem, index_suffix = os.path.splitext(args.index)
+        build_index(output_name(index_stem, index_suffix, args.shards, args.shard_index), long_data_list_analysis[1:], comp_locations)
+
+    # compound types with counts and locations
+    if args.types:
+        types_stem, types_suffix = os.path.splitext(args.types)
+        write_types(output_name(types_stem, types_suffix, args.shards, args.shard_index),
+                    aggregate_types(long_data_list_analysis[1:], comp_locations))
+
+    # rows per file of this shard, merge_shards.py puts the shards back together in file order
+    if args.shards > 1:
+        with open(output_name('comp_files', '.json', args.shards, args.shard_index), 'w', encoding='utf8') as file:
+            json.dump({'shards': args.shards, 'shard_index': args.shard_index, 'files': file_counts}, file, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Sentence offset index for the .conllu files: (filename, sent_id) -> byte range of the sentence,
+so the CoNLL-U block of a sentence is read with one seek instead of scanning the file.
+Filenames and sent_ids are the ones prep_conllu.py writes (run both with the same --input-root).
+
+Output (--build):
+    - sentence_offsets.bin: start and end byte offset (uint64, native byte order) of every sentence,
+      file after file, memory-mapped for lookups
+    - sentence_offsets.json: per file its path (relative to the .json), first record in the .bin file,
+      number of sentences, size and mtime (lookups in changed files fail instead of returning wrong blocks)
+
+Compounds (e.g. rows of compound_overview.csv) are found through the index of compound_index.py:
+all occurrences of the compound text, the ones with the row's language and register if there are any.
+
+Usage:
+    python sentence_offsets.py --build [--input-root DIR]
+    python sentence_offsets.py --sentence FILENAME SENT_ID
+    python sentence_offsets.py --index comp_index.sqlite --overview compound_overview.csv --row 12
+or from Python:
+    offsets = open_offsets('sentence_offsets')
+    sentence_block(offsets, filename, sent_id)
+    compound_contexts(offsets, 'comp_index.sqlite', overview_row)
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import sys
+from array import array
+from pathlib import Path
+
+from compound_index import find_occurrences
+from conllu_stream import find_sentence_ranges, compression_suffix, COMPRESSIONS
+from prep_conllu import find_documents
+
+
+# build the offset index for all docs in the current directory or under input_root
+def build_offsets(stem, input_root=None):
+    root = input_root or '.'
+    index_dir = os.path.dirname(os.path.abspath(stem + '.json'))
+    records = array('Q')
+    files = {}
+    for doc in find_documents(input_root):
+        stat = os.stat(doc)
+        ranges = find_sentence_ranges(doc)
+        filename = Path(os.path.relpath(doc, root)).as_posix()
+        files[filename] = {
+            'path': Path(os.path.relpath(os.path.abspath(doc), index_dir)).as_posix(),
+            'first': len(records) // 2,
+            'sentences': len(ranges),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+        }
+        for start, end in ranges:
+            records.append(start)
+            records.append(end)
+    with open(stem + '.bin', 'wb') as file:
+        records.tofile(file)
+    with open(stem + '.json', 'w', encoding='utf8') as file:
+        json.dump({'byteorder': sys.byteorder, 'files': files}, file, ensure_ascii=False)
+    return len(files), len(records) // 2
+
+
+# open an offset index, the .bin file is memory-mapped
+def open_offsets(stem):
+    with open(stem + '.json', encoding='utf8') as file:
+        table = json.load(file)
+    if table['byteorder'] != sys.byteorder:
+        raise ValueError(f'{stem}.bin was built with {table["byteorder"]} byte order, rebuild it here')
+    with open(stem + '.bin', 'rb') as file:
+        # an empty file cannot be mapped
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(stem + '.bin') else b''
+    return {'dir': os.path.dirname(os.path.abspath(stem + '.json')), 'files': table['files'],
+            'records': memoryview(data).cast('B').cast('Q')}
+
+
+# CoNLL-U block of a sentence (str, its original lines up to the blank line after it)
+def sentence_block(offsets, filename, sent_id):
+    entry = offsets['files'].get(filename)
+    if entry is None:
+        raise KeyError(f'{filename} is not in the offset index')
+    if not 1 <= sent_id <= entry['sentences']:
+        raise KeyError(f'{filename} has no sentence {sent_id}')
+    path = os.path.join(offsets['dir'], entry['path'])
+    stat = os.stat(path)
+    if stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime']:
+        raise ValueError(f'{filename} changed since the offset index was built, rebuild it')
+    record = (entry['first'] + sent_id - 1) * 2
+    start = offsets['records'][record]
+    end = offsets['records'][record + 1]
+    # compressed files are decompressed up to start by seek
+    module = COMPRESSIONS.get(compression_suffix(path))
+    with (module.open if module else open)(path, 'rb') as file:
+        file.seek(start)
+        return file.read(end - start).decode('utf-8')
+
+
+# sentence contexts of a compound row (dict with compound, language and register, e.g. from compound_overview.csv):
+# [(filename, sent_id, tok_id, block)] for its occurrences in the compound index
+def compound_contexts(offsets, index_path, row):
+    occurrences = find_occurrences(index_path, row['compound'])
+    matching = [occurrence for occurrence in occurrences if occurrence[3:] == (row.get('language'), row.get('register'))]
+    return [(filename, sent_id, tok_id, sentence_block(offsets, filename, sent_id))
+            for filename, sent_id, tok_id, language, register in matching or occurrences]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the sentence offset index of the .conllu files.')
+    parser.add_argument('--offsets', default='sentence_offsets',
+                        help='offset index, without .bin/.json (default: sentence_offsets)')
+    parser.add_argument('--build', action='store_true',
+                        help='build the offset index for all .conllu files in the current directory or under --input-root')
+    parser.add_argument('--input-root', default=None,
+                        help='like prep_conllu.py --input-root, so the filenames match')
+    parser.add_argument('--sentence', nargs=2, metavar=('FILENAME', 'SENT_ID'),
+                        help='print the CoNLL-U block of one sentence')
+    parser.add_argument('--index', default=None,
+                        help='compound index written by prep_conllu.py --index, to find the compounds of --overview')
+    parser.add_argument('--overview', default='compound_overview.csv',
+                        help='compound table with compound, language and register columns (default: compound_overview.csv)')
+    parser.add_argument('--row', type=int, nargs='+',
+                        help='print the sentence contexts of these rows of --overview (1 = first compound)')
+    args = parser.parse_args()
+
+    if args.build:
+        files, sentences = build_offsets(args.offsets, args.input_root)
+        print(f'{sentences} sentences in {files} files')
+    offsets = None
+    if args.sentence:
+        offsets = open_offsets(args.offsets)
+        print(sentence_block(offsets, args.sentence[0], int(args.sentence[1])))
+    if args.row:
+        if not args.index:
+            parser.error('--row needs --index')
+        offsets = offsets or open_offsets(args.offsets)
+        with open(args.overview, newline='', encoding='utf8') as file:
+            rows = list(csv.DictReader(file, delimiter=';'))
+        for row_number in args.row:
+            row = rows[row_number - 1]
+            contexts = compound_contexts(offsets, args.index, row)
+            print(f"# {row['compound']} ({row.get('language')}, {row.get('register')}): {len(contexts)} occurrences")
+            for filename, sent_id, tok_id, block in contexts:
+                print(f'# {filename}, sent_id {sent_id}, tok_id {tok_id}')
+                print(block)
+                print()
+
+
+if __name__ == '__main__':
+    main()
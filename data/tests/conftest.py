@@ -0,0 +1,5 @@
+# the scripts of data/ import each other as top-level modules, as when they are run from data/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
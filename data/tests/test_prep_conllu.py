@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# compound extraction of prep_conllu.py: brackets, N-constituent compounds and the tables built from them
+
+import os
+
+from compound_index import build_index, find_compounds, read_index
+from compound_types import aggregate_types, type_header
+from prep_conllu import analysis_header, bracketing, extract_sentence, find_documents, label_brackets
+from validate_corpus import validate_chunk
+
+data_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def word(word_id, text, lemma, head, deprel):
+    return {'id': word_id, 'text': text, 'lemma': lemma, 'upos': 'NOUN', 'head': head, 'deprel': deprel}
+
+
+# "Der Kniegelenkknorpelschaden ist", the compound as span 2-5 over four constituents
+def span_sentence():
+    return [word(1, 'Der', 'der', 6, 'det'), {'id': (2, 5), 'text': 'Kniegelenkknorpelschaden'},
+            word(2, 'Knie', 'Knie', 3, 'compound:nmod'), word(3, 'gelenk', 'Gelenk', 5, 'compound:nmod'),
+            word(4, 'knorpel', 'Knorpel', 5, 'compound:nmod'), word(5, 'schaden', 'Schaden', 6, 'nsubj'),
+            word(6, 'ist', 'sein', 0, 'root')]
+
+
+# "the knee joint cartilage damage is": four compound:nmod constituents before the head
+def chain_sentence():
+    return [word(1, 'the', 'the', 6, 'det'), word(2, 'knee', 'knee', 3, 'compound:nmod'),
+            word(3, 'joint', 'joint', 5, 'compound:nmod'), word(4, 'cartilage', 'cartilage', 5, 'compound:nmod'),
+            word(5, 'damage', 'damage', 6, 'compound:nmod'), word(6, 'injury', 'injury', 7, 'nsubj'),
+            word(7, 'is', 'be', 0, 'root')]
+
+
+def analysis_row(sentence, language='GER'):
+    tok_rows, analysis_rows, locations = extract_sentence(sentence, 0, 'test.conllu', language, 'scientific')
+    assert len(analysis_rows) == 1
+    return dict(zip(analysis_header, analysis_rows[0])), locations[0]
+
+
+def test_three_constituents_brackets_follow_label():
+    for heads, label in [((2, 3), 'AB'), ((3, 3), 'BC')]:
+        constituents = [{'head': heads[0]}, {'head': heads[1]}, {'head': 4}]
+        for ind, constituent in enumerate(constituents):
+            constituent['id'] = ind + 1
+        assert bracketing(constituents) == (label_brackets[label], label)
+
+
+def test_four_constituent_span():
+    row, location = analysis_row(span_sentence())
+    assert row['compound'] == 'Kniegelenkknorpelschaden'
+    assert row['gold_brackets'] == '((A B) (C D))'
+    assert row['gold_branching'] == '_'
+    assert row['const_texts'] == 'Knie|gelenk|knorpel|schaden'
+    assert row['const_lemmas'] == 'Knie|Gelenk|Knorpel|Schaden'
+    assert [row[f'const_{position}_text'] for position in range(1, 4)] == ['_'] * 3
+
+
+def test_four_constituent_chain():
+    row, location = analysis_row(chain_sentence(), 'EN')
+    assert row['compound'] == 'knee joint cartilage damage injury'
+    assert row['gold_brackets'] == '(((A B) (C D)) E)'
+    assert row['const_texts'] == 'knee|joint|cartilage|damage|injury'
+
+
+def test_index_and_types_keep_all_constituents(tmp_path):
+    row, location = analysis_row(span_sentence())
+    values = [row[column] for column in analysis_header]
+    path = str(tmp_path / 'index.sqlite')
+    build_index(path, [values], [('test.conllu',) + location])
+    found = find_compounds(path, lemma='Knorpel')
+    assert [(position, compound) for filename, sent_id, tok_id, position, text, lemma, compound, *rest in found] == \
+        [(3, 'Kniegelenkknorpelschaden')]
+    assert find_compounds(path, text='schaden', position=4)
+    analysis_rows, locations = read_index(path)
+    assert analysis_rows == [values]
+    type_row = dict(zip(type_header, aggregate_types(analysis_rows, locations)[0]))
+    assert type_row['gold_brackets'] == '((A B) (C D))'
+    assert type_row['const_lemmas'] == 'Knie|Gelenk|Knorpel|Schaden'
+
+
+# every compound extracted from the corpus in data/ has brackets that agree with its gold_branching
+def test_repo_brackets_agree_with_label():
+    for doc in find_documents(data_dir):
+        filename = os.path.relpath(doc, data_dir).replace(os.sep, '/')
+        sentences, issues = validate_chunk(doc, filename, 0, None, 0)
+        assert [entry for entry in issues if entry['check'] == 'brackets'] == []
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# matching extracted compounds to overview rows and rewriting only the changed rows
+
+from compound_types import analysis_columns
+from update_overview import read_overview, upsert, write_overview
+
+overview_header = analysis_columns[:11] + ['semRel1', 'semRel2', 'location']
+
+
+def overview_row(compound, language='EN', register='scientific', location='', semrel='HEAD'):
+    row = {column: '_' for column in overview_header}
+    row.update({'compound': compound, 'const_1_text': compound.split()[0], 'gold_branching': 'AB', 'language': language,
+                'register': register, 'semRel1': semrel, 'location': location})
+    return row
+
+
+def extracted_row(compound, language='EN', register='scientific'):
+    values = dict.fromkeys(analysis_columns, '_')
+    values.update({'compound': compound, 'const_1_text': compound.split()[0], 'gold_branching': 'AB',
+                   'language': language, 'register': register})
+    return [values[column] for column in analysis_columns]
+
+
+def test_upsert_located_unlocated_and_incompatible():
+    rows = [overview_row('drill canal expansion', location='a.conllu:1:3'),
+            overview_row('knee joint surgery'),
+            overview_row('bone marrow edema')]
+    analysis_rows = [extracted_row('drill canal expansion'),
+                     extracted_row('knee joint surgery', language='NA'),
+                     extracted_row('bone marrow edema', register='general'),
+                     extracted_row('drill canal expansion'),
+                     extracted_row('cartilage cell transplant')]
+    locations = [('a.conllu', 1, 3), ('a.conllu', 2, 5), ('a.conllu', 3, 1), ('a.conllu', 4, 2), ('a.conllu', 5, 7)]
+    changed, new_rows, report = upsert(rows, analysis_rows, locations)
+
+    # located row matched as it is, the unlocated row gets its location ('NA' fits any language)
+    assert changed == {1}
+    assert rows[1]['location'] == 'a.conllu:2:5' and rows[1]['semRel1'] == 'HEAD'
+    assert report['matched'] == 2 and report['located'] == 1
+    # other register, and one more occurrence than the overview has: reported, not appended
+    assert [(entry['compound'], entry['location']) for entry in report['ambiguous']] == \
+        [('bone marrow edema', 'a.conllu:3:1'), ('drill canal expansion', 'a.conllu:4:2')]
+    assert rows[2]['location'] == ''
+    # only the compound that is not in the overview at all is appended
+    assert [(row['compound'], row['location'], row['semRel1']) for row in new_rows] == \
+        [('cartilage cell transplant', 'a.conllu:5:7', '_')]
+    assert report['appended'] == 1 and report['conflicts'] == [] and report['missing'] == []
+
+
+def test_write_overview_keeps_multiline_rows(tmp_path):
+    path = str(tmp_path / 'overview.csv')
+    with open(path, 'w', newline='', encoding='utf8') as file:
+        file.write('compound;semRel1;location\r\na;"x\r\ny";l1\r\nb;z;\r\nc;w;l3\r\n')
+    header, rows, records = read_overview(path)
+    assert [row['semRel1'] for row in rows] == ['x\r\ny', 'z', 'w']
+    rows[1]['location'] = 'l2'
+    write_overview(path, header, rows, records, {1}, [])
+    with open(path, newline='', encoding='utf8') as file:
+        assert file.read() == 'compound;semRel1;location\r\na;"x\r\ny";l1\r\nb;z;l2\r\nc;w;l3\r\n'
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental update of compound_overview.csv from newly extracted compounds.
+Input:
+    - compound_overview.csv (extracted columns, semRel1/semRel2 annotations and, after the first update, a location column)
+    - the compound index of an extraction (prep_conllu.py --index or merge_shards.py --index), which has the locations
+Output: compound_overview.csv with
+    - new compounds appended (semRel columns '_', to be annotated)
+    - rows without a location yet (rows from before the location column) given the location of their compound
+Rows are keyed by compound, location (filename:sent_id:tok_id), language and register; an extracted language 'NA'
+(filenames get_language in prep_conllu.py does not know) matches any language of the overview.
+The semRel columns and all other values of existing rows are kept. Extracted values that differ from the overview
+(comp_lemma, constituents, gold_branching; not '_') are reported as conflicts and not written, so are overview rows
+of the updated files that the extraction no longer finds. Only compounds that are not in the overview at all are
+appended: a compound with rows in the overview but none left to match (e.g. another language or register from the
+filename heuristics, 'general' for a scientific text, or one more occurrence than the overview has) is reported
+as ambiguous and not appended.
+
+Only changed rows are written again: all other rows stay as they are (a row is one line, or several if a
+quoted value has a line break), and if there are only new rows they are appended to the file instead of rewriting it.
+
+Usage:
+    python update_overview.py --index comp_index.sqlite [--overview compound_overview.csv] [--files FILENAME ...]
+        [--report overview_report.json] [--dry-run]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+
+from compound_index import read_index
+from compound_types import analysis_columns
+
+# columns compared between the overview and the extraction (the others are part of the key or annotations)
+compare_columns = ['comp_lemma', 'const_1_text', 'const_2_text', 'const_3_text', 'const_1_lemma', 'const_2_lemma',
+                   'const_3_lemma', 'gold_branching']
+
+
+# header, rows (dicts) and the original text of every row of an overview file (the header first),
+# taken from the lines the csv reader consumed for the row, so quoted values with line breaks stay in their row
+def read_overview(path):
+    with open(path, newline='', encoding='utf8') as file:
+        lines = file.readlines()
+    reader = csv.reader(lines, delimiter=';')
+    records = []
+    parsed = []
+    start = 0
+    for values in reader:
+        records.append(''.join(lines[start:reader.line_num]))
+        parsed.append(values)
+        start = reader.line_num
+    header = parsed[0]
+    rows = [dict(zip(header, values)) for values in parsed[1:]]
+    return header, rows, records
+
+
+# location of an extracted compound as in the overview (and in compound_types.py)
+def location_key(filename, sent_id, tok_id):
+    return f'{filename}:{sent_id}:{tok_id}'
+
+
+# an extracted compound may be an overview row if register and language agree ('NA': language unknown)
+def compatible(row, extracted):
+    return row['register'] == extracted['register'] and extracted['language'] in ('NA', row['language'])
+
+
+# merge extracted rows (analysis rows and their locations) into the overview rows
+# returns the indexes of changed rows, the new rows and a report
+def upsert(rows, analysis_rows, locations):
+    located = {}
+    unlocated = {}
+    by_compound = {}
+    for row_ind, row in enumerate(rows):
+        if row.get('location'):
+            located.setdefault((row['compound'], row['location']), []).append(row_ind)
+        else:
+            unlocated.setdefault(row['compound'], []).append(row_ind)
+        by_compound.setdefault(row['compound'], []).append(row_ind)
+
+    changed = set()
+    new_rows = []
+    report = {'matched': 0, 'located': 0, 'appended': 0, 'conflicts': [], 'ambiguous': [], 'missing': []}
+    seen = set()
+    for values, (filename, sent_id, tok_id) in zip(analysis_rows, locations):
+        # spans of unknown length only have a placeholder row
+        if values[0] == 'compound':
+            continue
+        extracted = dict(zip(analysis_columns, values))
+        location = location_key(filename, sent_id, tok_id)
+        row_ind = next((ind for ind in located.get((extracted['compound'], location), []) if compatible(rows[ind], extracted)), None)
+        if row_ind is None:
+            # a row from before the location column gets the location of the first compound that fits it
+            candidates = unlocated.get(extracted['compound'], [])
+            row_ind = next((ind for ind in candidates if compatible(rows[ind], extracted)), None)
+            if row_ind is not None:
+                candidates.remove(row_ind)
+                rows[row_ind]['location'] = location
+                changed.add(row_ind)
+                report['located'] += 1
+        if row_ind is None:
+            # the compound is in the overview, but no row of it is left that fits: not a new compound
+            others = by_compound.get(extracted['compound'], [])
+            if others:
+                report['ambiguous'].append({'compound': extracted['compound'], 'location': location,
+                                            'extracted': f"{extracted['language']}/{extracted['register']}",
+                                            'overview': sorted({f"{rows[ind]['language']}/{rows[ind]['register']}" for ind in others}),
+                                            'rows': len(others)})
+                continue
+            row = {column: '_' for column in rows[0]} if rows else {}
+            row.update(extracted)
+            row['location'] = location
+            new_rows.append(row)
+            report['appended'] += 1
+            continue
+        seen.add(row_ind)
+        report['matched'] += 1
+        # '_' (e.g. no lemma from the parser) leaves the value of the overview, which may have been filled in by hand
+        for column in compare_columns:
+            if extracted[column] != '_' and rows[row_ind].get(column) != extracted[column]:
+                report['conflicts'].append({'compound': extracted['compound'], 'location': location, 'column': column,
+                                            'overview': rows[row_ind].get(column), 'extracted': extracted[column]})
+
+    # rows of the updated files the extraction did not find again
+    filenames = {filename for filename, sent_id, tok_id in locations}
+    for row_ind, row in enumerate(rows):
+        if row_ind not in seen and row.get('location') and row['location'].rsplit(':', 2)[0] in filenames:
+            report['missing'].append({'compound': row['compound'], 'location': row['location']})
+    return changed, new_rows, report
+
+
+# one row as a csv line with the given line ending
+def format_row(header, row, ending):
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=';', lineterminator=ending).writerow([row.get(column, '') for column in header])
+    return buffer.getvalue()
+
+
+# write the overview again, only re-formatting changed rows, or just append new rows if nothing else changed
+# records: the original text of every row (see read_overview)
+def write_overview(path, header, rows, records, changed, new_rows):
+    ending = records[0][len(records[0].rstrip('\r\n')):] or '\r\n'
+    if 'location' not in header:
+        header = header + ['location']
+        # the new column is empty in all rows not otherwise changed
+        records = [record.rstrip('\r\n') + ';' + ending for record in records]
+        records[0] = format_row(header, dict(zip(header, header)), ending)
+    elif not changed:
+        if new_rows:
+            with open(path, 'a', newline='', encoding='utf8') as file:
+                if not records[-1].endswith(('\n', '\r')):
+                    file.write(ending)
+                file.writelines(format_row(header, row, ending) for row in new_rows)
+        return
+    for row_ind in changed:
+        records[row_ind + 1] = format_row(header, rows[row_ind], ending)
+    if not records[-1].endswith(('\n', '\r')):
+        records[-1] += ending
+    with open(path + '.tmp', 'w', newline='', encoding='utf8') as file:
+        file.writelines(records)
+        file.writelines(format_row(header, row, ending) for row in new_rows)
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge newly extracted compounds into compound_overview.csv.')
+    parser.add_argument('--index', required=True,
+                        help='compound index of the extraction (prep_conllu.py --index or merge_shards.py --index)')
+    parser.add_argument('--overview', default='compound_overview.csv',
+                        help='overview file to update (default: compound_overview.csv)')
+    parser.add_argument('--files', nargs='+', default=None,
+                        help='only merge the compounds of these files (filenames as in the index)')
+    parser.add_argument('--report', default=None,
+                        help='also write the matches, conflicts and missing rows to this .json file')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only report, do not change the overview')
+    args = parser.parse_args()
+
+    header, rows, records = read_overview(args.overview)
+    analysis_rows, locations = read_index(args.index)
+    if args.files:
+        files = set(args.files)
+        selected = [ind for ind, location in enumerate(locations) if location[0] in files]
+        analysis_rows = [analysis_rows[ind] for ind in selected]
+        locations = [locations[ind] for ind in selected]
+
+    changed, new_rows, report = upsert(rows, analysis_rows, locations)
+    if not args.dry_run:
+        write_overview(args.overview, header, rows, records, changed, new_rows)
+    for conflict in report['conflicts']:
+        print(f"conflict: {conflict['compound']} ({conflict['location']}) {conflict['column']}: "
+              f"{conflict['overview']} in the overview, {conflict['extracted']} extracted")
+    for ambiguous in report['ambiguous']:
+        print(f"ambiguous: {ambiguous['compound']} ({ambiguous['location']}) extracted as {ambiguous['extracted']}, "
+              f"in the overview as {', '.join(ambiguous['overview'])} ({ambiguous['rows']} rows), not appended")
+    for missing in report['missing']:
+        print(f"missing: {missing['compound']} ({missing['location']}) was not extracted again")
+    print(f"{report['matched']} rows matched ({report['located']} got their location), {report['appended']} appended, "
+          f"{len(report['conflicts'])} conflicts, {len(report['ambiguous'])} ambiguous, {len(report['missing'])} missing")
+    if args.report:
+        with open(args.report, 'w', encoding='utf8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Validator for the .conllu input of prep_conllu.py, run before an extraction.
+Input: .conllu files (in the current directory or under --input-root, the same files prep_conllu.py takes)
+Output: validation_report.json (or --report FILE, - for stdout) with the number of files, sentences,
+errors and warnings and one entry per issue: filename, sent_id, tok_id, check, level, message
+(filenames and sent_ids as in the csv exports, so sentence_offsets.py can show the sentence)
+
+Checks per sentence (level error: would break or falsify the extraction, warning: suspicious annotation):
+    - token_line (error): unreadable token line (not 10 columns, ids or heads that are no numbers)
+    - word_id (error): word ids not 1, 2, 3, ... in order
+    - span_id (error): span id (e.g. 12-14) that does not cover the word lines right after it
+    - head_range (error): head that is neither 0 (root) nor the id of a word of the sentence
+    - cycle (error): words whose heads form a cycle instead of leading to the root
+    - extraction (error): prep_conllu.py fails on the sentence (e.g. a constituent past the sentence end)
+    - brackets (error): extracted compound whose gold_brackets do not agree with its gold_branching
+      (AB: ((A B) C), BC: (A (B C))) or do not have one letter per constituent
+    - branching (warning): compound:nmod chain of three constituents whose heads match neither
+      AB (1st -> 2nd -> 3rd) nor BC (1st -> 3rd, 2nd -> 3rd), so the gold_branching derived from them is unreliable
+    - nmod_head (warning): compound:nmod constituent of another chain whose head is not a later constituent of the chain
+
+Procedure:
+    - split the files (and large files into chunks at sentence boundaries) like prep_conllu.py
+    - check the chunks in a process pool (--workers, default: one per CPU core)
+    - write the report in file/sentence order; the exit status is 1 if there are errors
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+from conllu_stream import read_conllu_blocks, parse_token_line
+from prep_conllu import (bracketing, extract_sentence, find_documents, plan_tasks, get_language, get_register,
+                         analysis_header, label_brackets)
+
+# level of each check
+check_levels = {
+    'token_line': 'error',
+    'word_id': 'error',
+    'span_id': 'error',
+    'head_range': 'error',
+    'cycle': 'error',
+    'extraction': 'error',
+    'brackets': 'error',
+    'branching': 'warning',
+    'nmod_head': 'warning',
+}
+
+
+# issue entry of the report (tok_id as written in the file, None for the whole sentence)
+def issue(filename, sent_id, tok_id, check, message):
+    return {'filename': filename, 'sent_id': sent_id, 'tok_id': None if tok_id is None else str(tok_id), 'check': check,
+            'level': check_levels[check], 'message': message}
+
+
+# token dicts of a sentence's lines and the issues of lines that cannot be read
+def parse_lines(lines, filename, sent_id):
+    sentence = []
+    issues = []
+    for raw_line in lines:
+        try:
+            line = raw_line.decode('utf-8').strip(' \n\r\t')
+        except UnicodeDecodeError as error:
+            issues.append(issue(filename, sent_id, None, 'token_line', f'not utf-8: {error}'))
+            continue
+        if line[0] == '#':
+            continue
+        id_field = line.split('\t', 1)[0]
+        columns = line.count('\t') + 1
+        if columns != 10:
+            issues.append(issue(filename, sent_id, id_field, 'token_line', f'{columns} columns instead of 10'))
+            continue
+        try:
+            token = parse_token_line(line)
+        except ValueError as error:
+            issues.append(issue(filename, sent_id, id_field, 'token_line', str(error)))
+            continue
+        if token is not None:
+            sentence.append(token)
+    return sentence, issues
+
+
+# word ids in order, spans covering the words right after them
+# (only the first word of a gap or jump is reported, the count goes on from its id)
+def check_ids(sentence, filename, sent_id):
+    issues = []
+    word_ids = [token['id'] for token in sentence if type(token['id']) is int]
+    expected = 1
+    for word_id in word_ids:
+        if word_id != expected:
+            issues.append(issue(filename, sent_id, word_id, 'word_id', f'word id {word_id}, expected {expected}'))
+        expected = word_id + 1
+    words_before = 0
+    for token in sentence:
+        if type(token['id']) is int:
+            words_before += 1
+            continue
+        start, end = token['id']
+        if word_ids[words_before:words_before + end - start + 1] != list(range(start, end + 1)):
+            issues.append(issue(filename, sent_id, f'{start}-{end}', 'span_id',
+                                f'span {start}-{end} does not cover the words after it ({", ".join(map(str, word_ids[words_before:words_before + 3]))}, ...)'))
+    return issues
+
+
+# heads inside the sentence and without cycles
+def check_heads(sentence, filename, sent_id):
+    issues = []
+    words = [token for token in sentence if type(token['id']) is int]
+    word_ids = {token['id'] for token in words}
+    heads = {}
+    for token in words:
+        head = token.get('head')
+        if head is None:
+            continue
+        if head != 0 and head not in word_ids:
+            issues.append(issue(filename, sent_id, token['id'], 'head_range', f'head {head} is no word of the sentence'))
+        else:
+            heads[token['id']] = head
+    # follow the heads of every word until the root, a word already known to reach it, or a word on the current path
+    done = set()
+    for word_id in heads:
+        path = []
+        on_path = set()
+        while word_id in heads and word_id not in done and word_id not in on_path:
+            path.append(word_id)
+            on_path.add(word_id)
+            word_id = heads[word_id]
+        if word_id in on_path:
+            cycle = path[path.index(word_id):]
+            issues.append(issue(filename, sent_id, cycle[0], 'cycle', 'heads form a cycle: ' + ' -> '.join(map(str, cycle + [cycle[0]]))))
+        done.update(path)
+    return issues
+
+
+# compound:nmod chains (constituents with hyphens in between, up to the first other word)
+# whose heads do not point to a later constituent of the same chain
+def check_chains(sentence, filename, sent_id):
+    issues = []
+    words = [token for token in sentence if type(token['id']) is int]
+    word_ind = 0
+    while word_ind < len(words):
+        if 'compound:nmod' not in words[word_ind].get('deprel', ''):
+            word_ind += 1
+            continue
+        constituents = []
+        while word_ind < len(words) and ('compound:nmod' in words[word_ind].get('deprel', '') or words[word_ind].get('text') == '-'):
+            if words[word_ind].get('text') != '-':
+                constituents.append(words[word_ind])
+            word_ind += 1
+        # the word after the chain is its last constituent
+        if word_ind < len(words):
+            constituents.append(words[word_ind])
+        later_ids = [{token['id'] for token in constituents[ind + 1:]} for ind in range(len(constituents))]
+        wrong = [token for token, later in zip(constituents, later_ids)
+                 if 'compound:nmod' in token.get('deprel', '') and token.get('head') not in later]
+        if not wrong:
+            continue
+        ids = ', '.join(str(token['id']) for token in constituents)
+        if len(constituents) == 3:
+            brackets, label = bracketing(constituents)
+            heads = ', '.join(str(token.get('head')) for token in constituents[:2])
+            issues.append(issue(filename, sent_id, constituents[0]['id'], 'branching',
+                                f'heads {heads} of constituents {ids} are neither AB nor BC (derived label {label}, brackets {brackets})'))
+        else:
+            for token in wrong:
+                issues.append(issue(filename, sent_id, token['id'], 'nmod_head',
+                                    f'head {token.get("head")} is not a later constituent of the chain {ids}'))
+    return issues
+
+
+# gold_brackets of an extracted compound (analysis row as dict) against its gold_branching and constituents
+def check_brackets(row, filename, sent_id, tok_id):
+    brackets = row['gold_brackets']
+    label = row['gold_branching']
+    n_const = len(row['const_texts'].split('|'))
+    letters = [char for char in brackets if char.isalpha()]
+    if label in label_brackets and brackets != label_brackets[label]:
+        message = f'brackets {brackets} do not agree with gold_branching {label}'
+    elif brackets != '_' and letters != [chr(ord('A') + ind) for ind in range(n_const)]:
+        message = f'brackets {brackets} do not cover the {n_const} constituents'
+    else:
+        return []
+    return [issue(filename, sent_id, tok_id, 'brackets', message)]
+
+
+# all issues of the sentences of a doc between two byte offsets
+# sentence ids continue after s_offset sentences (for chunks of large docs)
+# returns (sentences, issues)
+def validate_chunk(doc, filename, start, end, s_offset):
+    language = get_language(filename)
+    register = get_register(filename)
+    sentences = 0
+    issues = []
+    for s_ind, (lines, unparsed) in enumerate(read_conllu_blocks(doc, start, end, parse=False), start=s_offset):
+        sentences += 1
+        sentence, line_issues = parse_lines(lines, filename, s_ind + 1)
+        issues.extend(line_issues)
+        issues.extend(check_ids(sentence, filename, s_ind + 1))
+        issues.extend(check_heads(sentence, filename, s_ind + 1))
+        if not any(b'compound:nmod' in line for line in lines):
+            continue
+        issues.extend(check_chains(sentence, filename, s_ind + 1))
+        # run the extraction itself, on copies of the tokens since it masks them in place
+        try:
+            tok_rows, analysis_rows, locations = extract_sentence([dict(token) for token in sentence], s_ind, filename, language, register)
+        except Exception as error:
+            issues.append(issue(filename, s_ind + 1, None, 'extraction', f'{type(error).__name__}: {error}'))
+            continue
+        for row, (sent_id, tok_id) in zip(analysis_rows, locations):
+            issues.extend(check_brackets(dict(zip(analysis_header, row)), filename, sent_id, tok_id))
+    return sentences, issues
+
+
+# unpack a task of prep_conllu.plan_tasks for pool.imap (no output path needed)
+def validate_task(task):
+    return validate_chunk(*task[:5])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the .conllu files for problems that break or falsify the compound extraction.')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of worker processes (default: 0 = one per CPU core)')
+    parser.add_argument('--chunk-size', type=float, default=64,
+                        help='split .conllu files larger than this many MB into chunks at sentence boundaries (default: 64)')
+    parser.add_argument('--input-root', default=None,
+                        help='take the .conllu files from this directory and its subdirectories instead of the current directory')
+    parser.add_argument('--report', default='validation_report.json',
+                        help='.json report file, - for stdout (default: validation_report.json)')
+    args = parser.parse_args()
+    root = args.input_root or '.'
+
+    documents = find_documents(args.input_root)
+    filenames = {doc: Path(os.path.relpath(doc, root)).as_posix() for doc in documents}
+
+    # check each doc (or chunk), in a process pool if more than one worker
+    # results come back in task order, so the report is the same as in a serial run
+    sentences = 0
+    issues = []
+    workers = args.workers or os.cpu_count()
+    pool = multiprocessing.Pool(workers) if workers > 1 and documents else None
+    map_func = pool.starmap if pool else itertools.starmap
+    try:
+        tasks = plan_tasks(documents, filenames, int(args.chunk_size * 1024 * 1024), map_func)
+        results = pool.imap(validate_task, tasks) if pool else map(validate_task, tasks)
+        for chunk_sentences, chunk_issues in results:
+            sentences += chunk_sentences
+            issues.extend(chunk_issues)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    errors = sum(1 for entry in issues if entry['level'] == 'error')
+    report = {'files': len(documents), 'sentences': sentences, 'errors': errors,
+              'warnings': len(issues) - errors, 'issues': issues}
+    if args.report == '-':
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    else:
+        with open(args.report, 'w', encoding='utf8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+        print(f'{len(documents)} files, {sentences} sentences: {errors} errors, {len(issues) - errors} warnings (see {args.report})')
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()